@@ -0,0 +1,409 @@
+"""
+bench_framework.py
+Time and memory the framework adds on top of the network: client, validation, logging, metrics and fixtures
+"""
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+try:
+    import resource
+except ImportError:
+    # Windows, the peak RSS of the attachment benchmark is not reported there
+    resource = None
+
+from benchmarks.benchmark import benchmark, time_per_call, Metric
+from benchmarks.payload_scaling import build_payloads, measure_payloads, find_cliff, KINDS
+from config.config import url_base, get_headers, auth
+from helper.adf_documents import adf_document, comment_body, json_bytes
+from helper.attachments import upload_attachment, download_attachment
+from helper.data_pool import DataPool
+from helper.issue_search import search_issues, sweep_issues
+from helper.provisioner import ResourceProvisioner, PROJECT, ISSUE, COMMENT
+from helper.rest_client import RestClient
+from helper.scenario_plan import compile_scenarios, ScenarioVariables
+from helper.validate_response import ValidateResponse
+from helper.worklogs import import_worklogs
+from utils.influxdb_connection import InfluxDBConnection
+from utils.latency_histogram import LatencyRecorder
+from utils.metrics_exporter import InfluxDBExporter, MetricsExporter, format_prometheus
+from utils.logger import get_logger, LazyJson
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+# responses kept alive to measure the memory of one response
+MEMORY_SAMPLE = 500
+# stacks built before measuring the hand over of the pool
+POOL_SAMPLE = 50
+# issues created in the mock for the search and sweep benchmarks
+SEARCH_SAMPLE = 2000
+# worklogs of the bulk import benchmark, spread over WORKLOG_ISSUES issues
+WORKLOG_SAMPLE = 2000
+WORKLOG_ISSUES = 20
+# files of the attachment benchmark, the uploads of the small ones are repeated up to 8 MB per round
+ATTACHMENT_SIZES = ((1024, "1kb"), (1024 ** 2, "1mb"), (32 * 1024 ** 2, "32mb"), (500 * 1024 ** 2, "500mb"))
+ATTACHMENT_ROUND_BYTES = 8 * 1024 ** 2
+# payload sizes of the scaling benchmark, the levels reported and the requests sent per payload
+PAYLOAD_LEVELS = 9
+PAYLOAD_REPORTED = (0, 3, 6)
+PAYLOAD_REPEAT = 20
+
+
+@benchmark
+def bench_request(context):
+    """
+    Round trip of a GET through RestClient compared with a bare requests session on the same server
+    """
+    url = f"{url_base}project/{context.stack.project_id}"
+    session = requests.Session()
+    raw = time_per_call(lambda: session.get(url, headers=get_headers, auth=auth).json(), number=200)
+    session.close()
+
+    client = RestClient()
+    client.add_listener(LatencyRecorder().record)
+
+    def send():
+        response = client.send_request("GET", url=url, headers=get_headers, auth=auth)
+        return response["body"], response["headers"], response["status_code"]
+    framework = time_per_call(send, number=200)
+    client.close()
+    return [
+        Metric("raw_us", raw * 1e6, "us", True),
+        Metric("rest_client_us", framework * 1e6, "us", True),
+        Metric("overhead_us", (framework - raw) * 1e6, "us", True)
+    ]
+
+
+@benchmark
+def bench_validation(context):
+    """
+    ValidateResponse of a recorded response, the network is not involved
+    """
+    validate = ValidateResponse()
+    response = context.rest_client.send_request(
+        "GET", url=f"{url_base}issue/{context.stack.issue_id}", headers=get_headers, auth=auth
+    )
+    body, headers = response["body"], response["headers"]
+    seconds = time_per_call(lambda: validate.validate_response(response, "get_issue"), number=1000)
+    body_seconds = time_per_call(lambda: validate.get_body_validator("get_issue")(body), number=1000)
+    header_seconds = time_per_call(lambda: validate.get_header_validator("get_issue")(headers), number=1000)
+    return [
+        Metric("per_second", 1 / seconds, "ops/s", False),
+        Metric("body_us", body_seconds * 1e6, "us", True),
+        Metric("headers_us", header_seconds * 1e6, "us", True)
+    ]
+
+
+@benchmark
+def bench_logging(context):
+    """
+    Time the test thread spends logging a response body, the listener thread writes it
+    """
+    response = context.rest_client.send_request(
+        "GET", url=f"{url_base}issue/{context.stack.issue_id}", headers=get_headers, auth=auth
+    )
+    logger = get_logger("benchmark_logging", logging.DEBUG)
+    seconds = time_per_call(lambda: logger.debug("Response: %s", LazyJson(response["body"])), number=500)
+    return [Metric("response_body_us", seconds * 1e6, "us", True)]
+
+
+@benchmark
+def bench_metrics(context):
+    """
+    Latency recorder listener, per response export of each exporter and the exposition text of a summary
+    """
+    response = context.rest_client.send_request(
+        "GET", url=f"{url_base}project/{context.stack.project_id}", headers=get_headers, auth=auth
+    )
+    recorder = LatencyRecorder()
+    record_seconds = time_per_call(lambda: recorder.record(response), number=5000)
+    # nothing listens on the discard port, the batches fail in the background without slowing the writes
+    influxdb = InfluxDBExporter(InfluxDBConnection(url="http://127.0.0.1:9", token="benchmark"))
+    influxdb_seconds = time_per_call(lambda: influxdb.export_response(response, "project/{id}"), number=1000)
+    influxdb.close()
+    none = MetricsExporter()
+    none_seconds = time_per_call(lambda: none.export_response(response, "project/{id}"), number=5000)
+    rows = recorder.summary()
+    openmetrics_seconds = time_per_call(lambda: format_prometheus(rows, openmetrics=True), number=1000)
+    return [
+        Metric("latency_record_us", record_seconds * 1e6, "us", True),
+        Metric("influxdb_point_us", influxdb_seconds * 1e6, "us", True),
+        Metric("none_point_us", none_seconds * 1e6, "us", True),
+        Metric("openmetrics_summary_us", openmetrics_seconds * 1e6, "us", True)
+    ]
+
+
+@benchmark
+def bench_fixtures(context):
+    """
+    Cost of the provisioned stacks: built on demand and taken from a warm pool
+    """
+    provisioner = ResourceProvisioner(context.rest_client, pool_size=1, workers=1)
+    metrics = []
+    for depth, name in ((PROJECT, "project"), (ISSUE, "issue"), (COMMENT, "comment")):
+        stacks = []
+        seconds = time_per_call(lambda: stacks.append(provisioner.build_stack(depth)), number=10, repeat=3, warmup=1)
+        metrics.append(Metric(f"{name}_stack_ms", seconds * 1e3, "ms", True))
+        _delete_projects(context.rest_client, stacks)
+    provisioner.shutdown()
+
+    pool_provisioner = ResourceProvisioner(context.rest_client, pool_size=POOL_SAMPLE, workers=4)
+    pool_provisioner.set_demand(PROJECT, POOL_SAMPLE)
+    pool_provisioner.start()
+    # only the hand over of a ready stack is measured, the demand is used up so nothing is rebuilt
+    while pool_provisioner.ready[PROJECT].qsize() < POOL_SAMPLE:
+        time.sleep(0.01)
+    stacks = []
+    acquire_seconds = time_per_call(lambda: stacks.append(pool_provisioner.acquire(PROJECT)), number=POOL_SAMPLE, repeat=1, warmup=0)
+    pool_provisioner.shutdown()
+    _delete_projects(context.rest_client, stacks)
+    metrics.append(Metric("pool_acquire_us", acquire_seconds * 1e6, "us", True))
+    return metrics
+
+
+def _delete_projects(rest_client, stacks):
+    for stack in stacks:
+        rest_client.send_request("DELETE", url=f"{url_base}project/{stack.project_id}", auth=auth)
+
+
+@benchmark
+def bench_scenarios(context):
+    """
+    Request body of a compiled scenario step compared with the nested dict built by a test
+    """
+    data = DataPool(seed=0)
+
+    def test_body():
+        return {
+            "fields": {"issuetype": {"id": "10034"}, "project": {"id": f"{context.stack.project_id}"}, "summary": f"Task {data.company()}"},
+            "update": {}
+        }
+    plan, = compile_scenarios({"scenarios": [{
+        "name": "create_issue", "fixtures": ["worker_project"],
+        "steps": [{
+            "request": "POST issue",
+            "body": {"fields": {"issuetype": {"id": "10034"}, "project": {"id": "{worker_project}"}, "summary": "Task {company}"}, "update": {}},
+            "expect": "create_issue"
+        }]
+    }]})
+    step = plan.steps[0]
+    variables = ScenarioVariables(worker_project=context.stack.project_id)
+    test_seconds = time_per_call(test_body, number=2000)
+    plan_seconds = time_per_call(lambda: step.body(variables), number=2000)
+    compile_seconds = time_per_call(lambda: compile_scenarios({"scenarios": [{
+        "name": "get_issue", "steps": [{"request": "GET issue/{issue}", "expect": "get_issue"}], "parametrize": {"issue": ["1"]}
+    }]}), number=200)
+    return [
+        Metric("test_body_us", test_seconds * 1e6, "us", True),
+        Metric("plan_body_us", plan_seconds * 1e6, "us", True),
+        Metric("compile_step_us", compile_seconds * 1e6, "us", True)
+    ]
+
+
+@benchmark
+def bench_data(context):
+    """
+    Fake data of the tests: a faker call compared with a draw from the seeded pool
+    """
+    data = DataPool(seed=0)
+    faker = data.faker
+    faker_seconds = time_per_call(faker.company, number=500)
+    pool_seconds = time_per_call(data.company, number=5000)
+    key_seconds = time_per_call(data.project_key, number=5000)
+    return [
+        Metric("faker_company_us", faker_seconds * 1e6, "us", True),
+        Metric("pool_company_us", pool_seconds * 1e6, "us", True),
+        Metric("pool_project_key_us", key_seconds * 1e6, "us", True)
+    ]
+
+
+@benchmark
+def bench_search(context):
+    """
+    Issues read per second by the search iterator, pages one after the other and prefetched,
+    memory held while iterating over all of them, and issues deleted per second by a sweep
+    """
+    project_key = DataPool(seed=1).project_key()
+    state = context.server.state
+    _, project = state.create_project({"key": project_key, "name": f"Project {project_key}"})
+    for number in range(SEARCH_SAMPLE):
+        state.create_issue({"fields": {"project": {"id": str(project["id"])}, "summary": f"Search {number}"}})
+    jql = f"project = {project_key} ORDER BY id ASC"
+    metrics = []
+    for name, prefetch in (("search_sequential", 0), ("search_prefetch", 2)):
+        seconds = time_per_call(lambda: sum(1 for _ in search_issues(jql, prefetch=prefetch, rest_client=context.rest_client)), number=1, repeat=3)
+        metrics.append(Metric(f"{name}_issues_s", SEARCH_SAMPLE / seconds, "issues/s", False))
+    tracemalloc.start()
+    for _ in search_issues(jql, rest_client=context.rest_client):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics.append(Metric("search_peak_kb", peak / 1024, "KB", True))
+    start = time.perf_counter()
+    report = sweep_issues(jql, rest_client=context.rest_client)
+    swept = len(report.deleted) + len(report.submitted)
+    metrics.append(Metric("sweep_issues_s", swept / (time.perf_counter() - start), "issues/s", False))
+    context.rest_client.send_request("DELETE", url=f"{url_base}project/{project['id']}", auth=auth)
+    return metrics
+
+
+@benchmark
+def bench_worklogs(context):
+    """
+    Bulk import of worklogs sent concurrently across issues: throughput and response time percentiles
+    """
+    project_key = DataPool(seed=2).project_key()
+    state = context.server.state
+    _, project = state.create_project({"key": project_key, "name": f"Project {project_key}"})
+    issue_ids = [
+        state.create_issue({"fields": {"project": {"id": str(project["id"])}, "summary": f"Worklogs {number}"}})[1]["id"]
+        for number in range(WORKLOG_ISSUES)
+    ]
+    report = import_worklogs(issue_ids, WORKLOG_SAMPLE)
+    context.rest_client.send_request("DELETE", url=f"{url_base}project/{project['id']}", auth=auth)
+    return [
+        Metric("import_worklogs_s", report["worklogs_per_second"], "worklogs/s", False),
+        Metric("import_p50_ms", report["p50"] * 1e3, "ms", True),
+        Metric("import_p99_ms", report["p99"] * 1e3, "ms", True),
+        Metric("import_failed", report["failed"], "worklogs", True)
+    ]
+
+
+@benchmark
+def bench_attachments(context):
+    """
+    Streamed attachment upload and download: MB/s and peak RSS above the RSS before the transfers, per file size
+    """
+    metrics = []
+    block = os.urandom(1024 ** 2)
+    with tempfile.TemporaryDirectory() as directory:
+        for size, label in ATTACHMENT_SIZES:
+            path = pathlib.Path(directory) / f"{label}.bin"
+            with open(path, "wb") as f:
+                for _ in range(size // len(block)):
+                    f.write(block)
+                f.write(block[:size % len(block)])
+            number = max(1, min(ATTACHMENT_ROUND_BYTES // size, 200))
+            repeat = 3 if size < ATTACHMENT_ROUND_BYTES * 8 else 1
+            uploads = []
+            baseline = _reset_peak_rss()
+            upload_seconds = time_per_call(
+                lambda: uploads.append(upload_attachment(context.stack.issue_id, path, rest_client=context.rest_client)),
+                number=number, repeat=repeat, warmup=0
+            )
+            attachment_id = uploads[-1]["body"][0]["id"]
+            download_path = pathlib.Path(directory) / "download.bin"
+            download_seconds = time_per_call(
+                lambda: download_attachment(attachment_id, download_path, rest_client=context.rest_client),
+                number=number, repeat=repeat, warmup=0
+            )
+            peak = _peak_rss()
+            for upload in uploads:
+                context.rest_client.send_request("DELETE", url=f"{url_base}attachment/{upload['body'][0]['id']}", auth=auth)
+            path.unlink()
+            metrics += [
+                Metric(f"upload_{label}_mb_s", size / upload_seconds / 1024 ** 2, "MB/s", False),
+                Metric(f"download_{label}_mb_s", size / download_seconds / 1024 ** 2, "MB/s", False)
+            ]
+            if peak is not None and baseline is not None:
+                metrics.append(Metric(f"peak_rss_{label}_mb", (peak - baseline) / 1024, "MB", True))
+    return metrics
+
+
+@benchmark
+def bench_payload(context):
+    """
+    Comments and issue descriptions of growing ADF documents: latency and server time per level, size of the
+    first payload rejected or slowed down, and the cost of the serialization the reused bytes save
+    """
+    project_key = DataPool(seed=3).project_key()
+    state = context.server.state
+    _, project = state.create_project({"key": project_key, "name": f"Project {project_key}"})
+    _, issue = state.create_issue({"fields": {"project": {"id": str(project["id"])}, "summary": "Payload scaling"}})
+    data = DataPool(seed=3)
+    rows = measure_payloads(build_payloads(PAYLOAD_LEVELS, project["id"], data=data), issue["id"], PAYLOAD_REPEAT, context.rest_client)
+    context.rest_client.send_request("DELETE", url=f"{url_base}project/{project['id']}", auth=auth)
+    metrics = []
+    for row in rows:
+        if row["level"] in PAYLOAD_REPORTED:
+            metrics += [
+                Metric(f"{row['kind']}_level{row['level']}_p50_ms", row["latency_p50_ms"], "ms", True),
+                Metric(f"{row['kind']}_level{row['level']}_server_ms", row["server_p50_ms"], "ms", True)
+            ]
+    for kind in KINDS:
+        cliff = find_cliff(rows, kind)
+        metrics.append(Metric(f"{kind}_cliff_kb", cliff["bytes"] / 1024 if cliff else 0.0, "KB", False))
+    document = adf_document(2 ** PAYLOAD_REPORTED[-1], PAYLOAD_REPORTED[-1], data=data)
+    serialize = time_per_call(lambda: json_bytes(comment_body(document)), number=200)
+    metrics.append(Metric(f"serialize_level{PAYLOAD_REPORTED[-1]}_us", serialize * 1e6, "us", True))
+    return metrics
+
+
+def _reset_peak_rss():
+    """
+    Reset the peak RSS of the process to its current RSS, Linux only. Where it can not be reset the
+    peak so far is the baseline, the attachment peaks are then what the transfers add above it
+    :return: (int) RSS in KB the peak is compared to, None when the RSS is not available
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        LOGGER.warning("Peak RSS can not be reset, the attachment peaks only count what they add to the earlier peak")
+        return _peak_rss()
+    return _proc_status_kb("VmRSS")
+
+
+def _peak_rss():
+    """
+    :return: (int) peak RSS of the process in KB, None when neither /proc nor getrusage exist (Windows)
+    """
+    peak = _proc_status_kb("VmHWM")
+    if peak is not None or resource is None:
+        return peak
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB everywhere else
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def _proc_status_kb(field):
+    """
+    :return: (int) field of /proc/self/status in KB, None without /proc
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+@benchmark
+def bench_memory(context):
+    """
+    Memory held by one response: as returned, and after the tests read body and headers
+    """
+    url = f"{url_base}issue/{context.stack.issue_id}"
+    metrics = []
+    for name, read in (("response_bytes", False), ("response_read_bytes", True)):
+        responses = []
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for _ in range(MEMORY_SAMPLE):
+            response = context.rest_client.send_request("GET", url=url, headers=get_headers, auth=auth)
+            if read:
+                response["body"], response["headers"]
+            responses.append(response)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        metrics.append(Metric(name, allocated / len(responses), "bytes", True))
+    return metrics
@@ -0,0 +1,108 @@
+"""
+benchmark.py
+Registry, timing helpers and JSON results of the framework benchmarks
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# one measured value, lower_is_better tells the comparison which direction is a regression
+Metric = namedtuple("Metric", ["name", "value", "unit", "lower_is_better"])
+
+# benchmark name -> function receiving the BenchmarkContext and returning a list of Metric
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """
+    Register a benchmark, the name is the function name without the bench_ prefix
+    """
+    BENCHMARKS[func.__name__.removeprefix("bench_")] = func
+    return func
+
+
+def time_per_call(func, number, repeat=5, warmup=None):
+    """
+    Median time of one call over several rounds, the first calls only warm up caches and pools
+    :param func: (callable) code to measure, called without arguments
+    :param number: (int) calls per round
+    :param repeat: (int) rounds
+    :param warmup: (int) calls before measuring, number by default
+    :return: (float) seconds per call
+    """
+    for _ in range(number if warmup is None else warmup):
+        func()
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds)
+
+
+def run_benchmarks(context, names=None):
+    """
+    :param context: (BenchmarkContext) shared mock server and clients
+    :param names: (list) benchmarks to run, all of them by default
+    :return: (dict) metric name -> value, unit and direction
+    """
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for metric in func(context):
+            results[f"{name}.{metric.name}"] = {
+                "value": metric.value, "unit": metric.unit, "lower_is_better": metric.lower_is_better
+            }
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine()
+    }
+
+
+def save_results(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_results(current, baseline, threshold):
+    """
+    :param current: (dict) results of this run
+    :param baseline: (dict) results of the run compared against
+    :param threshold: (float) relative change counted as a regression, 0.1 is 10%
+    :return: (list) rows with name, baseline, current, change and regression flag
+    """
+    rows = []
+    for name, result in current.items():
+        if name not in baseline or not baseline[name]["value"]:
+            continue
+        change = (result["value"] - baseline[name]["value"]) / baseline[name]["value"]
+        worse = change if result["lower_is_better"] else -change
+        rows.append({
+            "name": name, "unit": result["unit"], "baseline": baseline[name]["value"], "current": result["value"],
+            "change": change, "regression": worse > threshold
+        })
+    return rows
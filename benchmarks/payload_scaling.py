@@ -0,0 +1,232 @@
+"""
+payload_scaling.py
+Latency and server processing time of comments and issue descriptions as their ADF document grows. Every level
+multiplies the paragraphs by the growth factor and nests the bullet list one level deeper. The bodies are
+serialized once and the same bytes are sent by every repeat, only the request is measured
+
+    python -m benchmarks.payload_scaling --levels 12 --repeat 20
+
+The results are written as csv with a plot of both times against the payload size when matplotlib is installed
+"""
+import argparse
+import csv
+import logging
+import pathlib
+import re
+import time
+from collections import Counter, namedtuple
+
+from config.config import url_base, headers, auth, jira_mock, jira_mock_port
+from helper.adf_documents import adf_document, comment_body, issue_body, json_bytes
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.jira_mock_server import JiraMockServer
+from helper.provisioner import create_project_resource, create_issue_resource
+from helper.rest_client import get_rest_client
+from utils.latency_histogram import LatencyHistogram
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+RESULTS_PATH = pathlib.Path(__file__).resolve().parent / "results"
+KINDS = ("comment", "description")
+SERVER_TIMING_DURATION = re.compile(r"dur=([0-9.]+)")
+COLUMNS = (
+    "kind", "level", "paragraphs", "depth", "bytes", "requests", "accepted", "status_codes",
+    "latency_p50_ms", "latency_p90_ms", "server_p50_ms", "server_p90_ms", "mb_per_second"
+)
+# throughput under this share of the best level is the cliff
+CLIFF_RATIO = 0.5
+
+Payload = namedtuple("Payload", ["kind", "level", "paragraphs", "depth", "data"])
+
+
+def build_payloads(levels, project_id, factor=2, data=None):
+    """
+    Serialize the comment and the issue of every level, the documents themselves are not kept
+    :param levels: (int) levels of size, level n has factor ** n paragraphs and a list nested n deep
+    :param project_id: (str) project of the issues created with a description
+    :param factor: (int) growth of the paragraphs from one level to the next
+    :param data: (DataPool) source of the text
+    :return: (list) Payload, comments and descriptions in the order of the levels
+    """
+    data = data or get_data_pool()
+    payloads = []
+    for level in range(levels):
+        paragraphs = factor ** level
+        document = adf_document(paragraphs, level, data=data)
+        payloads.append(Payload("comment", level, paragraphs, level, json_bytes(comment_body(document))))
+        body = issue_body(project_id, f"Payload level {level}", document)
+        payloads.append(Payload("description", level, paragraphs, level, json_bytes(body)))
+    return payloads
+
+
+def server_time(response):
+    """
+    Processing time reported in the Server-Timing header, the longest entry covers the others. Without the
+    header the time to the first byte of the response stands for it
+    :return: (float) seconds, None when neither is known
+    """
+    header = response.header("Server-Timing")
+    durations = [float(duration) for duration in SERVER_TIMING_DURATION.findall(header or "")]
+    if durations:
+        return max(durations) / 1e3
+    return response.timings["ttfb"]
+
+
+def measure_payloads(payloads, issue_id, repeat=10, rest_client=None):
+    """
+    POST every payload repeat times, a comment on the issue or a new issue with the description. What is
+    created is left to the cleanup of the project
+    :param payloads: (list) Payload
+    :param issue_id: (str) issue receiving the comments
+    :param repeat: (int) requests of every payload
+    :param rest_client: (RestClient) client sending the requests, the shared one by default
+    :return: (list) one dict of COLUMNS per payload
+    """
+    rest_client = rest_client or get_rest_client()
+    rows = []
+    for payload in payloads:
+        url = f"{url_base}issue/{issue_id}/comment" if payload.kind == "comment" else f"{url_base}issue"
+        latency = LatencyHistogram()
+        server = LatencyHistogram()
+        status_codes = Counter()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = rest_client.send_request("POST", url=url, headers=headers, auth=auth, data=payload.data)
+            latency.record(time.perf_counter() - start)
+            status_codes[response.status_code] += 1
+            processing = server_time(response)
+            if processing is not None:
+                server.record(processing)
+        p50 = latency.percentile(50)
+        rows.append({
+            "kind": payload.kind,
+            "level": payload.level,
+            "paragraphs": payload.paragraphs,
+            "depth": payload.depth,
+            "bytes": len(payload.data),
+            "requests": repeat,
+            "accepted": sum(count for status_code, count in status_codes.items() if status_code == 201),
+            "status_codes": " ".join(f"{status_code}:{count}" for status_code, count in sorted(status_codes.items(), key=str)),
+            "latency_p50_ms": p50 * 1e3,
+            "latency_p90_ms": latency.percentile(90) * 1e3,
+            "server_p50_ms": server.percentile(50) * 1e3 if server.count else None,
+            "server_p90_ms": server.percentile(90) * 1e3 if server.count else None,
+            "mb_per_second": len(payload.data) / p50 / 1024 ** 2 if p50 else None
+        })
+        LOGGER.info("%s level %s: %s bytes, p50 %.1f ms, %s", payload.kind, payload.level, len(payload.data), p50 * 1e3, rows[-1]["status_codes"])
+    return rows
+
+
+def find_cliff(rows, kind):
+    """
+    :return: (dict) row of the first level of the kind rejected or with a throughput under CLIFF_RATIO
+             of the best level before it, None when the throughput holds up to the last level
+    """
+    best = 0.0
+    for row in rows:
+        if row["kind"] != kind:
+            continue
+        if row["accepted"] < row["requests"] or (row["mb_per_second"] or 0) < best * CLIFF_RATIO:
+            return row
+        best = max(best, row["mb_per_second"] or 0)
+    return None
+
+
+def save_rows(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def plot_rows(path, rows):
+    """
+    Latency and server processing time against the payload size, both axes logarithmic, with the cliff of
+    every kind marked
+    :return: (pathlib.Path) image written, None when matplotlib is not installed
+    """
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib import pyplot
+    except ImportError:
+        LOGGER.warning("matplotlib is not installed, %s not drawn", path)
+        return None
+    figure, (latency_axes, server_axes) = pyplot.subplots(1, 2, figsize=(13, 5))
+    for kind, color in zip(KINDS, ("tab:blue", "tab:orange")):
+        kind_rows = [row for row in rows if row["kind"] == kind]
+        sizes = [row["bytes"] for row in kind_rows]
+        latency_axes.plot(sizes, [row["latency_p50_ms"] for row in kind_rows], marker="o", color=color, label=f"{kind} p50")
+        latency_axes.plot(sizes, [row["latency_p90_ms"] for row in kind_rows], linestyle="--", color=color, label=f"{kind} p90")
+        server_axes.plot(sizes, [row["server_p50_ms"] for row in kind_rows], marker="o", color=color, label=f"{kind} p50")
+        cliff = find_cliff(rows, kind)
+        if cliff is not None:
+            for axes in (latency_axes, server_axes):
+                axes.axvline(cliff["bytes"], linestyle=":", color=color, label=f"{kind} cliff")
+    for axes, title in ((latency_axes, "Request latency"), (server_axes, "Server processing time")):
+        axes.set_title(title)
+        axes.set_xscale("log")
+        axes.set_yscale("log")
+        axes.set_xlabel("payload (bytes)")
+        axes.set_ylabel("ms")
+        axes.grid(True, which="both", alpha=0.3)
+        axes.legend(fontsize="small")
+    figure.tight_layout()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    figure.savefig(path, dpi=120)
+    pyplot.close(figure)
+    return path
+
+
+def print_rows(rows):
+    print(f"\n{'kind':<12} {'level':>5} {'bytes':>10} {'p50 ms':>9} {'p90 ms':>9} {'server ms':>10} {'MB/s':>8}  status")
+    for row in rows:
+        server = f"{row['server_p50_ms']:>10.2f}" if row["server_p50_ms"] is not None else f"{'-':>10}"
+        print(
+            f"{row['kind']:<12} {row['level']:>5} {row['bytes']:>10} {row['latency_p50_ms']:>9.2f} "
+            f"{row['latency_p90_ms']:>9.2f} {server} {row['mb_per_second'] or 0:>8.2f}  {row['status_codes']}"
+        )
+    for kind in KINDS:
+        cliff = find_cliff(rows, kind)
+        if cliff is None:
+            print(f"{kind}: throughput holds up to the largest payload")
+        else:
+            print(f"{kind}: falls off at level {cliff['level']}, {cliff['bytes']} bytes ({cliff['status_codes']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency of comments and issue descriptions against the size of their ADF body")
+    parser.add_argument("--levels", type=int, default=10, help="payload sizes, the paragraphs grow by the factor at every level")
+    parser.add_argument("--factor", type=int, default=2, help="growth of the paragraphs from one level to the next")
+    parser.add_argument("--repeat", type=int, default=10, help="requests sent with every payload")
+    parser.add_argument("--output", help="csv written, benchmarks/results/payload_scaling.csv by default, the plot is written next to it")
+    args = parser.parse_args(argv)
+
+    mock_server = JiraMockServer(port=jira_mock_port).start() if jira_mock else None
+    registry = get_cleanup_registry()
+    try:
+        rest_client = get_rest_client()
+        project_id = create_project_resource(rest_client)
+        # deleting the project removes the issues and the comments created
+        registry.register_project(project_id)
+        issue_id = create_issue_resource(rest_client, project_id)
+        payloads = build_payloads(args.levels, project_id, args.factor)
+        rows = measure_payloads(payloads, issue_id, args.repeat, rest_client)
+    finally:
+        registry.cleanup()
+        if mock_server is not None:
+            mock_server.stop()
+    print_rows(rows)
+    output = pathlib.Path(args.output) if args.output else RESULTS_PATH / "payload_scaling.csv"
+    save_rows(output, rows)
+    print(f"\nResults written to {output}")
+    image = plot_rows(output.with_suffix(".png"), rows)
+    if image is not None:
+        print(f"Plot written to {image}")
+
+
+if __name__ == "__main__":
+    main()
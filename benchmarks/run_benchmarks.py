@@ -0,0 +1,84 @@
+"""
+run_benchmarks.py
+Measure the overhead of the framework against the local Jira mock and compare it with a previous run
+
+    python -m benchmarks.run_benchmarks --output benchmarks/results/current.json --compare benchmarks/results/main.json
+"""
+import argparse
+import logging
+import os
+import pathlib
+import sys
+from collections import namedtuple
+
+# the benchmarks never reach Jira, url_base must point to the mock before the config is imported
+os.environ["JIRA_MOCK"] = "true"
+os.environ.setdefault("INFLUXDB_MAX_RETRIES", "0")
+
+from benchmarks import bench_framework  # noqa: E402,F401 registers the benchmarks
+from benchmarks.benchmark import (  # noqa: E402
+    BENCHMARKS, run_benchmarks, save_results, load_results, compare_results, environment
+)
+from config.config import jira_mock_port  # noqa: E402
+from helper.cleanup_registry import get_cleanup_registry  # noqa: E402
+from helper.jira_mock_server import JiraMockServer  # noqa: E402
+from helper.provisioner import get_provisioner, ISSUE  # noqa: E402
+from helper.rest_client import get_rest_client  # noqa: E402
+from utils.logger import set_console_level  # noqa: E402
+
+RESULTS_PATH = pathlib.Path(__file__).resolve().parent / "results"
+
+# what the benchmarks share: the mock server, the pooled client and a project/issue to read
+BenchmarkContext = namedtuple("BenchmarkContext", ["server", "rest_client", "stack"])
+
+
+def print_results(results):
+    print(f"{'benchmark':45} {'value':>14} unit")
+    for name, result in results.items():
+        print(f"{name:45} {result['value']:>14.2f} {result['unit']}")
+
+
+def print_comparison(rows, threshold):
+    print(f"\n{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:45} {row['baseline']:>12.2f} {row['current']:>12.2f} {row['change']:>+8.1%}{flag}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"\n{len(regressions)} regressions over {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the overhead of the API test framework")
+    parser.add_argument("-k", dest="names", action="append", choices=sorted(BENCHMARKS), help="benchmark to run, all by default")
+    parser.add_argument("--output", help="results file, benchmarks/results/<commit>.json by default")
+    parser.add_argument("--compare", help="results file of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    args = parser.parse_args(argv)
+
+    # bodies printed on the terminal would be measured as well, the log files keep the debug level
+    set_console_level(logging.WARNING)
+    server = JiraMockServer(port=jira_mock_port).start()
+    rest_client = get_rest_client()
+    try:
+        stack = get_provisioner().build_stack(ISSUE)
+        results = run_benchmarks(BenchmarkContext(server, rest_client, stack), args.names)
+    finally:
+        get_cleanup_registry().cleanup()
+        rest_client.close()
+        server.stop()
+
+    print_results(results)
+    output = pathlib.Path(args.output) if args.output else RESULTS_PATH / f"{environment()['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    save_results(output, results)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        rows = compare_results(results, load_results(args.compare), args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
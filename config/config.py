@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from requests.auth import HTTPBasicAuth
 
@@ -7,6 +8,26 @@ username = os.getenv("GMAIL")
 api_token = os.getenv("TOKEN_JIRA")
 auth = HTTPBasicAuth(username, api_token)
 url_base = os.getenv("URL_BASE")
+# JIRA_MOCK=true runs the suite against the local stand-in server, see helper/jira_mock_server.py
+jira_mock = os.getenv("JIRA_MOCK", "false").lower() == "true"
+# pytest-xdist worker running this process (gw0, gw1...), empty when the suite runs in a single process
+xdist_worker = os.getenv("PYTEST_XDIST_WORKER", "")
+xdist_worker_count = int(os.getenv("PYTEST_XDIST_WORKER_COUNT", "1"))
+worker_index = int(xdist_worker[2:]) if xdist_worker else 0
+# every worker starts its own mock server on the next port
+jira_mock_port = int(os.getenv("JIRA_MOCK_PORT", "8181")) + worker_index
+if jira_mock:
+    url_base = f"http://127.0.0.1:{jira_mock_port}/rest/api/3/"
+    auth = HTTPBasicAuth(username or "mock@example.com", api_token or "mock-token")
+# CASSETTE_MODE=record saves the responses received, replay serves them back without calling Jira
+cassette_mode = os.getenv("CASSETTE_MODE", "off").lower()
+cassette_path = os.getenv("CASSETTE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cassettes", "jira"))
+# recorded: replayed responses take the time measured when recording, zero: they are served immediately
+cassette_latency = os.getenv("CASSETTE_LATENCY", "zero").lower()
+if cassette_mode == "replay" and not url_base:
+    # the cassette keys only use the path, any host works
+    url_base = "http://jira.cassette/rest/api/3/"
+    auth = HTTPBasicAuth(username or "cassette@example.com", api_token or "cassette-token")
 headers = {
     "Accept": "application/json",
     "Content-Type": "application/json"
@@ -14,7 +35,67 @@ headers = {
 get_headers = {
     "Accept": "application/json"
 }
+# multipart uploads are rejected by the XSRF check of Jira without the no-check token
+attachment_headers = {
+    "Accept": "application/json",
+    "X-Atlassian-Token": "no-check"
+}
 params = {"returnIssue": True}
 web_hook = os.getenv("WEB_HOOK")
 account_id = os.getenv("ACCOUNT_ID")
 influxdb_token = os.getenv("INFLUXDB_TOKEN")
+# async batch client limits
+async_concurrency = int(os.getenv("ASYNC_CONCURRENCY", "20"))
+async_limit_per_host = int(os.getenv("ASYNC_LIMIT_PER_HOST", "10"))
+# connection pool shared by every RestClient call
+pool_connections = int(os.getenv("POOL_CONNECTIONS", "10"))
+pool_maxsize = int(os.getenv("POOL_MAXSIZE", "20"))
+keep_alive = os.getenv("KEEP_ALIVE", "true").lower() == "true"
+# metrics database
+influxdb_url = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+influxdb_org = os.getenv("INFLUXDB_ORG", "APIAutomationTest")
+influxdb_bucket = os.getenv("INFLUXDB_BUCKET", "JiraAPI")
+influxdb_batch_size = int(os.getenv("INFLUXDB_BATCH_SIZE", "500"))
+influxdb_flush_interval = int(os.getenv("INFLUXDB_FLUSH_INTERVAL_MS", "1000"))
+# retries of a failed batch write, bounded so an unreachable database does not hold the end of a run
+influxdb_max_retries = int(os.getenv("INFLUXDB_MAX_RETRIES", "2"))
+influxdb_max_retry_time = int(os.getenv("INFLUXDB_MAX_RETRY_TIME_MS", "5000"))
+# where the metrics of a run go: influxdb, prometheus, openmetrics, csv or none, comma separated for several
+metrics_exporter = os.getenv("METRICS_EXPORTER", "influxdb" if influxdb_token else "none").lower()
+# openmetrics and csv files, reports/metrics.prom and reports/metrics.csv by default
+metrics_file = os.getenv("METRICS_FILE")
+prometheus_pushgateway_url = os.getenv("PROMETHEUS_PUSHGATEWAY_URL", "http://localhost:9091")
+prometheus_job = os.getenv("PROMETHEUS_JOB", "jira_api_tests")
+# projects/issues/comments built ahead of the tests
+provision_pool_size = int(os.getenv("PROVISION_POOL_SIZE", "3"))
+provision_workers = int(os.getenv("PROVISION_WORKERS", "4"))
+# cleanup of the resources created during the session
+cleanup_retries = int(os.getenv("CLEANUP_RETRIES", "3"))
+cleanup_backoff = float(os.getenv("CLEANUP_BACKOFF", "1.0"))
+cleanup_bulk = os.getenv("CLEANUP_BULK", "false").lower() == "true"
+# adaptive rate limit shared by the processes of a run, RATE_LIMIT=0 disables it
+rate_limit = float(os.getenv("RATE_LIMIT", "0" if jira_mock else "10"))
+rate_limit_min = float(os.getenv("RATE_LIMIT_MIN", "0.5"))
+rate_limit_max = float(os.getenv("RATE_LIMIT_MAX", "50"))
+rate_limit_file = os.getenv("RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "jira_api_rate_limit.json"))
+# retries of idempotent requests failing with 429, 503 or a connection error
+retry_max = int(os.getenv("RETRY_MAX", "3"))
+retry_backoff = float(os.getenv("RETRY_BACKOFF", "0.5"))
+# seconds to open a connection and between two reads of a response
+connect_timeout = float(os.getenv("CONNECT_TIMEOUT", "5"))
+read_timeout = float(os.getenv("READ_TIMEOUT", "30"))
+# seconds every test and its fixtures have for all their requests, 0 disables the deadline
+test_deadline = float(os.getenv("TEST_DEADLINE", "120"))
+# seconds a test waits for a provisioned stack, the test deadline or 120 when the deadline is disabled
+provision_timeout = float(os.getenv("PROVISION_TIMEOUT", test_deadline or 120))
+# consecutive failures opening the circuit of an endpoint, 0 disables the breaker
+breaker_failures = int(os.getenv("BREAKER_FAILURES", "5"))
+# seconds an open circuit fails fast before letting one probe request through
+breaker_reset = float(os.getenv("BREAKER_RESET", "30"))
+# fake data drawn from seeded pools, see helper/data_pool.py
+data_pool_size = int(os.getenv("DATA_POOL_SIZE", "512"))
+# issues per /search request and pages requested ahead of the one being read, see helper/issue_search.py
+search_page_size = int(os.getenv("SEARCH_PAGE_SIZE", "100"))
+search_prefetch = int(os.getenv("SEARCH_PREFETCH", "2"))
+# blocks of the streamed attachment uploads and downloads, the memory they use does not grow with the file
+attachment_chunk_size = int(os.getenv("ATTACHMENT_CHUNK_SIZE", str(1024 * 1024)))
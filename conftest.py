@@ -0,0 +1,84 @@
+import logging
+import os
+import pathlib
+
+import pytest
+
+from config.config import test_deadline
+from helper.data_pool import get_data_pool
+from helper.deadline import request_deadline
+from helper.rest_client import get_rest_client
+from utils.latency_histogram import (
+    get_latency_recorder, LatencyRecorder, format_summary_table, format_phase_table, format_summary_markdown,
+    format_summary_html
+)
+from utils.logger import get_logger
+from utils.metrics_exporter import get_metrics_exporter, close_metrics_exporter
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+
+def pytest_configure(config):
+    # every request of the session is aggregated in the latency recorder
+    get_rest_client().add_listener(get_latency_recorder().record)
+    get_rest_client().add_decode_listener(get_latency_recorder().record_decode)
+    # the seed is chosen before the xdist workers start, they inherit it
+    get_data_pool()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item):
+    # the setup of the fixtures, the test and the teardown share one time budget for their requests
+    with request_deadline(test_deadline):
+        yield
+
+
+def pytest_report_header():
+    return f"data seed: {get_data_pool().seed} (DATA_SEED)"
+
+
+def pytest_sessionfinish(session):
+    recorder = get_latency_recorder()
+    if hasattr(session.config, "workeroutput"):
+        # xdist worker, the controller merges the histograms and reports them
+        session.config.workeroutput["latency"] = recorder.to_dict()
+        return
+    rows = recorder.summary()
+    if rows:
+        get_metrics_exporter().export_summary(rows)
+    close_metrics_exporter()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node):
+    latency = getattr(node, "workeroutput", {}).get("latency")
+    if latency:
+        get_latency_recorder().merge(LatencyRecorder.from_dict(latency))
+
+
+def pytest_terminal_summary(terminalreporter):
+    rows = get_latency_recorder().summary()
+    if rows:
+        terminalreporter.write_sep("=", "response times (s)")
+        terminalreporter.write_line(format_summary_table(rows))
+        terminalreporter.write_sep("=", "request phases (ms)")
+        terminalreporter.write_line(format_phase_table(rows))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix):
+    rows = get_latency_recorder().summary()
+    if rows:
+        prefix.append(format_summary_html(rows))
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_unconfigure(config):
+    # pytest-md-report writes its file on unconfigure, the latency table is appended after it
+    md_report = getattr(config.option, "md_report_output", None) or os.environ.get("MD_REPORT_OUTPUT")
+    rows = get_latency_recorder().summary()
+    if md_report and rows and not hasattr(config, "workeroutput"):
+        path = pathlib.Path(md_report)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n\n## Response times (s)\n\n" + format_summary_markdown(rows) + "\n")
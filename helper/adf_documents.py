@@ -0,0 +1,77 @@
+"""
+adf_documents.py
+Atlassian Document Format bodies of comments and issue descriptions built to a size: paragraphs of formatted
+text followed by a bullet list nested to a depth, the content of a long ticket instead of one sentence
+
+    document = adf_document(paragraphs=64, depth=6)
+    payload = json_bytes(comment_body(document))
+"""
+import json
+
+from helper.data_pool import get_data_pool
+
+# marks of the text nodes of a paragraph, one after the other
+TEXT_MARKS = ((), ({"type": "strong"},), ({"type": "em"},), ({"type": "code"},), ({"type": "strong"}, {"type": "em"}))
+# items of every bullet list, the last one holds the list of the next level
+LIST_WIDTH = 2
+
+
+def adf_document(paragraphs=1, depth=0, sentences=3, data=None):
+    """
+    :param paragraphs: (int) paragraphs at the top of the document
+    :param depth: (int) levels of the nested bullet list after the paragraphs, no list when 0
+    :param sentences: (int) text nodes of every paragraph and list item
+    :param data: (DataPool) source of the sentences, the pool of the worker by default
+    :return: (dict) ADF document
+    """
+    data = data or get_data_pool()
+    content = [_paragraph(sentences, data) for _ in range(paragraphs)]
+    if depth:
+        content.append(_bullet_list(depth, sentences, data))
+    return {"type": "doc", "version": 1, "content": content}
+
+
+def comment_body(document):
+    """
+    :return: (dict) body of POST issue/{id}/comment
+    """
+    return {"body": document}
+
+
+def issue_body(project_id, summary, description=None):
+    """
+    :param project_id: (str) id of the project of the issue
+    :param summary: (str) summary of the issue
+    :param description: (dict) ADF document of the description, no description by default
+    :return: (dict) body of POST issue
+    """
+    fields = {"issuetype": {"id": "10034"}, "project": {"id": f"{project_id}"}, "summary": summary}
+    if description is not None:
+        fields["description"] = description
+    return {"fields": fields, "update": {}}
+
+
+def json_bytes(body):
+    """
+    Serialize a body once to send the same bytes with every request
+    :return: (bytes) compact json of the body
+    """
+    return json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+
+def _paragraph(sentences, data):
+    content = []
+    for number in range(sentences):
+        node = {"type": "text", "text": f"{data.sentence()} "}
+        marks = TEXT_MARKS[number % len(TEXT_MARKS)]
+        if marks:
+            node["marks"] = list(marks)
+        content.append(node)
+    return {"type": "paragraph", "content": content}
+
+
+def _bullet_list(depth, sentences, data):
+    items = [{"type": "listItem", "content": [_paragraph(sentences, data)]} for _ in range(LIST_WIDTH)]
+    if depth > 1:
+        items[-1]["content"].append(_bullet_list(depth - 1, sentences, data))
+    return {"type": "bulletList", "content": items}
@@ -0,0 +1,202 @@
+import asyncio
+import codecs
+import functools
+import json
+import logging
+import random
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+
+from config.config import async_concurrency, async_limit_per_host, connect_timeout, read_timeout, retry_max, retry_backoff
+from helper.cassette import get_cassette
+from helper.circuit_breaker import get_circuit_breaker
+from helper.endpoints import normalize_endpoint
+from helper.rate_limiter import get_rate_limiter, parse_retry_after
+from helper.rest_client import IDEMPOTENT_METHODS, RETRY_STATUS_CODES
+from helper.rest_response import RequestInfo
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+
+class AsyncRestClient:
+    def __init__(self, concurrency=async_concurrency, limit_per_host=async_limit_per_host):
+        """
+        Asyncio based client used to send many requests in parallel
+        :param concurrency: (int) max number of requests in flight at the same time
+        :param limit_per_host: (int) max number of open connections to the same host
+        """
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.cassette = get_cassette()
+        # the same limiter, retries and breaker as RestClient, replayed responses never reach Jira
+        replaying = self.cassette is not None and self.cassette.replaying
+        self.rate_limiter = None if replaying else get_rate_limiter()
+        self.retry_max = retry_max
+        self.retry_backoff = retry_backoff
+        self.circuit_breaker = None if replaying else get_circuit_breaker()
+
+    def send_many(self, requests_list):
+        """
+        Send a batch of requests in parallel and wait for all of them
+        :param requests_list: (list) dicts with the send_request arguments
+                              (method_name, url, auth, headers, body, params)
+        :return: (list) response dicts in the same order as requests_list
+        """
+        return asyncio.run(self.send_many_async(requests_list))
+
+    async def send_many_async(self, requests_list):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host)
+        # no total timeout, a request waiting for a free connection is not failing
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+            async def bounded_send(request_args):
+                async with semaphore:
+                    return await self.send_request(session, **request_args)
+
+            return await asyncio.gather(*(bounded_send(request_args) for request_args in requests_list))
+
+    async def send_request(self, session, method_name, url, auth=None, headers=None, body=None, params=None):
+        """
+        Send one request through the shared rate limiter and circuit breaker, idempotent requests failing
+        with 429, 503 or a connection error are retried like RestClient.send_request does
+        :return: (dict) response with body, status_code, headers, time and request
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            return await self._replay(method_name, url, auth, body, params)
+        endpoint = normalize_endpoint(url)
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow(endpoint):
+                LOGGER.error("Circuit open, not sending %s %s", method_name, url)
+                return {"body": {"message": "Circuit Open"}, "status_code": None, "headers": {}}
+            if self.rate_limiter is not None:
+                # the bucket blocks while it waits for a token, the other requests of the batch keep going
+                await asyncio.to_thread(self.rate_limiter.acquire)
+            response = await self._send(session, method_name, url, auth, headers, body, params)
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_response(response["status_code"], functools.partial(self._header, response))
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(endpoint, response["status_code"])
+            if not self._should_retry(method_name, response, attempt):
+                return response
+            delay = self._retry_delay(response, attempt)
+            LOGGER.warning("Retrying %s %s in %.2fs, status: %s", method_name, url, delay, response["status_code"])
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, session, method_name, url, auth, headers, body, params):
+        response_updated = {}
+        start = time.perf_counter()
+        try:
+            async with session.request(
+                method_name,
+                url,
+                auth=self._basic_auth(auth),
+                headers=headers,
+                json=body,
+                params=self._query_params(params)
+            ) as response:
+                elapsed = time.perf_counter() - start
+                content = await response.read()
+                if self.cassette is not None:
+                    self.cassette.save(method_name, response.url, body, auth is not None, response.status,
+                                       response.reason, response.headers, content, elapsed)
+                text = self._decode_text(content, response)
+                if response.status >= 400:
+                    LOGGER.error("HTTP Error: %s %s for url: %s", response.status, response.reason, response.url)
+                    default_body = {"message": "HTTP Error"}
+                else:
+                    default_body = {"message": "No body content"}
+                response_updated["body"] = self._decode_body(text, default_body)
+                response_updated["status_code"] = response.status
+                response_updated["headers"] = dict(response.headers)
+                response_updated["time"] = elapsed
+                response_updated["request"] = response.request_info
+
+        except aiohttp.ClientConnectionError as e:
+            LOGGER.error("Connection Error: %s", e)
+            response_updated["body"] = {"message": "Connection Error"}
+            response_updated["status_code"] = None
+            response_updated["headers"] = {}
+
+        except aiohttp.ClientError as e:
+            LOGGER.error("Request Exception: %s", e)
+            response_updated["body"] = {"message": "Request Failed"}
+            response_updated["status_code"] = None
+            response_updated["headers"] = {}
+
+        return response_updated
+
+    def _should_retry(self, method_name, response, attempt):
+        if attempt >= self.retry_max or method_name not in IDEMPOTENT_METHODS:
+            return False
+        return response["status_code"] is None or response["status_code"] in RETRY_STATUS_CODES
+
+    def _retry_delay(self, response, attempt):
+        # full jitter exponential backoff, never shorter than the Retry-After sent by Jira
+        delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+        retry_after = parse_retry_after(self._header(response, "Retry-After"), self._header(response, "X-RateLimit-Reset"))
+        return max(delay, retry_after or 0)
+
+    @staticmethod
+    def _header(response, name):
+        # the headers were copied to a plain dict, their names are no longer case insensitive
+        name = name.lower()
+        return next((value for key, value in response["headers"].items() if key.lower() == name), None)
+
+    async def _replay(self, method_name, url, auth, body, params):
+        if params:
+            url = f"{url}?{urlencode(self._query_params(params))}"
+        record = self.cassette.play(method_name, url, body, auth is not None)
+        if record is None:
+            LOGGER.error("Connection Error: no recorded response for %s %s", method_name, url)
+            return {"body": {"message": "Connection Error"}, "status_code": None, "headers": {}}
+        if self.cassette.recorded_latency:
+            await asyncio.sleep(record["elapsed"])
+        default_body = {"message": "HTTP Error" if record["status_code"] >= 400 else "No body content"}
+        return {
+            "body": self._decode_body(self.cassette.content(record).decode("utf-8", errors="replace"), default_body),
+            "status_code": record["status_code"],
+            "headers": record["headers"],
+            "time": record["elapsed"],
+            "request": RequestInfo(method_name, url)
+        }
+
+    @staticmethod
+    def _decode_text(content, response):
+        # a body in another charset than announced must not abort the rest of the batch either
+        try:
+            encoding = codecs.lookup(response.get_encoding()).name
+        except (LookupError, RuntimeError):
+            encoding = "utf-8"
+        return content.decode(encoding, errors="replace")
+
+    @staticmethod
+    def _decode_body(text, default_body):
+        # a single non JSON response must not abort the rest of the batch
+        if not text:
+            return default_body
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            LOGGER.error("JSON decode error: %s", e)
+            return {"message": text}
+
+    @staticmethod
+    def _basic_auth(auth):
+        # config.auth is a requests HTTPBasicAuth, aiohttp needs its own BasicAuth
+        if auth is None:
+            return None
+        return aiohttp.BasicAuth(auth.username or "", auth.password or "")
+
+    @staticmethod
+    def _query_params(params):
+        # aiohttp does not accept booleans in the query string
+        if params is None:
+            return None
+        return {key: str(value).lower() if isinstance(value, bool) else value for key, value in params.items()}
@@ -0,0 +1,210 @@
+"""
+attachments.py
+Attachments uploaded from memory mapped files as a streamed multipart body and downloaded to disk in chunks,
+the memory used stays the same whatever the size of the file
+
+    response = upload_attachment(issue_id, "report.pdf")
+    download = download_attachment(response["body"][0]["id"], "/tmp/report.pdf")
+"""
+import hashlib
+import io
+import logging
+import mimetypes
+import mmap
+import os
+import uuid
+from collections import namedtuple
+
+from config.config import url_base, auth, attachment_headers, attachment_chunk_size
+from helper.rest_client import get_rest_client
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+# madvise is not available on Windows, the files are mapped without the hints there
+ADVISE = hasattr(mmap, "MADV_SEQUENTIAL") and hasattr(mmap, "MADV_DONTNEED")
+# size, None when the download did not complete, and sha256 of the file written
+Download = namedtuple("Download", ["response", "size", "sha256"])
+
+
+class MultipartFileBody(io.RawIOBase):
+    def __init__(self, path, filename=None, content_type=None, block_size=attachment_chunk_size):
+        """
+        multipart/form-data body of one file part, read by requests in blocks. The reads return slices
+        of the memory mapped file sent as they are, the pages already sent are dropped from the process
+        :param path: (str) file to upload
+        :param filename: (str) name of the attachment, the name of the file by default
+        :param content_type: (str) mime type of the part, guessed from the filename by default
+        :param block_size: (int) bytes returned by a read without size
+        """
+        super().__init__()
+        filename = filename or os.path.basename(path)
+        content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        self.boundary = uuid.uuid4().hex
+        self.block_size = block_size
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename.replace(chr(34), "%22")}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        # an empty file can not be mapped
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self.mmap is not None and ADVISE:
+            self.mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self.content = memoryview(self.mmap) if self.mmap is not None else memoryview(b"")
+        self.parts = (memoryview(head), self.content, memoryview(tail))
+        self.length = len(head) + size + len(tail)
+        self.position = 0
+        self.dropped = 0
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            block = self.read(self.block_size)
+            if not block:
+                return
+            yield block
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # requests rewinds the body before sending it again after a redirect
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.length
+        self.position = min(max(offset, 0), self.length)
+        return self.position
+
+    def read(self, size=-1):
+        """
+        Like a raw file the read can return fewer bytes than asked, it stops at the end of the head,
+        the content or the tail of the body
+        :param size: (int) bytes wanted, block_size when negative
+        :return: (memoryview) next bytes of the body, empty at the end
+        """
+        if size is None or size < 0:
+            size = self.block_size
+        start = 0
+        for part in self.parts:
+            if self.position < start + len(part):
+                offset = self.position - start
+                block = part[offset:offset + size]
+                self.position += len(block)
+                if part is self.content and ADVISE:
+                    self._drop_sent_pages(offset)
+                return block
+            start += len(part)
+        return memoryview(b"")
+
+    def readinto(self, buffer):
+        block = self.read(len(buffer))
+        buffer[:len(block)] = block
+        return len(block)
+
+    def close(self):
+        if self.closed:
+            return
+        self.content.release()
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # a block is still referenced, the mapping is released with it
+                LOGGER.debug("Upload of %s still referenced, mapping left to the garbage collector", self.file.name)
+        self.file.close()
+        super().close()
+
+    def _drop_sent_pages(self, offset):
+        # the pages behind the current read were sent, the kernel keeps them cached and the process stops counting them
+        sent = offset - offset % mmap.PAGESIZE
+        if sent - self.dropped >= 8 * self.block_size:
+            self.mmap.madvise(mmap.MADV_DONTNEED, self.dropped, sent - self.dropped)
+            self.dropped = sent
+
+
+def upload_attachment(issue_id, path, filename=None, content_type=None, rest_client=None):
+    """
+    Attach a file to an issue, the file is streamed from disk and never loaded in memory
+    :param issue_id: (str) id or key of the issue
+    :param path: (str) file to upload
+    :param filename: (str) name of the attachment, the name of the file by default
+    :param content_type: (str) mime type of the file, guessed from the filename by default
+    :param rest_client: (RestClient) client sending the request, the shared one by default
+    :return: RestResponse, its body is the list of the attachments created
+    """
+    rest_client = rest_client or get_rest_client()
+    with MultipartFileBody(path, filename, content_type) as body:
+        return rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/{issue_id}/attachments",
+            headers={**attachment_headers, "Content-Type": body.content_type},
+            auth=auth,
+            data=body
+        )
+
+
+def download_attachment(attachment_id, path, chunk_size=attachment_chunk_size, rest_client=None):
+    """
+    Write the content of an attachment to a file chunk by chunk
+    :param attachment_id: (str) id of the attachment
+    :param path: (str) file written, removed when the download or the write fails
+    :param chunk_size: (int) bytes read from the connection and written at once
+    :param rest_client: (RestClient) client sending the request, the shared one by default
+    :return: Download
+    """
+    rest_client = rest_client or get_rest_client()
+    response = rest_client.send_request(
+        "GET",
+        url=f"{url_base}attachment/content/{attachment_id}",
+        headers={"Accept": "*/*"},
+        auth=auth,
+        stream=True
+    )
+    if response.status_code != 200:
+        return Download(response, None, None)
+    digest = hashlib.sha256()
+    size = 0
+    f = None
+    try:
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except Exception as e:
+        # the connection dropped or the file could not be written (disk full), no truncated file is left behind
+        LOGGER.error("Download of attachment %s interrupted after %s bytes: %s", attachment_id, size, e)
+        if f is not None:
+            os.remove(path)
+        return Download(response, None, None)
+    finally:
+        response.close()
+    return Download(response, size, digest.hexdigest())
+
+
+def file_sha256(path, chunk_size=attachment_chunk_size):
+    """
+    :return: (str) sha256 of a file, read chunk by chunk
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
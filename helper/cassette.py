@@ -0,0 +1,439 @@
+"""
+cassette.py
+Record every request/response pair to disk and serve them back without calling Jira
+"""
+import atexit
+import glob
+import hashlib
+import io
+import json
+import logging
+import mmap
+import pathlib
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.structures import CaseInsensitiveDict
+
+from config.config import cassette_mode, cassette_path, cassette_latency, xdist_worker
+from helper.endpoints import normalize_endpoint, endpoint_ids
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+# never written to a cassette
+SENSITIVE_HEADERS = ("authorization", "cookie", "set-cookie", "proxy-authorization")
+# larger bodies, attachment downloads mostly, are kept in a file of their own next to the cassette
+INLINE_CONTENT_LIMIT = 1024 * 1024
+# ids of the resources returned by a response, a replayed request referencing them expects them to exist
+RESPONSE_ID = re.compile(rb'"(?:id|key)"\s*:\s*"([^"]+)"')
+
+_shared_cassette = None
+_shared_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """
+    Process-wide cassette used by the rest clients, None when CASSETTE_MODE is off
+    :return: Cassette
+    """
+    global _shared_cassette
+    if cassette_mode == OFF:
+        return None
+    with _shared_cassette_lock:
+        if _shared_cassette is None:
+            if cassette_mode == RECORD:
+                # every xdist worker records its own file, replay loads all of them
+                path = f"{cassette_path}_{xdist_worker}" if xdist_worker else cassette_path
+                _shared_cassette = Cassette.record(path)
+                # the cleanup requests run after the rest client is closed, the index is written at exit
+                atexit.register(_shared_cassette.close)
+            else:
+                _shared_cassette = Cassette.replay(cassette_path, recorded_latency=cassette_latency == "recorded")
+        return _shared_cassette
+
+
+def request_key(method, url, body, authenticated):
+    """
+    Key of a request: method, path with the sorted query, a hash of the JSON body and whether it
+    had credentials. The host is left out, a cassette recorded against Jira can be replayed with any url_base
+    :param method: (str) http method
+    :param url: (str) full url
+    :param body: (dict|bytes|str) json body, None when the request has no body
+    :param authenticated: (bool) the request was sent with credentials
+    :return: (str) key
+    """
+    parts = urlsplit(str(url))
+    query = urlencode(sorted((key, value.lower() if value in ("True", "False") else value)
+                             for key, value in parse_qsl(parts.query)))
+    return f"{method} {parts.path}?{query} {_body_hash(body)} {_auth_flag(authenticated)}"
+
+
+def template_key(method, url, body, authenticated):
+    """
+    Key used when the exact request was not recorded, e.g. ids created by another run or bodies built with
+    random data: method, endpoint template, the structure of the body without its values and the credentials.
+    A missing, misspelled or larger body has another structure and does not match
+    :return: (str) key
+    """
+    return f"{method} {normalize_endpoint(url)} {_body_shape(body)} {_auth_flag(authenticated)}"
+
+
+def _auth_flag(authenticated):
+    return "auth" if authenticated else "anonymous"
+
+
+def _body_hash(body):
+    if hasattr(body, "read"):
+        # a streamed upload is not read twice, its requests match on method, path and query
+        return "stream"
+    if body is None:
+        return "-"
+    if isinstance(body, (bytes, str)):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = body.decode("utf-8", "surrogateescape") if isinstance(body, bytes) else body
+            return hashlib.sha1(body.encode("utf-8", "surrogateescape")).hexdigest()
+    return hashlib.sha1(json.dumps(body, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _body_shape(body):
+    if hasattr(body, "read"):
+        return "stream"
+    if body is None:
+        return "-"
+    if isinstance(body, (bytes, str)):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return "raw"
+    return hashlib.sha1(json.dumps(_shape(body), separators=(",", ":")).encode()).hexdigest()
+
+
+def _shape(value):
+    # keys and types are kept, the lists keep their length
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in sorted(value.items())}
+    if isinstance(value, list):
+        return [_shape(item) for item in value]
+    return type(value).__name__
+
+
+def _status_class(status_code):
+    return status_code // 100 if status_code else None
+
+
+class Cassette:
+    def __init__(self, path, mode, recorded_latency=False):
+        """
+        Cassette files: <path>.data holds one JSON record per line, <path>.index maps the request keys to
+        the offset, length and status code of their records in the data file, <path>.bodies holds the
+        bodies larger than INLINE_CONTENT_LIMIT
+        :param path: (str) cassette path without extension
+        :param mode: (str) record or replay
+        :param recorded_latency: (bool) replayed responses wait the time measured when recording
+        """
+        self.path = path
+        self.mode = mode
+        self.recorded_latency = recorded_latency
+        self.lock = threading.Lock()
+        # key -> list of (data file number, offset, length, status code)
+        self.index = {}
+        self.cursors = {}
+        # ids returned by the responses played, see play
+        self.known_ids = set()
+        self.paths = []
+        self.data_files = []
+        self.maps = []
+        self.writer = None
+        self.offset = 0
+        self.records = 0
+        self.closed = False
+
+    @classmethod
+    def record(cls, path):
+        # the files are created with the first response, the xdist controller never sends a request
+        return cls(path, RECORD)
+
+    @classmethod
+    def replay(cls, path, recorded_latency=False):
+        cassette = cls(path, REPLAY, recorded_latency)
+        # the base cassette plus the ones recorded by xdist workers
+        for index_file in sorted(glob.glob(f"{glob.escape(path)}.index") + glob.glob(f"{glob.escape(path)}_gw*.index")):
+            cassette._load(index_file[:-len(".index")])
+        LOGGER.info("Replaying cassette %s: %s files", path, len(cassette.maps))
+        return cassette
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def save(self, method, url, body, authenticated, status_code, reason, headers, content, elapsed):
+        """
+        Append a response to the cassette, the credentials of the request are never written
+        :param authenticated: (bool) the request was sent with credentials
+        :param content: (bytes|file) raw body of the response, or a file holding it positioned at its end
+        :param elapsed: (float) response time in seconds
+        """
+        record = {
+            "method": method,
+            "url": str(url),
+            "status_code": status_code,
+            "reason": reason,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in SENSITIVE_HEADERS},
+            "content": "",
+            "elapsed": elapsed
+        }
+        if hasattr(content, "read"):
+            size = content.tell()
+            content.seek(0)
+            if size > INLINE_CONTENT_LIMIT:
+                record["content_file"] = self._save_content(content)
+                content = b""
+            else:
+                content = content.read(size)
+        record["content"] = content.decode("utf-8", "surrogateescape")
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8", "surrogateescape") + b"\n"
+        with self.lock:
+            if self.closed:
+                return
+            if self.writer is None:
+                pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self.writer = open(f"{self.path}.data", "wb")
+                LOGGER.info("Recording cassette %s", self.path)
+            self.writer.write(line)
+            location = (0, self.offset, len(line), status_code)
+            self.offset += len(line)
+            self.records += 1
+            for key in (request_key(method, url, body, authenticated), template_key(method, url, body, authenticated)):
+                self.index.setdefault(key, []).append(location)
+
+    def play(self, method, url, body, authenticated):
+        """
+        Recorded response of a request. Repeated requests get the recorded responses in order, the last one is
+        served again once they run out. A request recorded with other ids or other values in its body gets a
+        response of its endpoint template and body structure with the status class it expects, see
+        _template_locations
+        :return: (dict) record, its content is None and content_file the path of the body when it was saved
+                 apart, None when the request was not recorded
+        """
+        with self.lock:
+            key = request_key(method, url, body, authenticated)
+            locations = self.index.get(key)
+            if not locations:
+                key, locations = self._template_locations(method, url, body, authenticated)
+                if not locations:
+                    return None
+            position = self.cursors.get(key, 0)
+            self.cursors[key] = position + 1
+            file_number, offset, length, status_code = locations[min(position, len(locations) - 1)]
+            data = self.maps[file_number][offset:offset + length]
+            if _status_class(status_code) == 2:
+                self.known_ids.update(endpoint_ids(url))
+        record = json.loads(data.decode("utf-8", "surrogateescape"))
+        if record.get("content_file"):
+            record["content_file"] = f"{self.paths[file_number]}.bodies/{record['content_file']}"
+            record["content"] = None
+        else:
+            record["content"] = record["content"].encode("utf-8", "surrogateescape")
+            with self.lock:
+                self.known_ids.update(match.decode("utf-8", "replace") for match in RESPONSE_ID.findall(record["content"]))
+        return record
+
+    @staticmethod
+    def content(record):
+        """
+        :return: (bytes) body of a played record, read from its own file when it was saved apart
+        """
+        if record["content"] is None:
+            return pathlib.Path(record["content_file"]).read_bytes()
+        return record["content"]
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.writer is not None:
+                self.writer.close()
+                with open(f"{self.path}.index", "w", encoding="utf-8") as f:
+                    json.dump(self.index, f)
+                LOGGER.info("Cassette %s saved: %s records", self.path, self.records)
+            for data_map in self.maps:
+                data_map.close()
+            for data_file in self.data_files:
+                data_file.close()
+
+    def _template_locations(self, method, url, body, authenticated):
+        """
+        Records of the endpoint template of a request with the status class it expects: an error when an id of
+        its path was never returned by a response played before, the class of all the records when they agree,
+        a success when they do not and the ids are known
+        :return: (tuple) cursor key and locations, None and None when no record has the expected class
+        """
+        key = template_key(method, url, body, authenticated)
+        locations = self.index.get(key, ())
+        classes = {_status_class(location[3]) for location in locations}
+        ids = endpoint_ids(url)
+        if not self.known_ids.issuperset(ids):
+            expected = 4
+        elif len(classes) == 1:
+            expected = classes.pop()
+        elif ids:
+            expected = 2
+        else:
+            return None, None
+        locations = [location for location in locations if _status_class(location[3]) == expected]
+        return (f"{key} {expected}xx", locations) if locations else (None, None)
+
+    def _save_content(self, content):
+        """
+        Copy a large body to a file of the bodies directory
+        :return: (str) name of the file
+        """
+        directory = pathlib.Path(f"{self.path}.bodies")
+        directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".bin", delete=False) as f:
+            shutil.copyfileobj(content, f)
+        return pathlib.Path(f.name).name
+
+    def _load(self, path):
+        file_number = len(self.maps)
+        self.paths.append(path)
+        data_file = open(f"{path}.data", "rb")
+        self.data_files.append(data_file)
+        # the records are only read from the page cache when they are played
+        self.maps.append(mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) if data_file.seek(0, 2) else b"")
+        with open(f"{path}.index", encoding="utf-8") as f:
+            for key, locations in json.load(f).items():
+                self.index.setdefault(key, []).extend(
+                    (file_number, offset, length, status_code) for _, offset, length, status_code in locations
+                )
+
+
+class RecordingAdapter(BaseAdapter):
+    def __init__(self, cassette, adapter):
+        """
+        Transport adapter saving the responses received through another adapter
+        :param cassette: (Cassette) cassette in record mode
+        :param adapter: (HTTPAdapter) adapter sending the requests
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        response = self.adapter.send(request, **kwargs)
+
+        def save(content):
+            # elapsed is set by the session once the adapter returned, before the body is read
+            self.cassette.save(request.method, request.url, request.body, "Authorization" in request.headers,
+                               response.status_code, response.reason, response.headers, content,
+                               response.elapsed.total_seconds())
+        # the body is saved while the client reads it, a streamed download is never held in memory
+        response.raw = _TeeStream(response.raw, save)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class _TeeStream:
+    def __init__(self, raw, on_complete, chunk_size=64 * 1024):
+        """
+        urllib3 response whose body is copied to a spooled file as requests reads it, the file is passed
+        to on_complete once the body ended. A body closed before its end is read to the end first
+        :param raw: (urllib3.HTTPResponse) response being read
+        :param on_complete: (callable) receives the file holding the decoded body, positioned at its end
+        """
+        self.raw = raw
+        self.on_complete = on_complete
+        self.chunk_size = chunk_size
+        self.spool = tempfile.SpooledTemporaryFile(max_size=INLINE_CONTENT_LIMIT)
+        self.completed = False
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self.raw.stream(amt, decode_content=decode_content):
+            self.spool.write(chunk)
+            yield chunk
+        self._complete()
+
+    def read(self, amt=None, *args, **kwargs):
+        chunk = self.raw.read(amt, *args, **kwargs)
+        self.spool.write(chunk)
+        if amt is None or not chunk:
+            self._complete()
+        return chunk
+
+    def close(self):
+        if not self.completed:
+            try:
+                for chunk in self.raw.stream(self.chunk_size, decode_content=True):
+                    self.spool.write(chunk)
+            except Exception as e:
+                # nothing is saved of a body that could not be read to its end
+                LOGGER.error("Response not recorded, its body could not be read: %s", e)
+                self.completed = True
+                self.spool.close()
+            self._complete()
+        self.raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def _complete(self):
+        if self.completed:
+            return
+        self.completed = True
+        with self.spool:
+            self.on_complete(self.spool)
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, cassette):
+        """
+        Transport adapter answering the requests from a cassette, nothing is sent on the network
+        :param cassette: (Cassette) cassette in replay mode
+        """
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        record = self.cassette.play(request.method, request.url, request.body, "Authorization" in request.headers)
+        if record is None:
+            raise ConnectionError(f"Not recorded: no response of {request.method} {request.url} in the cassette", request=request)
+        if self.cassette.recorded_latency:
+            time.sleep(record["elapsed"])
+        response = Response()
+        response.status_code = record["status_code"]
+        response.reason = record["reason"]
+        response.headers = CaseInsensitiveDict(record["headers"])
+        if record["content"] is None:
+            # a large body is streamed from its file like it was from the connection
+            response.raw = open(record["content_file"], "rb")
+        else:
+            # requests reads and closes raw for a streamed request, the content is already there
+            response.raw = io.BytesIO(record["content"])
+            response._content = record["content"]
+            response._content_consumed = True
+        response.url = request.url
+        response.encoding = "utf-8"
+        response.elapsed = timedelta(seconds=record["elapsed"])
+        response.request = request
+        return response
+
+    def close(self):
+        pass
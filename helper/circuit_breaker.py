@@ -0,0 +1,102 @@
+"""
+circuit_breaker.py
+Circuit per endpoint: after consecutive failures the requests fail fast instead of waiting on a Jira that is down
+"""
+import logging
+import threading
+import time
+
+from config.config import breaker_failures, breaker_reset
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_shared_breaker = None
+_shared_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """
+    Process-wide circuit breaker, None when BREAKER_FAILURES is 0
+    :return: CircuitBreaker
+    """
+    global _shared_breaker
+    if not breaker_failures:
+        return None
+    with _shared_breaker_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        return _shared_breaker
+
+
+def is_failure(status_code):
+    # no response at all (connection error, timeout) or a server error, client errors are answers
+    return status_code is None or status_code >= 500
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        """
+        :param failure_threshold: (int) consecutive failures opening the circuit
+        :param reset_timeout: (float) seconds the circuit stays open before one probe request is let through
+        :param clock: (callable) monotonic clock, replaced in tests
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.circuits = {}
+        self.lock = threading.Lock()
+
+    def allow(self, key):
+        """
+        :param key: (str) endpoint of the request
+        :return: (bool) False when the request must fail fast
+        """
+        with self.lock:
+            circuit = self.circuits.get(key)
+            if circuit is None or circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN and self.clock() - circuit.opened_at >= self.reset_timeout:
+                # half open: this request probes the endpoint, the others keep failing fast until it answers
+                circuit.state = HALF_OPEN
+                LOGGER.info("Circuit of %s half open, probing", key)
+                return True
+            return False
+
+    def record(self, key, status_code):
+        """
+        :param key: (str) endpoint of the request
+        :param status_code: (int) status of the response, None when nothing was received
+        """
+        with self.lock:
+            circuit = self.circuits.setdefault(key, _Circuit())
+            if not is_failure(status_code):
+                if circuit.state != CLOSED:
+                    LOGGER.info("Circuit of %s closed", key)
+                circuit.state = CLOSED
+                circuit.failures = 0
+                return
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                if circuit.state != OPEN:
+                    LOGGER.warning("Circuit of %s open after %s consecutive failures", key, circuit.failures)
+                circuit.state = OPEN
+                circuit.opened_at = self.clock()
+
+    def state(self, key):
+        with self.lock:
+            circuit = self.circuits.get(key)
+            return CLOSED if circuit is None else circuit.state
@@ -0,0 +1,180 @@
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+
+from config.config import url_base, headers, auth, cleanup_retries, cleanup_backoff, cleanup_bulk
+from helper.async_rest_client import AsyncRestClient
+from helper.rate_limiter import parse_retry_after
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+Resource = namedtuple("Resource", ["kind", "resource_id", "url"])
+
+# children are removed before their parents
+KIND_ORDER = ("comment", "worklog", "attachment", "issue", "project")
+# Jira bulk delete accepts up to 1000 issues per request
+BULK_DELETE_LIMIT = 1000
+
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_cleanup_registry():
+    """
+    Process-wide registry, every resource created during the session is recorded here
+    :return: CleanupRegistry
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = CleanupRegistry()
+        return _shared_registry
+
+
+class CleanupReport:
+    def __init__(self):
+        self.deleted = []
+        # issues handed to a Jira bulk delete task, it deletes them in the background after answering
+        self.submitted = []
+        self.already_gone = []
+        self.leaked = []
+
+    def __repr__(self):
+        return f"<CleanupReport deleted={len(self.deleted)} submitted={len(self.submitted)} already_gone={len(self.already_gone)} leaked={len(self.leaked)}>"
+
+
+class CleanupRegistry:
+    def __init__(self, async_client=None, retries=cleanup_retries, backoff=cleanup_backoff, bulk=cleanup_bulk):
+        """
+        Records created resources and deletes them concurrently at the end of the session
+        :param async_client: (AsyncRestClient) client used to send the deletes
+        :param retries: (int) retries for deletes failing with 429, 5xx or connection errors
+        :param backoff: (float) seconds before the first retry, doubled on every retry
+        :param bulk: (bool) delete issues through the Jira bulk delete endpoint
+        """
+        self.async_client = async_client or AsyncRestClient()
+        self.retries = retries
+        self.backoff = backoff
+        self.bulk = bulk
+        self.resources = []
+        self.lock = threading.Lock()
+
+    def register(self, kind, resource_id, url):
+        with self.lock:
+            self.resources.append(Resource(kind, resource_id, url))
+
+    def register_project(self, project_id):
+        self.register("project", project_id, f"{url_base}project/{project_id}")
+
+    def register_issue(self, issue_id):
+        self.register("issue", issue_id, f"{url_base}issue/{issue_id}")
+
+    def register_comment(self, issue_id, comment_id):
+        self.register("comment", comment_id, f"{url_base}issue/{issue_id}/comment/{comment_id}")
+
+    def register_worklog(self, issue_id, worklog_id):
+        self.register("worklog", worklog_id, f"{url_base}issue/{issue_id}/worklog/{worklog_id}")
+
+    def register_attachment(self, attachment_id):
+        self.register("attachment", attachment_id, f"{url_base}attachment/{attachment_id}")
+
+    def cleanup(self):
+        """
+        Delete every registered resource, children first
+        :return: CleanupReport
+        """
+        with self.lock:
+            resources = list(dict.fromkeys(self.resources))
+            self.resources.clear()
+        report = CleanupReport()
+        for kind in KIND_ORDER:
+            batch = [resource for resource in resources if resource.kind == kind]
+            if kind == "issue" and self.bulk:
+                batch = self._bulk_delete_issues(batch, report)
+            self._delete_concurrently(batch, report)
+        self._log_report(report)
+        return report
+
+    def _delete_concurrently(self, batch, report):
+        attempt = 0
+        while batch:
+            responses = self.async_client.send_many([
+                {"method_name": "DELETE", "url": resource.url, "auth": auth}
+                for resource in batch
+            ])
+            retry = []
+            retry_after = 0
+            for resource, response in zip(batch, responses):
+                status_code = response["status_code"]
+                if status_code in (200, 202, 204):
+                    report.deleted.append(resource)
+                elif status_code == 404:
+                    report.already_gone.append(resource)
+                elif status_code is None or status_code == 429 or status_code >= 500:
+                    retry.append(resource)
+                    retry_after = max(retry_after, self._retry_after(response) or 0)
+                else:
+                    LOGGER.error("Could not delete %s %s: %s", resource.kind, resource.resource_id, status_code)
+                    report.leaked.append(resource)
+            if retry and attempt < self.retries:
+                delay = self.backoff * 2 ** attempt
+                delay += random.uniform(0, delay)
+                # never shorter than the Retry-After sent by Jira
+                delay = max(delay, retry_after)
+                LOGGER.debug("Retrying %s deletes in %.2f seconds", len(retry), delay)
+                time.sleep(delay)
+                attempt += 1
+                batch = retry
+            else:
+                report.leaked.extend(retry)
+                batch = []
+
+    def _bulk_delete_issues(self, batch, report):
+        """
+        Submit the issues to the bulk delete endpoint, the task deletes them after the response so they
+        are reported as submitted, not deleted
+        :return: (list) issues that have to be deleted one by one
+        """
+        chunks = [batch[i:i + BULK_DELETE_LIMIT] for i in range(0, len(batch), BULK_DELETE_LIMIT)]
+        responses = self.async_client.send_many([
+            {
+                "method_name": "POST",
+                "url": f"{url_base}bulk/issues/delete",
+                "headers": headers,
+                "auth": auth,
+                "body": {
+                    "selectedIssueIdsOrKeys": [resource.resource_id for resource in chunk],
+                    "sendBulkNotification": False
+                }
+            }
+            for chunk in chunks
+        ])
+        remaining = []
+        for chunk, response in zip(chunks, responses):
+            if response["status_code"] in (200, 201, 202):
+                LOGGER.debug("Bulk delete task submitted: %s", response["body"])
+                report.submitted.extend(chunk)
+            else:
+                LOGGER.debug("Bulk delete not available (%s), deleting one by one", response["status_code"])
+                remaining.extend(chunk)
+        return remaining
+
+    @staticmethod
+    def _retry_after(response):
+        """
+        :return: (float) seconds asked by the Retry-After or X-RateLimit-Reset header, None when missing
+        """
+        response_headers = {name.lower(): value for name, value in (response.get("headers") or {}).items()}
+        return parse_retry_after(response_headers.get("retry-after"), response_headers.get("x-ratelimit-reset"))
+
+    @staticmethod
+    def _log_report(report):
+        LOGGER.info(
+            "Cleanup: %s deleted, %s submitted to bulk delete, %s already gone, %s leaked",
+            len(report.deleted), len(report.submitted), len(report.already_gone), len(report.leaked)
+        )
+        for resource in report.leaked:
+            LOGGER.warning("Leaked %s %s: %s", resource.kind, resource.resource_id, resource.url)
@@ -0,0 +1,130 @@
+"""
+data_pool.py
+Seeded pools of fake data drawn in bulk: unique project keys, company names, sentences and words
+
+The seed of the session is printed in the pytest header, DATA_SEED=<seed> reproduces the data of that run.
+The xdist workers inherit the seed of the controller and draw disjoint project keys.
+"""
+import itertools
+import logging
+import math
+import os
+import random
+import string
+import threading
+
+from faker import Faker
+
+from config.config import data_pool_size, worker_index, xdist_worker_count
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+DATA_SEED_VARIABLE = "DATA_SEED"
+# texts generated by faker, drawn in turn from the pool
+TEXT_FIELDS = ("company", "sentence", "word")
+FIELDS = TEXT_FIELDS + ("project_key",)
+
+# project keys: one uppercase letter and 5 uppercase letters or digits, 26 * 36^5 different keys
+KEY_ALPHABET = string.digits + string.ascii_uppercase
+KEY_LENGTH = 6
+KEY_SPACE = 26 * 36 ** (KEY_LENGTH - 1)
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_data_pool():
+    """
+    Process-wide pool, the seed is chosen by the first process of the run
+    :return: DataPool
+    """
+    global _shared_pool
+    if _shared_pool is not None:
+        return _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            seed = int(os.environ.setdefault(DATA_SEED_VARIABLE, str(random.SystemRandom().randrange(2 ** 31))))
+            _shared_pool = DataPool(seed, worker_index, xdist_worker_count)
+            LOGGER.info("Data pool seed: %s", seed)
+        return _shared_pool
+
+
+class DataPool:
+    def __init__(self, seed, worker_index=0, worker_count=1, size=data_pool_size):
+        """
+        :param seed: (int) seed of the keys and texts, the same seed draws the same data
+        :param worker_index: (int) position of this process among the workers sharing the seed
+        :param worker_count: (int) processes sharing the seed, each one draws its own keys
+        :param size: (int) keys and texts generated at once
+        """
+        self.seed = seed
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.size = size
+        rng = random.Random(seed)
+        # i -> (multiplier * i + increment) mod KEY_SPACE visits every key once
+        self.multiplier = rng.randrange(1, KEY_SPACE)
+        while math.gcd(self.multiplier, KEY_SPACE) != 1:
+            self.multiplier = rng.randrange(1, KEY_SPACE)
+        self.increment = rng.randrange(KEY_SPACE)
+        self.keys = []
+        self.keys_drawn = 0
+        self.texts = {}
+        self.counters = {field: itertools.count() for field in TEXT_FIELDS}
+        self.faker = Faker()
+        self.lock = threading.Lock()
+
+    def project_key(self):
+        """
+        :return: (str) project key never returned before by any worker using the same seed
+        """
+        with self.lock:
+            if not self.keys:
+                self.keys = self._key_block(self.keys_drawn, self.size)
+                self.keys.reverse()
+                self.keys_drawn += self.size
+            return self.keys.pop()
+
+    def company(self):
+        return self.value("company")
+
+    def sentence(self):
+        return self.value("sentence")
+
+    def word(self):
+        return self.value("word")
+
+    def value(self, field):
+        """
+        :param field: (str) one of FIELDS
+        :return: (str) next value of the field
+        """
+        if field == "project_key":
+            return self.project_key()
+        texts = self.texts.get(field)
+        if texts is None:
+            texts = self._text_block(field)
+        return texts[next(self.counters[field]) % len(texts)]
+
+    def _key_block(self, start, count):
+        keys = []
+        for position in range(start, start + count):
+            # the workers take interleaved positions of the same sequence
+            value = (self.multiplier * (position * self.worker_count + self.worker_index) + self.increment) % KEY_SPACE
+            value, first = divmod(value, 26)
+            characters = [string.ascii_uppercase[first]]
+            for _ in range(KEY_LENGTH - 1):
+                value, digit = divmod(value, 36)
+                characters.append(KEY_ALPHABET[digit])
+            keys.append("".join(characters))
+        return keys
+
+    def _text_block(self, field):
+        with self.lock:
+            if field not in self.texts:
+                # seeded per field, the texts do not depend on which field is used first
+                self.faker.seed_instance(f"{self.seed}:{field}")
+                generate = getattr(self.faker, field)
+                self.texts[field] = tuple(generate() for _ in range(self.size))
+            return self.texts[field]
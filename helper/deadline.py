@@ -0,0 +1,39 @@
+"""
+deadline.py
+Time budget shared by every request made inside a block, e.g. a test and its fixtures
+
+    with request_deadline(60):
+        rest_client.send_request(...)   # timeouts never go past the deadline
+"""
+import contextlib
+import contextvars
+import time
+
+# monotonic time when the current budget runs out, None when there is no deadline
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextlib.contextmanager
+def request_deadline(seconds):
+    """
+    Give the requests of the block at most this many seconds, a nested deadline never extends the outer one
+    :param seconds: (float) budget of the block, 0 or None means no new deadline
+    """
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    :return: (float) seconds left before the deadline, negative once it passed, None without deadline
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
@@ -0,0 +1,27 @@
+import re
+from urllib.parse import urlsplit
+
+# numeric ids and issue keys (EXU-1) are replaced so the same endpoint is grouped together
+_ID_SEGMENT = re.compile(r"^(\d+|[A-Z][A-Z0-9]+-\d+)$")
+_API_PREFIX = re.compile(r"^/rest/api/\d+")
+
+
+def normalize_endpoint(url):
+    """
+    Endpoint template of a url, e.g. https://x.atlassian.net/rest/api/3/issue/EXU-1/comment/10 -> issue/{id}/comment/{id}
+    :param url: (str) full url of the request
+    :return: (str) endpoint template
+    """
+    path = _API_PREFIX.sub("", urlsplit(str(url)).path)
+    segments = ["{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.strip("/").split("/")]
+    return "/".join(segments)
+
+
+def endpoint_ids(url):
+    """
+    Ids and issue keys in the path of a url, the segments normalize_endpoint replaces
+    :param url: (str) full url of the request
+    :return: (list) ids in the order of the path
+    """
+    path = _API_PREFIX.sub("", urlsplit(str(url)).path)
+    return [segment for segment in path.strip("/").split("/") if _ID_SEGMENT.match(segment)]
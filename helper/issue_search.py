@@ -0,0 +1,142 @@
+"""
+issue_search.py
+Issues matching a JQL query, read page by page from /search and yielded one at a time
+
+    for issue in search_issues(f"project = {project_id}", fields=("summary",)):
+        ...
+
+While the caller consumes a page the next ones are already being requested, at most `prefetch`
+pages wait in memory whatever the number of issues found.
+sweep_issues deletes every issue matching a query, e.g. the issues leaked by crashed runs.
+"""
+import concurrent.futures
+import contextvars
+import logging
+import re
+from collections import deque
+
+from config.config import url_base, get_headers, auth, search_page_size, search_prefetch
+from helper.cleanup_registry import CleanupRegistry, CleanupReport, BULK_DELETE_LIMIT
+from helper.rest_client import get_rest_client
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+DEFAULT_FIELDS = ("summary",)
+# id, key and self come with every issue, asking for the id alone returns no field at all
+ID_FIELDS = ("id",)
+ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+
+class IssueSearchError(Exception):
+    def __init__(self, response):
+        """
+        :param response: (RestResponse) response of the failed page
+        """
+        self.response = response
+        super().__init__(f"Search failed with status {response.status_code}: {response.body}")
+
+
+def search_issues(jql, fields=DEFAULT_FIELDS, page_size=search_page_size, prefetch=search_prefetch, limit=None, rest_client=None):
+    """
+    Issues matching the query, the pages after the first one are requested concurrently ahead of the caller.
+    The offsets of the pages come from the total of the first page, the query should order the issues
+    by a field that does not change while they are read, e.g. ORDER BY id
+    :param jql: (str) JQL query
+    :param fields: (tuple) fields returned with every issue, fewer fields keep the pages small
+    :param page_size: (int) issues per request, Jira may answer with fewer
+    :param prefetch: (int) pages requested ahead of the one being consumed, 0 reads them one after the other
+    :param limit: (int) stop after this many issues, no page past them is requested
+    :param rest_client: (RestClient) client sending the requests, the shared one by default
+    :return: (generator) issue dicts with id, key, self and the requested fields
+    :raise IssueSearchError: when Jira rejects the query or a page fails
+    """
+    rest_client = rest_client or get_rest_client()
+    params = {"jql": jql, "fields": ",".join(fields), "maxResults": page_size}
+    page = _search_page(rest_client, params, 0)
+    # Jira caps maxResults, the next offsets follow the page size it answered with
+    step = page["maxResults"] or page_size
+    total = page["total"] if limit is None else min(page["total"], limit)
+    LOGGER.debug("Search %r: %s issues, %s per page", jql, page["total"], step)
+    executor = concurrent.futures.ThreadPoolExecutor(prefetch, thread_name_prefix="issue-search") if prefetch else None
+    pending = deque()
+    next_start = step
+    yielded = 0
+    try:
+        while True:
+            while executor is not None and len(pending) < prefetch and next_start < total:
+                # the pages share the deadline of the caller
+                context = contextvars.copy_context()
+                pending.append(executor.submit(context.run, _search_page, rest_client, params, next_start))
+                next_start += step
+            for issue in page["issues"]:
+                if yielded == total:
+                    return
+                yield issue
+                yielded += 1
+            if not page["issues"]:
+                # issues deleted since the first page, the following pages would be empty as well
+                return
+            if pending:
+                page = pending.popleft().result()
+            elif next_start < total:
+                page = _search_page(rest_client, params, next_start)
+                next_start += step
+            else:
+                return
+    finally:
+        if executor is not None:
+            # the caller stopped early or a page failed, the pages not started yet are never sent
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def sweep_issues(jql, batch_size=BULK_DELETE_LIMIT, prefetch=search_prefetch, rest_client=None, cleanup_registry=None):
+    """
+    Delete every issue matching the query in rounds of batch_size issues. Every round reads its issues
+    with a new search before deleting them, the deletes never shift the pages being read, and starts
+    after the highest id of the previous round so an issue still being deleted is not read twice
+    :param jql: (str) JQL query, its ORDER BY is replaced by the id order
+    :param batch_size: (int) issues read and deleted per round
+    :param prefetch: (int) pages requested ahead while a round is read
+    :param rest_client: (RestClient) client sending the searches, the shared one by default
+    :param cleanup_registry: (CleanupRegistry) registry sending the deletes, a new one by default so
+                             the resources of the session are not deleted with the sweep
+    :return: CleanupReport
+    """
+    rest_client = rest_client or get_rest_client()
+    cleanup_registry = cleanup_registry or CleanupRegistry()
+    condition = ORDER_BY.split(jql, maxsplit=1)[0].strip()
+    report = CleanupReport()
+    last_id = None
+    while True:
+        clauses = [f"({condition})"] if condition else []
+        if last_id is not None:
+            clauses.append(f"id > {last_id}")
+        query = " AND ".join(clauses) + " ORDER BY id ASC"
+        found = 0
+        for issue in search_issues(query, ID_FIELDS, prefetch=prefetch, limit=batch_size, rest_client=rest_client):
+            cleanup_registry.register_issue(issue["id"])
+            last_id = issue["id"]
+            found += 1
+        if not found:
+            break
+        round_report = cleanup_registry.cleanup()
+        report.deleted.extend(round_report.deleted)
+        report.submitted.extend(round_report.submitted)
+        report.already_gone.extend(round_report.already_gone)
+        report.leaked.extend(round_report.leaked)
+    LOGGER.info("Sweep %r: %s", jql, report)
+    return report
+
+
+def _search_page(rest_client, params, start_at):
+    response = rest_client.send_request(
+        "GET",
+        url=f"{url_base}search",
+        headers=get_headers,
+        auth=auth,
+        params={**params, "startAt": start_at}
+    )
+    if response.status_code != 200:
+        raise IssueSearchError(response)
+    return response.body
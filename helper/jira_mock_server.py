@@ -0,0 +1,982 @@
+"""
+jira_mock_server.py
+Local stand-in of the Jira Cloud REST API used by the tests, keeps projects, issues, comments and worklogs in memory,
+the attachments in a temporary directory, and answers /search for a subset of JQL
+
+    python -m helper.jira_mock_server --port 8181
+"""
+import argparse
+import copy
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.INFO)
+
+API_PREFIX = "/rest/api/3"
+JSON_CONTENT_TYPE = "application/json;charset=UTF-8"
+PROJECT_KEY_PATTERN = re.compile(r"^[A-Z][A-Z0-9]{1,9}$")
+# project and issue of the Jira instance the tests were written against
+SEED_PROJECT_ID = "10033"
+SEED_PROJECT_KEY = "EXU"
+# uploads and downloads of attachments are copied in blocks of this size, whatever the size of the file
+ATTACHMENT_BLOCK_SIZE = 1024 * 1024
+MULTIPART_BOUNDARY = re.compile(r'boundary="?([^";]+)"?')
+# durations of the worklogs, Jira counts 8 hours in a day and 5 days in a week
+DURATION_UNITS = (("w", 5 * 8 * 3600), ("d", 8 * 3600), ("h", 3600), ("m", 60))
+DURATION_PATTERN = re.compile(r"^\s*(\d+\s*[wdhm]\s*)+$")
+# Jira caps the page size of /search whatever maxResults asks for
+SEARCH_MAX_RESULTS = 100
+SEARCH_DEFAULT_RESULTS = 50
+# Jira rejects a comment or a description whose serialized document is longer than this
+RICH_TEXT_LIMIT = 32767
+RICH_TEXT_TOO_LONG = f"The entered text is too long. It exceeds the allowed limit of {RICH_TEXT_LIMIT:,} characters."
+
+
+class JiraMockState:
+    def __init__(self, base_url):
+        """
+        In memory projects, issues, comments and worklogs. The handlers return copies taken under the lock,
+        a resource is serialized by its request thread while others may update it
+        :param base_url: (str) url of the server, used to build the "self" links
+        """
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.ids = itertools.count(20000)
+        self.projects = {}
+        self.issues = {}
+        self.comments = {}
+        self.worklogs = {}
+        # id -> (issue id, attachment, file path)
+        self.attachments = {}
+        self.attachment_dir = tempfile.mkdtemp(prefix="jira-mock-attachments-")
+        self.issue_counters = {}
+        # key -> id, issues and projects are looked up by both
+        self.project_keys = {}
+        self.issue_keys = {}
+        # parent id -> child ids, used by the cascading deletes
+        self.project_issues = defaultdict(set)
+        self.issue_comments = defaultdict(set)
+        self.issue_worklogs = defaultdict(set)
+        self.issue_attachments = defaultdict(set)
+        self._add_project(SEED_PROJECT_ID, SEED_PROJECT_KEY, "Exu project", "business")
+        self._add_issue(str(next(self.ids)), SEED_PROJECT_ID, "Seed issue")
+
+    def create_project(self, body):
+        errors = {}
+        key = body.get("key", "")
+        if not PROJECT_KEY_PATTERN.match(key):
+            errors["projectKey"] = "Project keys must start with an uppercase letter, followed by one or more uppercase alphanumeric characters."
+        if not body.get("name"):
+            errors["projectName"] = "You must specify a valid project name."
+        with self.lock:
+            if key in self.project_keys:
+                errors["projectKey"] = f"Project '{key}' uses this project key."
+            if errors:
+                return 400, {"errorMessages": [], "errors": errors}
+            project = self._add_project(str(next(self.ids)), key, body["name"], body.get("projectTypeKey", "business"))
+        return 201, {"self": project["self"], "id": int(project["id"]), "key": key}
+
+    def get_project(self, project_id):
+        with self.lock:
+            project = self._find_project(project_id)
+            if project is None:
+                return 404, {"errorMessages": [f"No project could be found with key '{project_id}'."], "errors": {}}
+            return 200, copy.deepcopy(project)
+
+    def update_project(self, project_id, body):
+        with self.lock:
+            project = self._find_project(project_id)
+            if project is None:
+                return 404, {"errorMessages": [f"No project could be found with key '{project_id}'."], "errors": {}}
+            for field in ("name", "description"):
+                if field in body:
+                    project[field] = body[field]
+            return 200, copy.deepcopy(project)
+
+    def delete_project(self, project_id):
+        with self.lock:
+            project = self._find_project(project_id)
+            if project is None:
+                return 404, {"errorMessages": [f"No project could be found with key '{project_id}'."], "errors": {}}
+            del self.projects[project["id"]]
+            del self.project_keys[project["key"]]
+            for issue_id in self.project_issues.pop(project["id"], ()):
+                self._remove_issue(self.issues[issue_id])
+        return 204, None
+
+    def create_issue(self, body):
+        fields = body.get("fields", {})
+        project_id = str(fields.get("project", {}).get("id", ""))
+        errors = {}
+        if not fields.get("summary"):
+            errors["summary"] = "You must specify a summary of the issue."
+        if _too_long(fields.get("description")):
+            errors["description"] = RICH_TEXT_TOO_LONG
+        with self.lock:
+            if project_id not in self.projects:
+                errors["project"] = "Specify a valid project ID or key"
+            if errors:
+                return 400, {"errorMessages": [], "errors": errors}
+            issue = self._add_issue(str(next(self.ids)), project_id, fields["summary"], fields.get("description"))
+        return 201, {"id": issue["id"], "key": issue["key"], "self": issue["self"]}
+
+    def get_issue(self, issue_id):
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            return 200, copy.deepcopy(issue)
+
+    def update_issue(self, issue_id, body, return_issue):
+        if _too_long(body.get("fields", {}).get("description")):
+            return 400, {"errorMessages": [], "errors": {"description": RICH_TEXT_TOO_LONG}}
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            issue["fields"].update(body.get("fields", {}))
+            issue["fields"]["updated"] = _now()
+            return (200, copy.deepcopy(issue)) if return_issue else (204, None)
+
+    def delete_issue(self, issue_id):
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            self._remove_issue(issue)
+        return 204, None
+
+    def add_comment(self, issue_id, body):
+        if not isinstance(body.get("body"), dict):
+            return 400, {"errorMessages": ["Comment body can not be empty!"]}
+        if _too_long(body["body"]):
+            return 400, {"errorMessages": [], "errors": {"comment": RICH_TEXT_TOO_LONG}}
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            comment_id = str(next(self.ids))
+            now = _now()
+            comment = {
+                "self": f"{self.base_url}{API_PREFIX}/issue/{issue['id']}/comment/{comment_id}",
+                "id": comment_id,
+                "author": self._user(),
+                "body": body["body"],
+                "updateAuthor": self._user(),
+                "created": now,
+                "updated": now,
+                "jsdPublic": True
+            }
+            self.comments[comment_id] = (issue["id"], comment)
+            self.issue_comments[issue["id"]].add(comment_id)
+            return 201, copy.deepcopy(comment)
+
+    def get_comment(self, issue_id, comment_id):
+        with self.lock:
+            comment = self._find_comment(issue_id, comment_id)
+            if comment is None:
+                return 404, {"errorMessages": ["Can not find a comment for the id: " + comment_id + "."], "errors": {}}
+            return 200, copy.deepcopy(comment)
+
+    def update_comment(self, issue_id, comment_id, body):
+        if not isinstance(body.get("body"), dict):
+            return 400, {"errorMessages": ["Comment body can not be empty!"]}
+        if _too_long(body["body"]):
+            return 400, {"errorMessages": [], "errors": {"comment": RICH_TEXT_TOO_LONG}}
+        with self.lock:
+            comment = self._find_comment(issue_id, comment_id)
+            if comment is None:
+                return 404, {"errorMessages": ["Can not find a comment for the id: " + comment_id + "."], "errors": {}}
+            comment["body"] = body["body"]
+            comment["updated"] = _now()
+            return 200, copy.deepcopy(comment)
+
+    def delete_comment(self, issue_id, comment_id):
+        with self.lock:
+            comment = self._find_comment(issue_id, comment_id)
+            if comment is None:
+                return 404, {"errorMessages": ["Can not find a comment for the id: " + comment_id + "."], "errors": {}}
+            owner_id, _ = self.comments.pop(comment_id)
+            self.issue_comments[owner_id].discard(comment_id)
+        return 204, None
+
+    def add_worklog(self, issue_id, body):
+        seconds, error = _time_spent(body)
+        if error is not None:
+            return 400, {"errorMessages": [], "errors": {"timeLogged": error}}
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            worklog_id = str(next(self.ids))
+            now = _now()
+            worklog = {
+                "self": f"{self.base_url}{API_PREFIX}/issue/{issue['id']}/worklog/{worklog_id}",
+                "author": self._user(),
+                "updateAuthor": self._user(),
+                "created": now,
+                "updated": now,
+                "started": body.get("started") or now,
+                "timeSpent": _format_duration(seconds),
+                "timeSpentSeconds": seconds,
+                "id": worklog_id,
+                "issueId": issue["id"]
+            }
+            if "comment" in body:
+                worklog["comment"] = body["comment"]
+            self.worklogs[worklog_id] = (issue["id"], worklog)
+            self.issue_worklogs[issue["id"]].add(worklog_id)
+            return 201, copy.deepcopy(worklog)
+
+    def get_worklog(self, issue_id, worklog_id):
+        with self.lock:
+            worklog = self._find_worklog(issue_id, worklog_id)
+            if worklog is None:
+                return 404, {"errorMessages": [f"Cannot find worklog with id: {worklog_id}."], "errors": {}}
+            return 200, copy.deepcopy(worklog)
+
+    def update_worklog(self, issue_id, worklog_id, body):
+        seconds, error = _time_spent(body) if "timeSpent" in body or "timeSpentSeconds" in body else (None, None)
+        if error is not None:
+            return 400, {"errorMessages": [], "errors": {"timeLogged": error}}
+        with self.lock:
+            worklog = self._find_worklog(issue_id, worklog_id)
+            if worklog is None:
+                return 404, {"errorMessages": [f"Cannot find worklog with id: {worklog_id}."], "errors": {}}
+            if seconds is not None:
+                worklog["timeSpent"] = _format_duration(seconds)
+                worklog["timeSpentSeconds"] = seconds
+            for field in ("started", "comment"):
+                if field in body:
+                    worklog[field] = body[field]
+            worklog["updated"] = _now()
+            return 200, copy.deepcopy(worklog)
+
+    def delete_worklog(self, issue_id, worklog_id):
+        with self.lock:
+            worklog = self._find_worklog(issue_id, worklog_id)
+            if worklog is None:
+                return 404, {"errorMessages": [f"Cannot find worklog with id: {worklog_id}."], "errors": {}}
+            owner_id, _ = self.worklogs.pop(worklog_id)
+            self.issue_worklogs[owner_id].discard(worklog_id)
+        return 204, None
+
+    def add_attachment(self, issue_id, filename, mime_type, path, size):
+        """
+        :param path: (str) file of the attachment content, already written in attachment_dir
+        :param size: (int) bytes of the file
+        """
+        with self.lock:
+            issue = self._find_issue(issue_id)
+            if issue is None:
+                os.remove(path)
+                return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+            attachment_id = str(next(self.ids))
+            attachment = {
+                "self": f"{self.base_url}{API_PREFIX}/attachment/{attachment_id}",
+                "id": attachment_id,
+                "filename": filename,
+                "author": self._user(),
+                "created": _now(),
+                "size": size,
+                "mimeType": mime_type,
+                "content": f"{self.base_url}{API_PREFIX}/attachment/content/{attachment_id}"
+            }
+            self.attachments[attachment_id] = (issue["id"], attachment, path)
+            self.issue_attachments[issue["id"]].add(attachment_id)
+            # Jira answers with the list of the attachments uploaded by the request
+            return 200, [copy.deepcopy(attachment)]
+
+    def get_attachment(self, attachment_id):
+        with self.lock:
+            _, attachment, _ = self.attachments.get(attachment_id, (None, None, None))
+            if attachment is None:
+                return 404, {"errorMessages": [f"The attachment with id '{attachment_id}' does not exist"], "errors": {}}
+            return 200, copy.deepcopy(attachment)
+
+    def attachment_file(self, attachment_id):
+        """
+        :return: (tuple) attachment and path of its content, None when it does not exist
+        """
+        with self.lock:
+            _, attachment, path = self.attachments.get(attachment_id, (None, None, None))
+            return None if attachment is None else (copy.deepcopy(attachment), path)
+
+    def delete_attachment(self, attachment_id):
+        with self.lock:
+            if attachment_id not in self.attachments:
+                return 404, {"errorMessages": [f"The attachment with id '{attachment_id}' does not exist"], "errors": {}}
+            self._remove_attachment(attachment_id)
+        return 204, None
+
+    def close(self):
+        shutil.rmtree(self.attachment_dir, ignore_errors=True)
+
+    def search(self, jql, start_at, max_results, fields):
+        """
+        Page of the issues matching the query
+        :param jql: (str) query, see compile_jql for the supported subset
+        :param start_at: (int) index of the first issue of the page
+        :param max_results: (int) issues per page, capped to SEARCH_MAX_RESULTS
+        :param fields: (list) fields of the issues returned, all of them when empty
+        """
+        try:
+            matches, sort_key, descending = compile_jql(jql)
+        except JqlError as e:
+            return 400, {"errorMessages": [str(e)], "errors": {}}
+        if start_at < 0 or max_results < 0:
+            return 400, {"errorMessages": ["startAt and maxResults must not be negative"], "errors": {}}
+        max_results = min(max_results, SEARCH_MAX_RESULTS)
+        all_fields = not fields or "*all" in fields or "*navigable" in fields
+        with self.lock:
+            found = [issue for issue in self.issues.values() if matches(issue)]
+            found.sort(key=sort_key, reverse=descending)
+            issues = [
+                {
+                    "expand": issue["expand"],
+                    "id": issue["id"],
+                    "self": issue["self"],
+                    "key": issue["key"],
+                    "fields": copy.deepcopy(issue["fields"]) if all_fields else {
+                        name: issue["fields"][name] for name in fields if name in issue["fields"]
+                    }
+                }
+                for issue in found[start_at:start_at + max_results]
+            ]
+        return 200, {"expand": "names,schema", "startAt": start_at, "maxResults": max_results, "total": len(found), "issues": issues}
+
+    def _add_project(self, project_id, key, name, project_type):
+        project_self = f"{self.base_url}{API_PREFIX}/project/{project_id}"
+        project = {
+            "expand": "description,lead,issueTypes,url,projectKeys,permissions,insight",
+            "self": project_self,
+            "id": project_id,
+            "key": key,
+            "description": "",
+            "lead": {key: value for key, value in self._user().items() if key in ("self", "accountId", "avatarUrls", "displayName", "active")},
+            "components": [],
+            "issueTypes": [{
+                "self": f"{self.base_url}{API_PREFIX}/issuetype/10034",
+                "id": "10034",
+                "description": "A small, distinct piece of work.",
+                "iconUrl": f"{self.base_url}/images/icons/issuetypes/task.svg",
+                "name": "Task",
+                "subtask": False,
+                "avatarId": 10318,
+                "hierarchyLevel": 0
+            }],
+            "assigneeType": "UNASSIGNED",
+            "versions": [],
+            "name": name,
+            "roles": {
+                "atlassian-addons-project-access": f"{project_self}/role/10003",
+                "Administrators": f"{project_self}/role/10002"
+            },
+            "avatarUrls": self._avatar_urls(),
+            "projectTypeKey": project_type,
+            "simplified": False,
+            "style": "classic",
+            "isPrivate": False,
+            "properties": {}
+        }
+        self.projects[project_id] = project
+        self.project_keys[key] = project_id
+        self.issue_counters[project_id] = itertools.count(1)
+        return project
+
+    def _add_issue(self, issue_id, project_id, summary, description=None):
+        project = self.projects[project_id]
+        key = f"{project['key']}-{next(self.issue_counters[project_id])}"
+        now = _now()
+        issue = {
+            "expand": "renderedFields,names,schema,operations,editmeta,changelog,versionedRepresentations",
+            "id": issue_id,
+            "self": f"{self.base_url}{API_PREFIX}/issue/{issue_id}",
+            "key": key,
+            "fields": {
+                "summary": summary,
+                "issuetype": {"id": "10034", "name": "Task"},
+                "project": {"id": project_id, "key": project["key"], "name": project["name"]},
+                "created": now,
+                "updated": now
+            }
+        }
+        if description is not None:
+            issue["fields"]["description"] = description
+        self.issues[issue_id] = issue
+        self.issue_keys[key] = issue_id
+        self.project_issues[project_id].add(issue_id)
+        return issue
+
+    def _remove_issue(self, issue):
+        del self.issues[issue["id"]]
+        del self.issue_keys[issue["key"]]
+        self.project_issues.get(issue["fields"]["project"]["id"], set()).discard(issue["id"])
+        for comment_id in self.issue_comments.pop(issue["id"], ()):
+            del self.comments[comment_id]
+        for worklog_id in self.issue_worklogs.pop(issue["id"], ()):
+            del self.worklogs[worklog_id]
+        for attachment_id in list(self.issue_attachments.pop(issue["id"], ())):
+            self._remove_attachment(attachment_id)
+
+    def _remove_attachment(self, attachment_id):
+        issue_id, _, path = self.attachments.pop(attachment_id)
+        self.issue_attachments.get(issue_id, set()).discard(attachment_id)
+        # a download still sending the file keeps reading it, the space is freed once it is closed
+        os.remove(path)
+
+    def _find_project(self, project_id_or_key):
+        project_id = self.project_keys.get(project_id_or_key, project_id_or_key)
+        return self.projects.get(project_id)
+
+    def _find_issue(self, issue_id_or_key):
+        issue_id = self.issue_keys.get(issue_id_or_key, issue_id_or_key)
+        return self.issues.get(issue_id)
+
+    def _find_comment(self, issue_id_or_key, comment_id):
+        issue = self._find_issue(issue_id_or_key)
+        issue_id, comment = self.comments.get(comment_id, (None, None))
+        if issue is None or issue_id != issue["id"]:
+            return None
+        return comment
+
+    def _find_worklog(self, issue_id_or_key, worklog_id):
+        issue = self._find_issue(issue_id_or_key)
+        issue_id, worklog = self.worklogs.get(worklog_id, (None, None))
+        if issue is None or issue_id != issue["id"]:
+            return None
+        return worklog
+
+    def _user(self):
+        return {
+            "self": f"{self.base_url}{API_PREFIX}/user?accountId=mock-account",
+            "accountId": "mock-account",
+            "emailAddress": "mock@example.com",
+            "avatarUrls": self._avatar_urls(),
+            "displayName": "Mock User",
+            "active": True,
+            "timeZone": "UTC",
+            "accountType": "atlassian"
+        }
+
+    @staticmethod
+    def _avatar_urls():
+        return {size: f"https://avatar.example.com/{size}.png" for size in ("48x48", "24x24", "16x16", "32x32")}
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+def _too_long(document):
+    return document is not None and len(json.dumps(document, separators=(",", ":"))) > RICH_TEXT_LIMIT
+
+
+def _time_spent(body):
+    """
+    :return: (tuple) seconds of a worklog body and the error message when the time is missing or invalid
+    """
+    if "timeSpentSeconds" in body:
+        seconds = body["timeSpentSeconds"]
+        if isinstance(seconds, int) and not isinstance(seconds, bool) and seconds > 0:
+            return seconds, None
+        return None, "Invalid time duration entered."
+    time_spent = body.get("timeSpent")
+    if not time_spent:
+        return None, "You must indicate the time spent working."
+    if not isinstance(time_spent, str) or not DURATION_PATTERN.match(time_spent):
+        return None, "Invalid time duration entered."
+    units = dict(DURATION_UNITS)
+    seconds = sum(int(amount) * units[unit] for amount, unit in re.findall(r"(\d+)\s*([wdhm])", time_spent))
+    if not seconds:
+        return None, "Invalid time duration entered."
+    return seconds, None
+
+
+def _format_duration(seconds):
+    # Jira answers with the duration normalized to its largest units, e.g. 90m -> 1h 30m
+    parts = []
+    for unit, unit_seconds in DURATION_UNITS:
+        amount, seconds = divmod(seconds, unit_seconds)
+        if amount:
+            parts.append(f"{amount}{unit}")
+    return " ".join(parts) or "0m"
+
+
+class JqlError(ValueError):
+    pass
+
+
+JQL_TOKEN = re.compile(r"""\s*(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|'(?P<single>[^']*)'|(?P<operator>!=|!~|>=|<=|[=~<>(),])|(?P<word>[^\s=!~<>(),"']+))""")
+# values of an issue compared by the clauses of a field, the project and the issue type match their id or key/name
+JQL_FIELDS = {
+    "id": lambda issue: (int(issue["id"]),),
+    "key": lambda issue: (issue["key"],),
+    "issuekey": lambda issue: (issue["key"],),
+    "project": lambda issue: (issue["fields"]["project"]["id"], issue["fields"]["project"]["key"]),
+    "issuetype": lambda issue: (issue["fields"]["issuetype"]["id"], issue["fields"]["issuetype"]["name"]),
+    "summary": lambda issue: (issue["fields"]["summary"],),
+    "created": lambda issue: (issue["fields"]["created"],),
+    "updated": lambda issue: (issue["fields"]["updated"],),
+}
+JQL_COMPARISONS = {
+    "=": lambda values, value: value in values,
+    "!=": lambda values, value: value not in values,
+    "~": lambda values, value: any(value.lower() in str(v).lower() for v in values),
+    "!~": lambda values, value: not any(value.lower() in str(v).lower() for v in values),
+    ">": lambda values, value: values[0] > value,
+    ">=": lambda values, value: values[0] >= value,
+    "<": lambda values, value: values[0] < value,
+    "<=": lambda values, value: values[0] <= value,
+}
+
+
+def compile_jql(jql):
+    """
+    Predicate and order of the JQL subset understood by the mock: id, key, project, issuetype, summary,
+    created and updated clauses joined by AND, OR, NOT and parentheses, followed by ORDER BY
+    :param jql: (str) query
+    :return: (tuple) predicate receiving an issue, sort key of the issues, descending order
+    """
+    tokens = []
+    position = 0
+    jql = jql.strip()
+    while position < len(jql):
+        match = JQL_TOKEN.match(jql, position)
+        if match is None or match.end() == position:
+            raise JqlError(f"Error in the JQL Query: unexpected character at position {position}.")
+        position = match.end()
+        if match["operator"] is not None:
+            tokens.append(("operator", match["operator"]))
+        elif match["word"] is not None:
+            tokens.append(("word", match["word"]))
+        else:
+            tokens.append(("value", match["quoted"] if match["quoted"] is not None else match["single"]))
+    parser = _JqlParser(tokens)
+    predicate = parser.parse_query() if tokens and not parser.at_keyword("order") else (lambda issue: True)
+    sort_key, descending = parser.parse_order()
+    if parser.position != len(tokens):
+        raise JqlError(f"Error in the JQL Query: unexpected '{tokens[parser.position][1]}'.")
+    return predicate, sort_key, descending
+
+
+class _JqlParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse_query(self):
+        clauses = [self.parse_and()]
+        while self.at_keyword("or"):
+            self.position += 1
+            clauses.append(self.parse_and())
+        return clauses[0] if len(clauses) == 1 else (lambda issue: any(clause(issue) for clause in clauses))
+
+    def parse_and(self):
+        clauses = [self.parse_not()]
+        while self.at_keyword("and"):
+            self.position += 1
+            clauses.append(self.parse_not())
+        return clauses[0] if len(clauses) == 1 else (lambda issue: all(clause(issue) for clause in clauses))
+
+    def parse_not(self):
+        if self.at_keyword("not"):
+            self.position += 1
+            clause = self.parse_not()
+            return lambda issue: not clause(issue)
+        if self.at_operator("("):
+            self.position += 1
+            clause = self.parse_query()
+            self.expect_operator(")")
+            return clause
+        return self.parse_clause()
+
+    def parse_clause(self):
+        field, values = self.parse_field()
+        negated = self.at_keyword("not")
+        if negated:
+            self.position += 1
+        if self.at_keyword("in"):
+            self.position += 1
+            self.expect_operator("(")
+            expected = [self.parse_value(field)]
+            while self.at_operator(","):
+                self.position += 1
+                expected.append(self.parse_value(field))
+            self.expect_operator(")")
+            return lambda issue: any(value in expected for value in values(issue)) != negated
+        if negated:
+            raise JqlError("Error in the JQL Query: expecting 'IN' after 'NOT'.")
+        operator = self.next_token("operator")
+        compare = JQL_COMPARISONS.get(operator)
+        if compare is None:
+            raise JqlError(f"Error in the JQL Query: the operator '{operator}' is not supported.")
+        value = self.parse_value(field)
+        return lambda issue: compare(values(issue), value)
+
+    def parse_field(self):
+        field = self.next_token("word").lower()
+        if field not in JQL_FIELDS:
+            raise JqlError(f"Field '{field}' does not exist or you do not have permission to view it.")
+        return field, JQL_FIELDS[field]
+
+    def parse_value(self, field):
+        if self.position < len(self.tokens) and self.tokens[self.position][0] in ("word", "value"):
+            value = self.tokens[self.position][1]
+            self.position += 1
+        else:
+            raise JqlError(f"Error in the JQL Query: expecting a value for '{field}'.")
+        if field == "id":
+            try:
+                return int(value)
+            except ValueError:
+                raise JqlError(f"Error in the JQL Query: '{value}' is not a valid issue id.") from None
+        return value
+
+    def parse_order(self):
+        if not self.at_keyword("order"):
+            # without ORDER BY the pages follow the creation order, stable across requests
+            return JQL_FIELDS["id"], False
+        self.position += 1
+        if not self.at_keyword("by"):
+            raise JqlError("Error in the JQL Query: expecting 'BY' after 'ORDER'.")
+        self.position += 1
+        _, values = self.parse_field()
+        descending = self.at_keyword("desc")
+        if descending or self.at_keyword("asc"):
+            self.position += 1
+        return (lambda issue: values(issue)[-1]), descending
+
+    def next_token(self, kind):
+        if self.position >= len(self.tokens) or self.tokens[self.position][0] != kind:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of the query"
+            raise JqlError(f"Error in the JQL Query: unexpected '{found}'.")
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def expect_operator(self, operator):
+        if self.next_token("operator") != operator:
+            raise JqlError(f"Error in the JQL Query: expecting '{operator}'.")
+
+    def at_keyword(self, keyword):
+        return (
+            self.position < len(self.tokens) and self.tokens[self.position][0] == "word"
+            and self.tokens[self.position][1].lower() == keyword
+        )
+
+    def at_operator(self, operator):
+        return self.position < len(self.tokens) and self.tokens[self.position] == ("operator", operator)
+
+
+class JiraMockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connections of the pooled clients open
+    protocol_version = "HTTP/1.1"
+    server_version = "JiraMock/1.0"
+    # headers and body leave in one write, flushed after every request
+    wbufsize = 64 * 1024
+
+    def setup(self):
+        super().setup()
+        # without it small keep-alive responses wait for the delayed ACK of the client
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    ROUTES = (
+        ("POST", re.compile(r"^/project$"), "create_project"),
+        ("GET", re.compile(r"^/project/(?P<project_id>[^/]+)$"), "get_project"),
+        ("PUT", re.compile(r"^/project/(?P<project_id>[^/]+)$"), "update_project"),
+        ("DELETE", re.compile(r"^/project/(?P<project_id>[^/]+)$"), "delete_project"),
+        ("POST", re.compile(r"^/issue$"), "create_issue"),
+        ("GET", re.compile(r"^/issue/(?P<issue_id>[^/]+)$"), "get_issue"),
+        ("PUT", re.compile(r"^/issue/(?P<issue_id>[^/]+)$"), "update_issue"),
+        ("DELETE", re.compile(r"^/issue/(?P<issue_id>[^/]+)$"), "delete_issue"),
+        ("POST", re.compile(r"^/issue/(?P<issue_id>[^/]+)/comment$"), "add_comment"),
+        ("GET", re.compile(r"^/issue/(?P<issue_id>[^/]+)/comment/(?P<comment_id>[^/]+)$"), "get_comment"),
+        ("PUT", re.compile(r"^/issue/(?P<issue_id>[^/]+)/comment/(?P<comment_id>[^/]+)$"), "update_comment"),
+        ("DELETE", re.compile(r"^/issue/(?P<issue_id>[^/]+)/comment/(?P<comment_id>[^/]+)$"), "delete_comment"),
+        ("POST", re.compile(r"^/issue/(?P<issue_id>[^/]+)/worklog$"), "add_worklog"),
+        ("GET", re.compile(r"^/issue/(?P<issue_id>[^/]+)/worklog/(?P<worklog_id>[^/]+)$"), "get_worklog"),
+        ("PUT", re.compile(r"^/issue/(?P<issue_id>[^/]+)/worklog/(?P<worklog_id>[^/]+)$"), "update_worklog"),
+        ("DELETE", re.compile(r"^/issue/(?P<issue_id>[^/]+)/worklog/(?P<worklog_id>[^/]+)$"), "delete_worklog"),
+        ("POST", re.compile(r"^/issue/(?P<issue_id>[^/]+)/attachments$"), "add_attachment"),
+        ("GET", re.compile(r"^/attachment/content/(?P<attachment_id>[^/]+)$"), "get_attachment_content"),
+        ("GET", re.compile(r"^/attachment/(?P<attachment_id>[^/]+)$"), "get_attachment"),
+        ("DELETE", re.compile(r"^/attachment/(?P<attachment_id>[^/]+)$"), "delete_attachment"),
+        ("GET", re.compile(r"^/search$"), "search"),
+        ("POST", re.compile(r"^/search$"), "search"),
+    )
+
+    # Jira answers the deletion of a project with an empty html page
+    CONTENT_TYPES = {"delete_project": "text/html;charset=UTF-8"}
+    # handlers reading the body of the request themselves
+    UPLOAD_HANDLERS = ("add_attachment",)
+    unread_body = False
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        self.started = time.perf_counter()
+        path, _, query = self.path.partition("?")
+        handler_name, path_args = self._route(method, path)
+        # an uploaded file is streamed to disk by its handler instead of being read here
+        self.unread_body = handler_name in self.UPLOAD_HANDLERS
+        body = None if self.unread_body else self._read_body()
+        if not path.startswith(API_PREFIX):
+            return self._send(404, {"errorMessages": ["Not found"], "errors": {}})
+        if not self.headers.get("Authorization", "").startswith("Basic "):
+            return self._send(401, {"errorMessages": ["You are not authenticated. Authentication required to perform this operation."], "errors": {}})
+        if handler_name is None:
+            return self._send(404, {"errorMessages": ["Not found"], "errors": {}})
+        if handler_name == "get_attachment_content":
+            return self._send_attachment(path_args["attachment_id"])
+        status_code, response_body = self._call(handler_name, path_args, body, query)
+        return self._send(status_code, response_body, self.CONTENT_TYPES.get(handler_name, JSON_CONTENT_TYPE))
+
+    def _route(self, method, path):
+        """
+        :return: (tuple) handler name and path arguments, None and None when no route matches
+        """
+        if not path.startswith(API_PREFIX):
+            return None, None
+        path = path[len(API_PREFIX):]
+        for route_method, pattern, handler_name in self.ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return handler_name, match.groupdict()
+        return None, None
+
+    def _call(self, handler_name, path_args, body, query):
+        state = self.server.state
+        if handler_name == "search":
+            return self._search(state, query, body)
+        if handler_name == "add_attachment":
+            return self._receive_attachment(state, path_args["issue_id"])
+        if handler_name in (
+            "create_project", "create_issue", "add_comment", "update_comment", "update_project", "update_issue",
+            "add_worklog", "update_worklog"
+        ):
+            if body is None:
+                return 400, self._missing_body_error(handler_name)
+            if handler_name == "update_issue":
+                return state.update_issue(path_args["issue_id"], body, "returnissue=true" in query.lower())
+            return getattr(state, handler_name)(*path_args.values(), body)
+        return getattr(state, handler_name)(*path_args.values())
+
+    @staticmethod
+    def _search(state, query, body):
+        # GET passes the arguments in the query string, POST in the body with fields as a list
+        if body is None:
+            arguments = {name: values[-1] for name, values in parse_qs(query).items()}
+            fields = [field for field in arguments.get("fields", "").split(",") if field]
+        else:
+            arguments = body
+            fields = body.get("fields") or []
+        try:
+            start_at = int(arguments.get("startAt", 0))
+            max_results = int(arguments.get("maxResults", SEARCH_DEFAULT_RESULTS))
+        except (TypeError, ValueError):
+            return 400, {"errorMessages": ["startAt and maxResults must be integers"], "errors": {}}
+        return state.search(arguments.get("jql", ""), start_at, max_results, fields)
+
+    def _receive_attachment(self, state, issue_id):
+        # Jira rejects the multipart uploads without the XSRF opt out header
+        if self.headers.get("X-Atlassian-Token") != "no-check":
+            return 403, {"errorMessages": ["XSRF check failed"], "errors": {}}
+        if state.get_issue(issue_id)[0] != 200:
+            return 404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."], "errors": {}}
+        boundary = MULTIPART_BOUNDARY.search(self.headers.get("Content-Type", ""))
+        length = int(self.headers.get("Content-Length", 0))
+        if not self.headers.get("Content-Type", "").startswith("multipart/form-data") or boundary is None or not length:
+            return 400, {"errorMessages": ["The request must be a multipart/form-data upload with a file part"], "errors": {}}
+        part = self._read_file_part(boundary.group(1).encode("latin-1"), length, state.attachment_dir)
+        if part is None:
+            return 400, {"errorMessages": ["The request must be a multipart/form-data upload with a file part"], "errors": {}}
+        return state.add_attachment(issue_id, *part)
+
+    def _read_file_part(self, boundary, length, directory):
+        """
+        Stream the single file part of a multipart body to a new file of the directory
+        :return: (tuple) filename, mime type, path and size of the file, None when the body is not a file upload
+        """
+        headers = {}
+        consumed = 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+            path = f.name
+            try:
+                line = self.rfile.readline(65537)
+                consumed += len(line)
+                if line.rstrip(b"\r\n") != b"--" + boundary:
+                    return self._discard(path)
+                while True:
+                    line = self.rfile.readline(65537)
+                    consumed += len(line)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("utf-8", "replace").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                disposition = headers.get("content-disposition", "")
+                filename = re.search(r'filename="([^"]*)"', disposition)
+                if not re.search(r'\bname="file"', disposition) or filename is None:
+                    return self._discard(path)
+                remaining = length - consumed
+                while remaining > 0:
+                    block = self.rfile.read(min(ATTACHMENT_BLOCK_SIZE, remaining))
+                    if not block:
+                        return self._discard(path)
+                    f.write(block)
+                    remaining -= len(block)
+                self.unread_body = False
+                # the content ends where the closing delimiter of the body starts
+                size = f.tell()
+                tail_size = min(size, len(boundary) + 64)
+                f.seek(size - tail_size)
+                end = f.read(tail_size).rfind(b"\r\n--" + boundary)
+                if end < 0:
+                    return self._discard(path)
+                f.truncate(size - tail_size + end)
+                size = size - tail_size + end
+            except OSError:
+                return self._discard(path)
+        return filename.group(1), headers.get("content-type", "application/octet-stream"), path, size
+
+    @staticmethod
+    def _discard(path):
+        os.remove(path)
+        return None
+
+    def _send_attachment(self, attachment_id):
+        found = self.server.state.attachment_file(attachment_id)
+        if found is None:
+            return self._send(404, {"errorMessages": [f"The attachment with id '{attachment_id}' does not exist"], "errors": {}})
+        attachment, path = found
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return self._send(404, {"errorMessages": [f"The attachment with id '{attachment_id}' does not exist"], "errors": {}})
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", attachment["mimeType"])
+            self.send_header("Content-Length", str(attachment["size"]))
+            self.send_header("Cache-Control", "no-cache, no-store, no-transform")
+            self.send_header("X-Arequestid", format(next(self.server.request_ids), "x"))
+            self.send_header("Server-Timing", self._server_timing())
+            self.end_headers()
+            self.wfile.flush()
+            # the kernel copies the file to the socket, nothing of it goes through the process memory
+            self.connection.sendfile(f)
+
+    @staticmethod
+    def _missing_body_error(handler_name):
+        if handler_name in ("create_issue", "update_issue", "add_worklog", "update_worklog"):
+            return {"errorMessages": ["No content to map due to end-of-input"], "errors": {}}
+        return {"errorMessages": ["No content to map due to end-of-input"]}
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _send(self, status_code, body, content_type=JSON_CONTENT_TYPE):
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Cache-Control", "no-cache, no-store, no-transform")
+        self.send_header("X-Arequestid", format(next(self.server.request_ids), "x"))
+        self.send_header("Server-Timing", self._server_timing())
+        if self.unread_body:
+            # answered before the uploaded file was read, the rest of it must not be taken for the next request
+            self.close_connection = True
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _server_timing(self):
+        # time from the request line to the response, body read and parsed included, in milliseconds
+        return f"app;dur={(time.perf_counter() - self.started) * 1e3:.3f}"
+
+    def log_message(self, format, *args):
+        # one line per request would dominate the time of a benchmark
+        pass
+
+
+class JiraMockHTTPServer(ThreadingHTTPServer):
+    # backlog of the listening socket, read by server_activate when the server is built
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class JiraMockServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        """
+        :param host: (str) interface to listen on
+        :param port: (int) port to listen on, 0 picks a free one
+        """
+        self.httpd = JiraMockHTTPServer((host, port), JiraMockHandler)
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self.httpd.state = JiraMockState(self.url)
+        self.httpd.request_ids = itertools.count(1)
+        self.thread = None
+
+    @property
+    def url_base(self):
+        return f"{self.url}{API_PREFIX}/"
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="jira-mock", daemon=True)
+        self.thread.start()
+        LOGGER.info("Jira mock server listening on %s", self.url)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd.state.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Jira mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181)
+    args = parser.parse_args(argv)
+    server = JiraMockServer(args.host, args.port)
+    LOGGER.info("Jira mock server listening on %s", server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
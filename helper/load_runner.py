@@ -0,0 +1,272 @@
+"""
+load_runner.py
+Replays the API test scenarios with virtual users to measure throughput and latency
+
+    python -m helper.load_runner --users 10 --rate 20 --ramp-up 30 --duration 300 --marker acceptance
+"""
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from config.config import jira_mock, jira_mock_port, test_deadline
+from helper.cleanup_registry import get_cleanup_registry
+from helper.deadline import request_deadline
+from helper.endpoints import normalize_endpoint
+from helper.jira_mock_server import JiraMockServer
+from helper.provisioner import get_provisioner, required_depth, ISSUE
+from helper.rest_client import get_rest_client
+from utils.latency_histogram import LatencyHistogram, get_latency_recorder
+from utils.logger import get_logger
+from utils.metrics_exporter import get_metrics_exporter, close_metrics_exporter
+
+LOGGER = get_logger(__name__, logging.INFO)
+
+TEST_MODULES = {
+    "issues": ("src.api.issues.test_issues", "TestIssues"),
+    "comments": ("src.api.issue_comments.test_comments", "TestIssueComments"),
+    "projects": ("src.api.projects.test_projects", "TestProjects"),
+    "scenarios": ("src.api.scenarios.test_scenarios", "TestScenarios"),
+    "search": ("src.api.search.test_search", "TestSearch"),
+    "worklogs": ("src.api.worklogs.test_worklogs", "TestWorklogs"),
+}
+STACK_FIXTURES = ("create_project", "create_issue", "add_comment", "add_worklog")
+NAMESPACE_FIXTURES = ("worker_project", "worker_issue")
+
+Scenario = namedtuple("Scenario", ["name", "test_class", "method_name", "params", "depth"])
+
+
+def discover_scenarios(suites=None, marker=None, keyword=None):
+    """
+    Build the scenarios from the test classes, one per test method and parametrize value
+    :param suites: (list) keys of TEST_MODULES, all of them when empty
+    :param marker: (str) only tests with this pytest marker
+    :param keyword: (str) only tests whose name contains this text
+    :return: (list) Scenario
+    """
+    scenarios = []
+    for suite in suites or TEST_MODULES:
+        module_name, class_name = TEST_MODULES[suite]
+        test_class = getattr(importlib.import_module(module_name), class_name)
+        for method_name, method in inspect.getmembers(test_class, inspect.isfunction):
+            if not method_name.startswith("test_"):
+                continue
+            marks = getattr(method, "pytestmark", [])
+            if marker and marker not in [mark.name for mark in marks]:
+                continue
+            if keyword and keyword not in method_name:
+                continue
+            arg_names = [name for name in inspect.signature(method).parameters if name != "self"]
+            depth = required_depth(arg_names)
+            for params in _parametrize_values(marks):
+                unknown = set(arg_names) - set(params) - set(STACK_FIXTURES) - set(NAMESPACE_FIXTURES) - {"test_log_name"}
+                if unknown:
+                    LOGGER.warning("Skipping %s, fixtures not supported: %s", method_name, unknown)
+                    break
+                name = f"{suite}::{method_name}" + (f"[{'-'.join(map(str, params.values()))}]" if params else "")
+                scenarios.append(Scenario(name, test_class, method_name, params, depth))
+    return scenarios
+
+
+def _parametrize_values(marks):
+    combinations = [{}]
+    for mark in marks:
+        if mark.name != "parametrize":
+            continue
+        arg_names = [name.strip() for name in mark.args[0].split(",")] if isinstance(mark.args[0], str) else list(mark.args[0])
+        values = [value if len(arg_names) > 1 else (value,) for value in mark.args[1]]
+        combinations = [{**combination, **dict(zip(arg_names, value))} for combination in combinations for value in values]
+    return combinations
+
+
+class Pacer:
+    def __init__(self, rate):
+        """
+        Spreads the requests sent by all the virtual users to a target rate, retries included
+        :param rate: (float) requests per second, no limit when 0
+        """
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.perf_counter()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(slot - time.perf_counter(), 0))
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(LatencyHistogram)
+        self.errors = defaultdict(int)
+        self.scenarios = defaultdict(lambda: {"passed": 0, "failed": 0, "errors": 0})
+        self.lock = threading.Lock()
+
+    def record_response(self, response):
+        key = f'{response["request"].method} {normalize_endpoint(response["request"].url)}'
+        with self.lock:
+            if response["time"] is not None:
+                self.latencies[key].record(response["time"])
+            if response["status_code"] is None or response["status_code"] >= 500:
+                self.errors[key] += 1
+
+    def record_scenario(self, name, result):
+        with self.lock:
+            self.scenarios[name][result] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for key, histogram in sorted(self.latencies.items()):
+            endpoints[key] = {
+                "requests": histogram.count,
+                "errors": self.errors[key],
+                "throughput": histogram.count / duration,
+                "p50": histogram.percentile(50),
+                "p90": histogram.percentile(90),
+                "p99": histogram.percentile(99),
+                "max": histogram.percentile(100),
+            }
+        return {"duration": duration, "endpoints": endpoints, "scenarios": dict(self.scenarios)}
+
+
+class LoadRunner:
+    def __init__(self, scenarios, users=1, rate=0, ramp_up=0, duration=60):
+        """
+        :param scenarios: (list) Scenario to replay
+        :param users: (int) virtual users running in parallel
+        :param rate: (float) target requests per second for all the users, 0 means no limit
+        :param ramp_up: (float) seconds until all the users are running
+        :param duration: (float) seconds of the whole run
+        """
+        self.scenarios = scenarios
+        self.users = users
+        self.pacer = Pacer(rate)
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.stats = LoadStats()
+        self.provisioner = get_provisioner()
+        self.namespace = None
+        self.stop_at = None
+
+    def run(self):
+        rest_client = get_rest_client()
+        rest_client.add_listener(self.stats.record_response)
+        rest_client.add_listener(get_latency_recorder().record)
+        rest_client.add_decode_listener(get_latency_recorder().record_decode)
+        for test_class in {scenario.test_class for scenario in self.scenarios}:
+            test_class.setup_class()
+        self.provisioner.start()
+        # project and issue shared by the scenarios that do not need a stack of their own
+        self.namespace = self.provisioner.build_stack(ISSUE)
+        # every request of the run waits for its slot, the scenarios themselves are not paced
+        rest_client.pacer = self.pacer
+        start = time.perf_counter()
+        self.stop_at = start + self.duration
+        threads = []
+        for user in range(self.users):
+            delay = self.ramp_up * user / self.users
+            thread = threading.Thread(target=self._virtual_user, args=(start + delay,), name=f"user-{user}")
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+        rest_client.pacer = None
+        rest_client.remove_listener(self.stats.record_response)
+        self.provisioner.shutdown()
+        get_cleanup_registry().cleanup()
+        get_metrics_exporter().export_summary(get_latency_recorder().summary())
+        close_metrics_exporter()
+        return self.stats.report(duration)
+
+    def _virtual_user(self, start_at):
+        time.sleep(max(start_at - time.perf_counter(), 0))
+        scenarios = itertools.cycle(random.sample(self.scenarios, len(self.scenarios)))
+        while time.perf_counter() < self.stop_at:
+            self.run_scenario(next(scenarios))
+
+    def run_scenario(self, scenario):
+        test = scenario.test_class()
+        test.setup_method()
+        try:
+            with request_deadline(test_deadline):
+                getattr(test, scenario.method_name)(**self._arguments(scenario))
+            self.stats.record_scenario(scenario.name, "passed")
+        except AssertionError as e:
+            LOGGER.debug("Scenario %s failed: %s", scenario.name, e)
+            self.stats.record_scenario(scenario.name, "failed")
+        except Exception as e:
+            LOGGER.error("Scenario %s error: %s", scenario.name, e)
+            self.stats.record_scenario(scenario.name, "errors")
+
+    def _arguments(self, scenario):
+        # the fixtures of the test are resolved with the same provisioner used by conftest
+        kwargs = dict(scenario.params)
+        arg_names = inspect.signature(getattr(scenario.test_class, scenario.method_name)).parameters
+        if "test_log_name" in arg_names:
+            kwargs["test_log_name"] = None
+        namespace = {"worker_project": self.namespace.project_id, "worker_issue": self.namespace.issue_id}
+        kwargs.update({name: value for name, value in namespace.items() if name in arg_names})
+        if scenario.depth is not None:
+            stack = self.provisioner.acquire(scenario.depth)
+            fixtures = {
+                "create_project": stack.project_id, "create_issue": stack.issue_id,
+                "add_comment": stack.comment_id, "add_worklog": stack.worklog_id
+            }
+            kwargs.update({name: value for name, value in fixtures.items() if name in arg_names})
+        return kwargs
+
+
+def print_report(report):
+    print(f"\nDuration: {report['duration']:.1f}s")
+    print(f"{'endpoint':45} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for key, row in report["endpoints"].items():
+        print(
+            f"{key:45} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>8.2f} "
+            f"{row['p50']:>8.3f} {row['p90']:>8.3f} {row['p99']:>8.3f} {row['max']:>8.3f}"
+        )
+    print(f"\n{'scenario':70} {'passed':>7} {'failed':>7} {'errors':>7}")
+    for name, row in sorted(report["scenarios"].items()):
+        print(f"{name:70} {row['passed']:>7} {row['failed']:>7} {row['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the API test scenarios as a load test")
+    parser.add_argument("--users", type=int, default=1, help="virtual users running in parallel")
+    parser.add_argument("--rate", type=float, default=0, help="target requests per second of all the users, 0 for no limit")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds until all the users are running")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of the whole run")
+    parser.add_argument("--suite", action="append", choices=sorted(TEST_MODULES), help="test suite to replay, repeatable")
+    parser.add_argument("--marker", help="only tests with this marker, e.g. acceptance")
+    parser.add_argument("-k", "--keyword", help="only tests whose name contains this text")
+    parser.add_argument("--output", help="write the report to this json file")
+    args = parser.parse_args(argv)
+
+    scenarios = discover_scenarios(args.suite, args.marker, args.keyword)
+    if not scenarios:
+        parser.error("no scenarios selected")
+    LOGGER.info("Replaying %s scenarios with %s users", len(scenarios), args.users)
+    mock_server = JiraMockServer(port=jira_mock_port).start() if jira_mock else None
+    try:
+        report = LoadRunner(scenarios, args.users, args.rate, args.ramp_up, args.duration).run()
+    finally:
+        if mock_server is not None:
+            mock_server.stop()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
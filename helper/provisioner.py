@@ -0,0 +1,287 @@
+import logging
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from config.config import url_base, headers, auth, account_id, provision_pool_size, provision_workers, provision_timeout, cassette_mode
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
+from utils.logger import get_logger, LazyJson
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+# depth of a provisioned stack, every level depends on the previous one,
+# a worklog stack carries a comment as well so the depths stay a single chain
+PROJECT = 1
+ISSUE = 2
+COMMENT = 3
+WORKLOG = 4
+DEPTHS = (PROJECT, ISSUE, COMMENT, WORKLOG)
+
+ProvisionedStack = namedtuple("ProvisionedStack", ["project_id", "issue_id", "comment_id", "worklog_id"])
+
+_shared_provisioner = None
+_shared_provisioner_lock = threading.Lock()
+
+
+def get_provisioner():
+    """
+    Process-wide provisioner used by the conftest fixtures
+    :return: ResourceProvisioner
+    """
+    global _shared_provisioner
+    with _shared_provisioner_lock:
+        if _shared_provisioner is None:
+            # stacks built ahead in the background change the order of the requests, and the ids Jira
+            # gives out, from one run to the next. A cassette is only replayed if the order is the recorded one
+            pool_size = 0 if cassette_mode != "off" else provision_pool_size
+            _shared_provisioner = ResourceProvisioner(get_rest_client(), pool_size=pool_size)
+        return _shared_provisioner
+
+
+def required_depth(fixture_names):
+    """
+    Depth of the stack needed by a test
+    :param fixture_names: (list) fixtures requested by the test
+    :return: (int) PROJECT, ISSUE, COMMENT, WORKLOG or None when no stack is needed
+    """
+    if "add_worklog" in fixture_names:
+        return WORKLOG
+    if "add_comment" in fixture_names:
+        return COMMENT
+    if "create_issue" in fixture_names:
+        return ISSUE
+    if "create_project" in fixture_names:
+        return PROJECT
+    return None
+
+
+def create_project_resource(rest_client):
+    project_key = get_data_pool().project_key()
+    project_body = {
+        "key": project_key,
+        "name": f"Project {project_key}",
+        "leadAccountId": f"{account_id}",
+        "projectTypeKey": "business"
+    }
+    response = rest_client.send_request(
+        "POST",
+        url=f"{url_base}project",
+        body=project_body,
+        headers=headers,
+        auth=auth
+    )
+    LOGGER.debug("%s", LazyJson(response["body"]))
+    return response["body"]["id"]
+
+
+def create_issue_resource(rest_client, project_id):
+    issue_body = {
+        "fields": {
+            "issuetype": {
+                "id": "10034"
+            },
+            "project": {
+                "id": f"{project_id}"
+            },
+            "summary": "Task issue from fixture"
+        },
+        "update": {}
+    }
+    response = rest_client.send_request(
+        "POST",
+        url=f"{url_base}issue",
+        body=issue_body,
+        headers=headers,
+        auth=auth
+    )
+    LOGGER.debug("%s", LazyJson(response["body"]))
+    return response["body"]["id"]
+
+
+def add_comment_resource(rest_client, issue_id):
+    comment_body = {
+        "body": {
+            "content": [
+                {
+                    "content": [
+                        {
+                            "text": get_data_pool().sentence(),
+                            "type": "text"
+                        }
+                    ],
+                    "type": "paragraph"
+                }
+            ],
+            "type": "doc",
+            "version": 1
+        }
+    }
+    response = rest_client.send_request(
+        "POST",
+        url=f"{url_base}issue/{issue_id}/comment",
+        body=comment_body,
+        headers=headers,
+        auth=auth
+    )
+    LOGGER.debug("%s", LazyJson(response["body"]))
+    return response["body"]["id"]
+
+
+def add_worklog_resource(rest_client, issue_id):
+    worklog_body = {
+        "started": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000%z"),
+        "timeSpent": "1h"
+    }
+    response = rest_client.send_request(
+        "POST",
+        url=f"{url_base}issue/{issue_id}/worklog",
+        body=worklog_body,
+        headers=headers,
+        auth=auth
+    )
+    LOGGER.debug("%s", LazyJson(response["body"]))
+    return response["body"]["id"]
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+class ResourceProvisioner:
+    def __init__(self, rest_client, pool_size=provision_pool_size, workers=provision_workers):
+        """
+        Builds projects, issues, comments and worklogs ahead of the tests in background threads
+        :param rest_client: (RestClient) client used to create the resources
+        :param pool_size: (int) stacks kept ready per depth
+        :param workers: (int) stacks built in parallel
+        """
+        self.rest_client = rest_client
+        self.pool_size = pool_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provisioner")
+        self.ready = {depth: queue.Queue() for depth in DEPTHS}
+        self.pending = {depth: 0 for depth in DEPTHS}
+        # callers blocked in acquire, each of them is owed a stack whatever the demand left
+        self.waiting = {depth: 0 for depth in DEPTHS}
+        # stacks still needed by the session, None means unknown
+        self.demand = {depth: None for depth in DEPTHS}
+        self.lock = threading.Lock()
+        self.closed = False
+        # project holding the issues of every deeper stack, only PROJECT stacks get a project of their own
+        self.shared_project_id = None
+        self.shared_project_lock = threading.Lock()
+
+    def set_demand(self, depth, count):
+        """
+        Number of stacks the collected tests will take, the pool never builds more than that
+        :param depth: (int) PROJECT, ISSUE, COMMENT or WORKLOG
+        :param count: (int) number of tests using a stack of that depth
+        """
+        with self.lock:
+            self.demand[depth] = count
+
+    def start(self):
+        for depth in DEPTHS:
+            self._fill(depth)
+
+    def acquire(self, depth, timeout=provision_timeout):
+        """
+        Take a ready stack, a new one is built in the background to replace it
+        :param depth: (int) PROJECT, ISSUE, COMMENT or WORKLOG
+        :param timeout: (float) seconds to wait for a stack
+        :return: ProvisionedStack
+        :raise ProvisioningError: when the provisioner is shut down or no stack is ready in time
+        """
+        with self.lock:
+            if self.closed:
+                raise ProvisioningError(f"Provisioner is shut down, no stack of depth {depth} will be built")
+            if self.demand[depth] is not None:
+                # the test taking this stack is no longer part of the remaining demand
+                self.demand[depth] = max(self.demand[depth] - 1, 0)
+            self.waiting[depth] += 1
+            missing = self.waiting[depth] - self.ready[depth].qsize() - self.pending[depth]
+        for _ in range(missing):
+            self._submit(depth)
+        try:
+            stack = self.ready[depth].get(timeout=timeout)
+        except queue.Empty:
+            raise ProvisioningError(f"No stack of depth {depth} ready after {timeout} seconds") from None
+        finally:
+            with self.lock:
+                self.waiting[depth] -= 1
+        self._fill(depth)
+        if isinstance(stack, Exception):
+            raise stack
+        return stack
+
+    def shutdown(self):
+        """
+        Stop building stacks, the projects already built are in the cleanup registry
+        :return: (list) stacks that were built and never handed out
+        """
+        with self.lock:
+            self.closed = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        leftovers = []
+        for depth in DEPTHS:
+            while not self.ready[depth].empty():
+                stack = self.ready[depth].get_nowait()
+                if not isinstance(stack, Exception):
+                    leftovers.append(stack)
+        return leftovers
+
+    def build_stack(self, depth):
+        project_id = self._new_project() if depth == PROJECT else self.shared_project()
+        issue_id = create_issue_resource(self.rest_client, project_id) if depth >= ISSUE else None
+        comment_id = add_comment_resource(self.rest_client, issue_id) if depth >= COMMENT else None
+        worklog_id = add_worklog_resource(self.rest_client, issue_id) if depth >= WORKLOG else None
+        LOGGER.debug("Provisioned stack: %s, %s, %s, %s", project_id, issue_id, comment_id, worklog_id)
+        return ProvisionedStack(project_id, issue_id, comment_id, worklog_id)
+
+    def shared_project(self):
+        """
+        Project of this process holding the issues of the ISSUE, COMMENT and WORKLOG stacks, created
+        with the first of them. Creating a project is the costliest call of the API
+        :return: (str) project id
+        """
+        with self.shared_project_lock:
+            if self.shared_project_id is None:
+                self.shared_project_id = self._new_project()
+            return self.shared_project_id
+
+    def _new_project(self):
+        project_id = create_project_resource(self.rest_client)
+        # deleting the project also removes its issues, comments and worklogs
+        get_cleanup_registry().register_project(project_id)
+        return project_id
+
+    def _fill(self, depth):
+        with self.lock:
+            available = self.ready[depth].qsize() + self.pending[depth]
+            target = self.pool_size
+            if self.demand[depth] is not None:
+                target = min(target, self.demand[depth])
+            missing = target - available
+        for _ in range(missing):
+            self._submit(depth)
+
+    def _submit(self, depth):
+        with self.lock:
+            if self.closed:
+                return
+            self.pending[depth] += 1
+            # submitted under the lock, a shutdown in between would make the executor refuse it
+            self.executor.submit(self._build, depth)
+
+    def _build(self, depth):
+        try:
+            stack = self.build_stack(depth)
+        except Exception as e:
+            LOGGER.error("Provisioning error: %s", e)
+            stack = e
+        with self.lock:
+            self.pending[depth] -= 1
+            self.ready[depth].put(stack)
@@ -0,0 +1,181 @@
+"""
+rate_limiter.py
+Token bucket shared by every request of the process, and by the xdist workers through a lock file
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from config.config import rate_limit, rate_limit_min, rate_limit_max, rate_limit_file
+from utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, the bucket is only shared inside the process
+    fcntl = None
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+# state older than this belongs to a previous run and is discarded
+STALE_STATE_SECONDS = 60
+# lowest rate accepted, a rate of 0 would never refill the bucket
+MIN_RATE_FLOOR = 0.01
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Process-wide rate limiter, None when RATE_LIMIT is 0
+    :return: RateLimiter
+    """
+    global _shared_limiter
+    if not rate_limit:
+        return None
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(rate_limit, rate_limit_min, rate_limit_max, rate_limit_file if fcntl else None)
+        return _shared_limiter
+
+
+class RateLimiter:
+    def __init__(self, rate, min_rate, max_rate, state_file=None):
+        """
+        Adaptive token bucket, the rate is halved on 429/503 and slowly raised again on success
+        :param rate: (float) initial requests per second
+        :param min_rate: (float) the rate never goes below this value
+        :param max_rate: (float) the rate never goes above this value
+        :param state_file: (str) file holding the bucket shared between processes, None for in process only
+        """
+        if min_rate < MIN_RATE_FLOOR:
+            LOGGER.warning("Minimum rate %s is not positive, using %s req/s", min_rate, MIN_RATE_FLOOR)
+            min_rate = MIN_RATE_FLOOR
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.initial_rate = min(max(rate, self.min_rate), self.max_rate)
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.state = self._initial_state()
+
+    def acquire(self):
+        """
+        Block until the bucket has a token for one request
+        """
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                self._refill(state, now)
+                wait = state["paused_until"] - now
+                if wait <= 0:
+                    if state["tokens"] >= 1:
+                        state["tokens"] -= 1
+                        return
+                    wait = (1 - state["tokens"]) / state["rate"]
+            time.sleep(wait)
+
+    def on_response(self, status_code, header):
+        """
+        Adapt the rate to the response of Jira
+        :param status_code: (int) status code received
+        :param header: (callable) returns the value of a response header by name
+        """
+        if status_code in (429, 503):
+            retry_after = parse_retry_after(header("Retry-After"), header("X-RateLimit-Reset"))
+            with self._locked_state() as state:
+                state["rate"] = max(state["rate"] / 2, self.min_rate)
+                state["tokens"] = 0
+                if retry_after:
+                    state["paused_until"] = max(state["paused_until"], time.time() + retry_after)
+                LOGGER.warning("Rate limited (%s), rate lowered to %.2f req/s, pause %.2fs", status_code, state["rate"], retry_after or 0)
+        elif (header("X-RateLimit-NearLimit") or "").lower() == "true":
+            with self._locked_state() as state:
+                state["rate"] = max(state["rate"] * 0.8, self.min_rate)
+        elif status_code is not None and status_code < 400:
+            with self._locked_state() as state:
+                # additive increase, one more request per second every ~10 successful requests
+                state["rate"] = min(state["rate"] + 0.1, self.max_rate)
+
+    @staticmethod
+    def _refill(state, now):
+        state["tokens"] = min(state["tokens"] + (now - state["updated"]) * state["rate"], max(state["rate"], 1))
+        state["updated"] = now
+
+    def _initial_state(self):
+        return {"rate": self.initial_rate, "tokens": 1, "updated": time.time(), "paused_until": 0}
+
+    def _locked_state(self):
+        return _FileState(self) if self.state_file else _MemoryState(self)
+
+
+class _MemoryState:
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def __enter__(self):
+        self.limiter.lock.acquire()
+        return self.limiter.state
+
+    def __exit__(self, *exc_info):
+        self.limiter.lock.release()
+
+
+class _FileState:
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.file = None
+        self.state = None
+
+    def __enter__(self):
+        self.limiter.lock.acquire()
+        try:
+            self.file = open(self.limiter.state_file, "a+", encoding="utf-8")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+            self.file.seek(0)
+            content = self.file.read()
+            self.state = json.loads(content) if content else None
+        except (OSError, ValueError):
+            self.state = None
+        if self.state is None or time.time() - self.state["updated"] > STALE_STATE_SECONDS:
+            self.state = self.limiter._initial_state()
+        return self.state
+
+    def __exit__(self, *exc_info):
+        try:
+            if self.file is not None:
+                self.file.seek(0)
+                self.file.truncate()
+                self.file.write(json.dumps(self.state))
+                self.file.flush()
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+                self.file.close()
+        finally:
+            self.limiter.lock.release()
+
+
+def parse_retry_after(retry_after, rate_limit_reset=None):
+    """
+    Seconds to wait before the next request
+    :param retry_after: (str) Retry-After header, seconds or http date
+    :param rate_limit_reset: (str) X-RateLimit-Reset header, ISO timestamp
+    :return: (float) seconds, None when the headers are missing
+    """
+    if retry_after:
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            try:
+                reset_at = datetime.strptime(retry_after, "%a, %d %b %Y %H:%M:%S GMT").replace(tzinfo=timezone.utc)
+                return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0)
+            except ValueError:
+                pass
+    if rate_limit_reset:
+        try:
+            reset_at = datetime.fromisoformat(rate_limit_reset.replace("Z", "+00:00"))
+            return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0)
+        except ValueError:
+            pass
+    return None
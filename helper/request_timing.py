@@ -0,0 +1,95 @@
+"""
+request_timing.py
+urllib3 connections that time the phases of every request: DNS, TCP connect, TLS, time to first byte
+"""
+import socket
+import time
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+# phases measured by the connection, download and json_decode are added by RestClient and RestResponse
+CONNECTION_PHASES = ("dns", "connect", "tls", "ttfb")
+PHASES = CONNECTION_PHASES + ("download", "json_decode")
+
+
+class _TimedConnectionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset_phases()
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            # urllib3 resolves again and raises its own NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        dns_host = self._dns_host
+        try:
+            # the name is resolved once, every address is tried in order as create_connection does
+            for position, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    sock = super()._new_conn()
+                    break
+                except ConnectTimeoutError:
+                    if position == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        self._phases["dns"] = resolved - start
+        self._phases["connect"] = time.perf_counter() - resolved
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        self._connected_at = time.perf_counter()
+        self._phases["reused"] = False
+        if isinstance(self, HTTPSConnection):
+            # the rest of connect() is the TLS handshake
+            self._phases["tls"] = max(self._connected_at - start - self._phases["dns"] - self._phases["connect"], 0.0)
+        else:
+            self._phases["tls"] = None
+
+    def request(self, *args, **kwargs):
+        self._request_started = time.perf_counter()
+        return super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        # plain http connects inside request(), the first byte is counted from the open connection
+        self._phases["ttfb"] = time.perf_counter() - max(self._request_started, self._connected_at)
+        response.phase_timings = self._phases
+        self._reset_phases()
+        return response
+
+    def _reset_phases(self):
+        # a reused connection has no dns, connect or tls time
+        self._phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0, "ttfb": None, "reused": True}
+        self._request_started = 0.0
+        self._connected_at = 0.0
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+# pool_classes_by_scheme of the PoolManager used by RestClient
+TIMED_POOL_CLASSES = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
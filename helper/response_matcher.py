@@ -0,0 +1,134 @@
+"""
+response_matcher.py
+Expectations of the input_json files compiled into plain python checks
+"""
+import re
+
+import jsonschema
+
+# keywords the compiled matcher understands, any other keyword falls back to jsonschema
+MATCHER_KEYWORDS = {"type", "properties", "required", "items", "$schema", "title", "description"}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    # same as jsonschema: booleans are not numbers and 1.0 is an integer
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool))
+                             or (isinstance(value, float) and value.is_integer()),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None
+}
+
+
+def compile_body_matcher(schema):
+    """
+    Check function of a body schema, about 10 times faster than a jsonschema validator
+    :param schema: (dict) JSON schema of the expected body
+    :return: (callable) receives the body, returns the error message or None when it matches
+    """
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    if _is_supported(schema):
+        return _compile(schema, "$")
+    validator = validator_class(schema)
+
+    def fallback(value):
+        error = jsonschema.exceptions.best_match(validator.iter_errors(value))
+        return None if error is None else f"{error.json_path}: {error.message}"
+    return fallback
+
+
+def compile_header_matcher(expected_headers):
+    """
+    Check function of the expected headers: names are case insensitive, an empty value only
+    requires the header, any other value is a regular expression matching the whole value
+    :param expected_headers: (dict) header name -> expected value
+    :return: (callable) receives the actual headers dict, returns the error message or None
+    """
+    checks = [(name.lower(), name, re.compile(value) if value else None) for name, value in expected_headers.items()]
+
+    def match(headers):
+        actual = {name.lower(): value for name, value in headers.items()}
+        for key, name, pattern in checks:
+            value = actual.get(key)
+            if value is None:
+                return f"header {name} is missing"
+            if pattern is not None and not pattern.fullmatch(value):
+                return f"header {name}: '{value}' does not match '{pattern.pattern}'"
+        return None
+    return match
+
+
+def _is_supported(schema):
+    if not isinstance(schema, dict) or not schema.keys() <= MATCHER_KEYWORDS:
+        return False
+    types = schema.get("type", [])
+    if any(schema_type not in _TYPE_CHECKS for schema_type in ([types] if isinstance(types, str) else types)):
+        return False
+    if "items" in schema and not _is_supported(schema["items"]):
+        return False
+    return all(_is_supported(sub_schema) for sub_schema in schema.get("properties", {}).values())
+
+
+def _compile(schema, path):
+    # every keyword becomes one closure, paths are built once here and not while checking
+    checks = []
+    if "type" in schema:
+        types = [schema["type"]] if isinstance(schema["type"], str) else schema["type"]
+        type_checks = tuple(_TYPE_CHECKS[schema_type] for schema_type in types)
+        expected = " or ".join(types)
+
+        def check_type(value):
+            for type_check in type_checks:
+                if type_check(value):
+                    return None
+            return f"{path}: {value!r} is not of type {expected}"
+        checks.append(check_type)
+    if "required" in schema:
+        required = tuple(schema["required"])
+
+        def check_required(value):
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        return f"{path}: '{key}' is a required property"
+            return None
+        checks.append(check_required)
+    if "properties" in schema:
+        properties = tuple((key, _compile(sub_schema, f"{path}.{key}")) for key, sub_schema in schema["properties"].items())
+
+        def check_properties(value):
+            if isinstance(value, dict):
+                for key, check in properties:
+                    if key in value:
+                        error = check(value[key])
+                        if error:
+                            return error
+            return None
+        checks.append(check_properties)
+    if "items" in schema:
+        item_path = f"{path}[*]"
+        check_item = _compile(schema["items"], item_path)
+
+        def check_items(value):
+            if isinstance(value, list):
+                for position, item in enumerate(value):
+                    error = check_item(item)
+                    if error:
+                        return error.replace(item_path, f"{path}[{position}]", 1)
+            return None
+        checks.append(check_items)
+
+    if len(checks) == 1:
+        return checks[0]
+    checks = tuple(checks)
+
+    def check(value):
+        for keyword_check in checks:
+            error = keyword_check(value)
+            if error:
+                return error
+        return None
+    return check
@@ -1,15 +1,193 @@
+import random
+import socket
+import threading
+import time
+
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from config.config import (
+    pool_connections, pool_maxsize, keep_alive, retry_max, retry_backoff, connect_timeout, read_timeout
+)
+from helper.cassette import get_cassette, RecordingAdapter, ReplayAdapter
+from helper.circuit_breaker import get_circuit_breaker
+from helper.deadline import remaining_time
+from helper.endpoints import normalize_endpoint
+from helper.rate_limiter import get_rate_limiter, parse_retry_after
+from helper.request_timing import TIMED_POOL_CLASSES
+from helper.rest_response import RestResponse, RequestInfo
 from utils.logger import get_logger
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
+IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE")
+RETRY_STATUS_CODES = (429, 503)
+DEADLINE_EXCEEDED = {"message": "Deadline Exceeded"}
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_rest_client():
+    """
+    Process-wide RestClient, all the fixtures and tests share its connection pool
+    :return: RestClient
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = RestClient()
+        return _shared_client
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    def __init__(self, keep_alive=True, **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keep_alive:
+            # TCP keep-alive stops idle pooled connections from being dropped between tests
+            socket_options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60))
+            kwargs["socket_options"] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+        # connections timing dns, connect, tls and time to first byte of every request
+        self.poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+
 class RestClient:
-    def __init__(self):
+    def __init__(self, pool_connections=pool_connections, pool_maxsize=pool_maxsize, keep_alive=keep_alive, cassette=None):
+        """
+        Client with a pooled session
+        :param pool_connections: (int) number of hosts kept in the pool
+        :param pool_maxsize: (int) max connections kept open per host
+        :param keep_alive: (bool) reuse connections between requests
+        :param cassette: (Cassette) cassette recording or replaying the requests, the one of CASSETTE_MODE by default
+        """
         self.session = requests.Session()
+        adapter = PooledHTTPAdapter(keep_alive=keep_alive, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.cassette = cassette or get_cassette()
+        if self.cassette is not None:
+            adapter = ReplayAdapter(self.cassette) if self.cassette.replaying else RecordingAdapter(self.cassette, adapter)
+        # replayed responses never reach Jira
+        self.replaying = isinstance(adapter, ReplayAdapter)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        self.listeners = []
+        self.decode_listeners = []
+        self.rate_limiter = None if self.replaying else get_rate_limiter()
+        self.retry_max = retry_max
+        self.retry_backoff = retry_backoff
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.circuit_breaker = None if self.replaying else get_circuit_breaker()
+        # spreads the requests to a target rate, set by the load runner for the length of a run
+        self.pacer = None
+
+    def add_listener(self, listener):
+        """
+        Register a callable that receives every RestResponse, used to collect metrics
+        :param listener: (callable) function receiving the response
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
 
-    def send_request(self, method_name, url, auth=None, headers=None, body=None, params=None):
-        response_updated = {}
+    def add_decode_listener(self, listener):
+        """
+        Register a callable that receives a RestResponse once its JSON body has been decoded,
+        the decoding happens when a test first reads the body
+        :param listener: (callable) function receiving the response
+        """
+        self.decode_listeners.append(listener)
+
+    def close(self):
+        self.session.close()
+
+    def send_request(self, method_name, url, auth=None, headers=None, body=None, params=None, stream=False, data=None):
+        """
+        Send a request, the returned RestResponse decodes body and headers on first access.
+        The request fails fast without being sent when the deadline of the test passed or the
+        circuit of the endpoint is open
+        :param stream: (bool) do not download the body until it is read, use iter_content
+                       on the response to process large bodies in chunks
+        :param data: (bytes|file) raw body sent instead of the JSON body, a file-like object with a
+                     length is streamed in blocks, see helper/attachments.py
+        :return: RestResponse
+        """
+        endpoint = normalize_endpoint(url)
+        attempt = 0
+        while True:
+            timeout = self._timeout()
+            if timeout is None:
+                LOGGER.error("Deadline exceeded before %s %s", method_name, url)
+                response = RestResponse(default_body=dict(DEADLINE_EXCEEDED), request=RequestInfo(method_name, url))
+                break
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow(endpoint):
+                LOGGER.error("Circuit open, not sending %s %s", method_name, url)
+                response = RestResponse(default_body={"message": "Circuit Open"}, request=RequestInfo(method_name, url))
+                break
+            if self.pacer is not None:
+                self.pacer.wait()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            response = self._send(method_name, url, auth, headers, body, params, stream, timeout, data)
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_response(response.status_code, response.header)
+            if self.circuit_breaker is not None and not self._deadline_timeout(response):
+                self.circuit_breaker.record(endpoint, response.status_code)
+            if not self._should_retry(method_name, response, attempt):
+                break
+            delay = self._retry_delay(response, attempt)
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                # the retry would start after the deadline
+                break
+            LOGGER.warning("Retrying %s %s in %.2fs, status: %s", method_name, url, delay, response.status_code)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+        for listener in self.listeners:
+            listener(response)
+        return response
+
+    def _should_retry(self, method_name, response, attempt):
+        # a request missing from the cassette gets no answer however often it is replayed
+        if self.replaying or attempt >= self.retry_max or method_name not in IDEMPOTENT_METHODS:
+            return False
+        return response.status_code is None or response.status_code in RETRY_STATUS_CODES
+
+    def _timeout(self):
+        """
+        Connect and read timeouts of the next attempt, shortened to the time left before the deadline
+        :return: (tuple) connect and read seconds, None when the deadline passed
+        """
+        remaining = remaining_time()
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        if remaining <= 0:
+            return None
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    @staticmethod
+    def _deadline_timeout(response):
+        # a timeout cut short by the deadline of the test says nothing about the endpoint
+        return response.status_code is None and response.body == DEADLINE_EXCEEDED
+
+    def _retry_delay(self, response, attempt):
+        # full jitter exponential backoff, never shorter than the Retry-After sent by Jira
+        delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+        retry_after = parse_retry_after(response.header("Retry-After"), response.header("X-RateLimit-Reset"))
+        return max(delay, retry_after or 0)
+
+    def _send(self, method_name, url, auth, headers, body, params, stream, timeout, data=None):
         methods = {
             "GET": self.session.get,
             "POST": self.session.post,
@@ -18,40 +196,45 @@ class RestClient:
         }
 
         try:
-            response = methods[method_name](url=url, auth=auth, headers=headers, json=body, params=params)
+            # the body is read here and not by requests, its download is timed apart from the first byte
+            response = methods[method_name](
+                url=url, auth=auth, headers=headers, json=body, data=data, params=params, stream=True, timeout=timeout
+            )
+            download = None
+            if not stream:
+                start = time.perf_counter()
+                response.content
+                download = time.perf_counter() - start
             response.raise_for_status()
-            response_updated["body"] = (
-                response.json() if response.text else {"message": "No body content"}
+            return RestResponse(
+                response, default_body={"message": "No body content"}, download=download,
+                decode_listeners=self.decode_listeners
             )
-            response_updated["status_code"] = response.status_code
-            response_updated["headers"] = dict(response.headers)
-            response_updated["time"] = response.elapsed.total_seconds()
-            response_updated["request"] = response.request
 
         except requests.exceptions.HTTPError as e:
             LOGGER.error("HTTP Error: %s", e)
-            response_updated["body"] = (
-                response.json() if response.text else {"message": "HTTP Error"}
+            return RestResponse(
+                response, default_body={"message": "HTTP Error"}, download=download,
+                decode_listeners=self.decode_listeners
+            )
+
+        except requests.exceptions.Timeout as e:
+            if timeout != (self.connect_timeout, self.read_timeout):
+                LOGGER.error("Deadline exceeded during %s %s: %s", method_name, url, e)
+                return RestResponse(default_body=dict(DEADLINE_EXCEEDED), request=RequestInfo(method_name, url))
+            LOGGER.error("Timeout: %s", e)
+            return RestResponse(
+                default_body={"message": "Timeout"}, request=RequestInfo(method_name, url)
             )
-            response_updated["status_code"] = response.status_code
-            response_updated["headers"] = dict(response.headers)
-            response_updated["time"] = response.elapsed.total_seconds()
-            response_updated["request"] = response.request
 
         except requests.exceptions.ConnectionError as e:
             LOGGER.error("Connection Error: %s", e)
-            response_updated["body"] = (
-                response.json() if response.text else {"message": "Connection Error"}
+            return RestResponse(
+                default_body={"message": "Connection Error"}, request=RequestInfo(method_name, url)
             )
-            response_updated["status_code"] = response.status_code
-            response_updated["headers"] = {}
 
         except requests.exceptions.RequestException as e:
             LOGGER.error("Request Exception: %s", e)
-            response_updated["body"] = (
-                response.json() if response.text else {"message": "Request Failed"}
+            return RestResponse(
+                default_body={"message": "Request Failed"}, request=RequestInfo(method_name, url)
             )
-            response_updated["status_code"] = response.status_code
-            response_updated["headers"] = {}
-
-        return response_updated
@@ -0,0 +1,127 @@
+import time
+from collections import namedtuple
+
+from helper.request_timing import PHASES
+
+RequestInfo = namedtuple("RequestInfo", ["method", "url"])
+
+_UNSET = object()
+
+
+class RestResponse:
+    """
+    Response returned by RestClient, body, headers and time are only built when they are read.
+    It keeps the dict access used by the tests: response["body"], response["status_code"], ...
+    """
+    __slots__ = (
+        "status_code", "request", "_raw", "_default_body", "_body", "_headers", "_time", "_download",
+        "_json_decode", "_decode_listeners"
+    )
+
+    KEYS = ("body", "status_code", "headers", "time", "timings", "request")
+
+    def __init__(self, raw=None, default_body=None, status_code=None, request=None, download=None, decode_listeners=()):
+        """
+        :param raw: (requests.Response) response received, None when the request failed
+        :param default_body: (dict) body used when the response has no content
+        :param status_code: (int) status code when there is no raw response
+        :param request: (RequestInfo) method and url when there is no raw response
+        :param download: (float) seconds spent reading the body, None when it was streamed
+        :param decode_listeners: (list) callables receiving the response once its body is decoded
+        """
+        self._raw = raw
+        self._default_body = default_body
+        self._body = _UNSET
+        self._headers = _UNSET
+        self._time = _UNSET
+        self._download = download
+        self._json_decode = None
+        self._decode_listeners = decode_listeners
+        if raw is None:
+            self.status_code = status_code
+            self.request = request
+        else:
+            self.status_code = raw.status_code
+            self.request = RequestInfo(raw.request.method, raw.request.url)
+            # only method and url are kept, the prepared request holds a copy of the whole body
+            raw.request = None
+
+    @property
+    def body(self):
+        if self._body is _UNSET:
+            if self._raw is None or not self._raw.content:
+                self._body = self._default_body
+            else:
+                start = time.perf_counter()
+                self._body = self._raw.json()
+                self._json_decode = time.perf_counter() - start
+                for listener in self._decode_listeners:
+                    listener(self)
+        return self._body
+
+    @property
+    def headers(self):
+        if self._headers is _UNSET:
+            self._headers = {} if self._raw is None else dict(self._raw.headers)
+        return self._headers
+
+    @property
+    def time(self):
+        if self._time is _UNSET:
+            self._time = None if self._raw is None else self._raw.elapsed.total_seconds()
+        return self._time
+
+    @property
+    def timings(self):
+        """
+        Seconds spent in every phase of the request: dns, connect and tls are 0 on a reused
+        connection, a phase that did not happen (replayed response, body not read yet) is None
+        """
+        phases = getattr(self._raw.raw, "phase_timings", None) if self._raw is not None else None
+        timings = dict.fromkeys(PHASES)
+        timings["reused"] = None
+        if phases:
+            timings.update(phases)
+        timings["download"] = self._download
+        timings["json_decode"] = self._json_decode
+        return timings
+
+    def header(self, name):
+        """
+        Value of one header, read without building the headers dict
+        :param name: (str) header name, case insensitive
+        """
+        if self._raw is None:
+            return None
+        return self._raw.headers.get(name)
+
+    def iter_content(self, chunk_size=1024 * 1024):
+        """
+        Iterate over the body of a streamed response without keeping it in memory
+        :param chunk_size: (int) bytes per chunk
+        """
+        if self._raw is None:
+            return iter(())
+        return self._raw.iter_content(chunk_size=chunk_size)
+
+    def close(self):
+        # releases the connection of a streamed response back to the pool
+        if self._raw is not None:
+            self._raw.close()
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self.KEYS else default
+
+    def keys(self):
+        return self.KEYS
+
+    def __repr__(self):
+        return f"<RestResponse [{self.status_code}] {self.request}>"
@@ -0,0 +1,314 @@
+"""
+scenario_plan.py
+Declarative API scenarios: a YAML or JSON file compiled once into plans of ready to send steps
+
+    scenarios:
+      - name: issue_lifecycle
+        marks: [acceptance]
+        fixtures: [worker_project]
+        variables: {summary: "Task {company}"}
+        steps:
+          - request: POST issue
+            body: {fields: {project: {id: "{worker_project}"}, summary: "{summary}"}}
+            expect: create_issue
+            save: {issue_id: body.id}
+            cleanup: issue
+          - request: GET issue/{issue_id}
+            expect: get_issue
+
+{name} in a path, body, params or variable is a fixture, a parameter, a scenario variable, a value saved
+by a previous step or a value of the data pool (company, sentence, word, project_key). A string made only of {name} keeps
+the type of the value. Every placeholder is checked when the file is compiled.
+"""
+import json
+import logging
+import pathlib
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from config.config import url_base, headers, auth, get_headers
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool, FIELDS
+from helper.provisioner import required_depth
+from helper.rest_client import get_rest_client
+from helper.validate_response import ValidateResponse
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+METHODS = ("GET", "POST", "PUT", "DELETE")
+HEADERS = {"json": headers, "get": get_headers, "none": None}
+CLEANUP_KINDS = ("project", "issue", "comment", "worklog")
+
+_formatter = string.Formatter()
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+class ScenarioVariables(dict):
+    # placeholders that are not variables are drawn from the data pool, every use draws a new value
+    def __missing__(self, name):
+        return get_data_pool().value(name)
+
+
+def load_plans(path):
+    """
+    Compiled plans of a scenario file, the file is compiled once per process
+    :param path: (str|Path) .yaml, .yml or .json scenario file
+    :return: (list) ScenarioPlan
+    """
+    path = pathlib.Path(path).resolve()
+    with _plans_lock:
+        if path not in _plans:
+            _plans[path] = compile_scenarios(read_scenario_file(path), source=path.name)
+        return _plans[path]
+
+
+def read_scenario_file(path):
+    LOGGER.debug("Reading scenarios from %s", path)
+    with open(path, encoding="utf-8") as f:
+        if pathlib.Path(path).suffix in (".yaml", ".yml"):
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def compile_scenarios(data, source="scenarios"):
+    """
+    :param data: (dict) content of a scenario file, the scenarios list is compiled
+    :param source: (str) name used in the errors
+    :return: (list) ScenarioPlan
+    """
+    plans = [ScenarioPlan(scenario, source) for scenario in data["scenarios"]]
+    names = [plan.name for plan in plans]
+    duplicated = {name for name in names if names.count(name) > 1}
+    if duplicated:
+        raise ValueError(f"{source}: duplicated scenario names {sorted(duplicated)}")
+    LOGGER.debug("Scenarios compiled from %s: %s", source, len(plans))
+    return plans
+
+
+def run_plans(plans, variables_for, workers=1):
+    """
+    Run plans one after the other or in parallel threads
+    :param plans: (list) ScenarioPlan
+    :param variables_for: (callable) receives a plan and returns its fixtures and parameters
+    :param workers: (int) plans run at the same time
+    :return: (dict) plan name -> None when it passed, the exception otherwise
+    """
+    def run(plan):
+        try:
+            plan.run(variables_for(plan))
+            return None
+        except Exception as e:
+            LOGGER.debug("Scenario %s failed: %s", plan.name, e)
+            return e
+
+    if workers <= 1:
+        return {plan.name: run(plan) for plan in plans}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scenario") as executor:
+        return dict(zip([plan.name for plan in plans], executor.map(run, plans)))
+
+
+class ScenarioPlan:
+    def __init__(self, scenario, source="scenarios"):
+        """
+        :param scenario: (dict) one entry of the scenarios list
+        :param source: (str) name of the scenario file, used in the errors
+        """
+        self.name = scenario["name"]
+        where = f"{source}: scenario {self.name}"
+        self.marks = list(scenario.get("marks", []))
+        self.fixtures = list(scenario.get("fixtures", []))
+        # parameter name -> values, every value is a separate run of the plan
+        self.parameters = dict(scenario.get("parametrize", {}))
+        self.depth = required_depth(self.fixtures)
+        known = set(self.fixtures) | set(self.parameters)
+        self.variables = []
+        for name, template in scenario.get("variables", {}).items():
+            self.variables.append((name, compile_template(template, known, f"{where}, variable {name}")))
+            known.add(name)
+        self.steps = []
+        for position, step in enumerate(scenario["steps"], start=1):
+            compiled = PlanStep(step, known, f"{where}, step {position}")
+            self.steps.append(compiled)
+            known.update(name for name, _ in compiled.saves)
+
+    def __repr__(self):
+        return f"<ScenarioPlan {self.name} steps={len(self.steps)}>"
+
+    def run(self, values, rest_client=None, validate=None):
+        """
+        Send every step in order, the first failing validation stops the plan
+        :param values: (dict) fixtures and parameters of the run
+        :param rest_client: (RestClient) shared pooled client by default
+        :param validate: (ValidateResponse) validator of the responses
+        :return: (list) responses of the steps
+        """
+        rest_client = rest_client or get_rest_client()
+        validate = validate or ValidateResponse()
+        variables = ScenarioVariables(values)
+        for name, template in self.variables:
+            variables[name] = template(variables)
+        return [step.run(rest_client, validate, variables) for step in self.steps]
+
+
+class PlanStep:
+    __slots__ = ("method", "path", "url", "body", "params", "headers", "auth", "expect", "saves", "cleanup")
+
+    def __init__(self, step, known, where):
+        """
+        :param step: (dict) request, body, params, headers, auth, expect, save and cleanup of the step
+        :param known: (set) variables defined before this step
+        :param where: (str) position of the step, used in the errors
+        """
+        self.method, _, self.path = step["request"].partition(" ")
+        if self.method not in METHODS or not self.path:
+            raise ValueError(f"{where}: request must be '<{'|'.join(METHODS)}> <path>', got {step['request']!r}")
+        self.url = compile_template(f"{url_base}{self.path.strip()}", known, where)
+        self.body = compile_template(step["body"], known, where) if "body" in step else None
+        self.params = compile_template(step["params"], known, where) if "params" in step else None
+        default_headers = "json" if self.body is not None or self.method in ("POST", "PUT") else "get"
+        header_name = step.get("headers", "none" if self.method == "DELETE" else default_headers)
+        if header_name not in HEADERS:
+            raise ValueError(f"{where}: headers must be one of {sorted(HEADERS)}")
+        self.headers = HEADERS[header_name]
+        self.auth = auth if step.get("auth", True) else None
+        self.expect = step["expect"]
+        # the expected response is read and its matchers compiled now, a wrong file name fails the compilation
+        validate = ValidateResponse()
+        try:
+            validate.get_body_validator(self.expect)
+            validate.get_header_validator(self.expect)
+        except FileNotFoundError:
+            raise ValueError(f"{where}: no input_json file {self.expect}.json") from None
+        self.saves = [(name, compile_path(path, where)) for name, path in step.get("save", {}).items()]
+        self.cleanup = step.get("cleanup")
+        if self.cleanup is not None and self.cleanup not in CLEANUP_KINDS:
+            raise ValueError(f"{where}: cleanup must be one of {list(CLEANUP_KINDS)}")
+
+    def run(self, rest_client, validate, variables):
+        url = self.url(variables)
+        response = rest_client.send_request(
+            self.method,
+            url=url,
+            body=self.body(variables) if self.body is not None else None,
+            headers=self.headers,
+            auth=self.auth,
+            params=self.params(variables) if self.params is not None else None
+        )
+        if self.cleanup is not None and isinstance(response["body"], dict) and "id" in response["body"]:
+            # registered before the validation, a failing step does not leak what it created
+            resource_id = response["body"]["id"]
+            get_cleanup_registry().register(self.cleanup, resource_id, f"{url}/{resource_id}")
+        validate.validate_response(response, self.expect)
+        for name, extract in self.saves:
+            variables[name] = extract(response)
+        return response
+
+
+def compile_template(template, known, where):
+    """
+    Function building a value from the variables of a run. The template is compiled once into nested
+    functions, one per dict, list and string with placeholders, the parts without placeholders are built
+    once and shared by every run, they must not be modified
+    :param template: (dict|list|str) body, params, path or variable of a scenario
+    :param known: (set) variables defined when the template is used, any other placeholder must be a data pool field
+    :param where: (str) position of the template, used in the errors
+    :return: (callable) function receiving the ScenarioVariables
+    """
+    build = _compile_node(template, known, where)
+    return _Constant(template) if build is None else build
+
+
+def _compile_node(template, known, where):
+    # function building the template, None when the template has no placeholder
+    if isinstance(template, dict):
+        return _compile_dict(template, known, where)
+    if isinstance(template, list):
+        return _compile_list(template, known, where)
+    if isinstance(template, str):
+        return _compile_str(template, known, where)
+    return None
+
+
+def _compile_dict(template, known, where):
+    builds = {key: _compile_node(value, known, where) for key, value in template.items()}
+    if all(build is None for build in builds.values()):
+        return None
+    items = [(key, _Constant(template[key]) if build is None else build) for key, build in builds.items()]
+
+    def build_dict(variables):
+        return {key: build(variables) for key, build in items}
+    return build_dict
+
+
+def _compile_list(template, known, where):
+    builds = [_compile_node(value, known, where) for value in template]
+    if all(build is None for build in builds):
+        return None
+    items = [_Constant(value) if build is None else build for value, build in zip(template, builds)]
+
+    def build_list(variables):
+        return [build(variables) for build in items]
+    return build_list
+
+
+def _compile_str(template, known, where):
+    pattern = []
+    fields = []
+    for literal, field, format_spec, conversion in _formatter.parse(template):
+        pattern.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in known and field not in FIELDS:
+            raise ValueError(f"{where}: unknown placeholder {{{field}}} in {template!r}")
+        if format_spec or conversion:
+            raise ValueError(f"{where}: format specs are not supported in {template!r}")
+        pattern.append("{}")
+        fields.append(field)
+    if not fields:
+        return None
+    pattern = "".join(pattern)
+    if pattern == "{}":
+        # the whole value is a variable, its type is kept
+        field = fields[0]
+
+        def build_variable(variables):
+            return variables[field]
+        return build_variable
+
+    def build_str(variables):
+        return pattern.format(*[variables[field] for field in fields])
+    return build_str
+
+
+def compile_path(path, where):
+    """
+    :param path: (str) dotted path in the response, e.g. body.id or headers.Location
+    :param where: (str) position of the step, used in the errors
+    :return: (callable) function receiving the RestResponse
+    """
+    root, *keys = path.split(".")
+    if root not in ("body", "headers", "status_code"):
+        raise ValueError(f"{where}: saved paths start with body, headers or status_code, got {path!r}")
+
+    def extract(response):
+        value = response[root]
+        for key in keys:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        return value
+    return extract
+
+
+class _Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, variables):
+        return self.value
+
@@ -1,20 +1,30 @@
 import json
 import logging
+import pathlib
+import threading
 
-import jsonschema
-
+from helper.response_matcher import compile_body_matcher, compile_header_matcher
 from utils.logger import get_logger
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
+INPUT_JSON_PATH = pathlib.Path(__file__).resolve().parent.parent / "src" / "api" / "input_json"
+
+# expected responses and compiled matchers, shared by every ValidateResponse of the session
+_expected_responses = {}
+_body_validators = {}
+_header_validators = {}
+_cache_lock = threading.Lock()
+
+
 class ValidateResponse:
     def validate_response(self, actual_response, file_name):
-        expected_response = self.read_input_data(f"C:/Users/Karla.Arce/PycharmProjects/JiraAPI/src/api/input_json/{file_name}.json")
-        self.validate_value(actual_response["body"], expected_response["body"], "body")
+        expected_response = self.get_expected_response(file_name)
+        self.validate_value(actual_response["body"], expected_response["body"], "body", self.get_body_validator(file_name))
         self.validate_value(actual_response["status_code"], expected_response["status_code"], "status_code")
-        self.validate_value(actual_response["headers"], expected_response["headers"], "headers")
+        self.validate_value(actual_response["headers"], expected_response["headers"], "headers", self.get_header_validator(file_name))
 
-    def validate_value(self, actual_value, expected_value, key_compare):
+    def validate_value(self, actual_value, expected_value, key_compare, validator=None):
         if key_compare == "status_code":
             LOGGER.debug(f"Actual status code: %s", actual_value)
             LOGGER.debug(f"Expected status code: %s", expected_value)
@@ -24,23 +34,70 @@ class ValidateResponse:
         elif key_compare == "headers":
             LOGGER.debug(f"Actual headers: %s", actual_value)
             LOGGER.debug(f"Expected headers: %s", expected_value)
-            assert (
-                expected_value.items() <= expected_value.items()
-            ), f"Expected headers: {expected_value} but received {actual_value}"
+            if validator is None:
+                validator = compile_header_matcher(expected_value)
+            error = validator(actual_value)
+            if error is not None:
+                LOGGER.debug("Header validator error: %s", error)
+            assert error is None, f"Expected headers: {expected_value} but received {actual_value}"
         elif key_compare == "body":
-            schema = False
             LOGGER.debug(f"Actual body: %s", actual_value)
             LOGGER.debug(f"Expected body: %s", expected_value)
-            try:
-                jsonschema.validate(instance=actual_value, schema=expected_value)
-                schema = True
-            except jsonschema.exceptions.ValidationError as e:
-                LOGGER.debug("JSON validator error: %s", e)
-            assert schema, f"Expected body: {expected_value} but received {actual_value}"
+            if validator is None:
+                validator = compile_body_matcher(expected_value)
+            error = validator(actual_value)
+            if error is not None:
+                LOGGER.debug("JSON validator error: %s", error)
+            assert error is None, f"Expected body: {expected_value} but received {actual_value}"
+
+    def get_expected_response(self, file_name):
+        """
+        Expected response of an input_json file, all the files are read on the first call
+        :param file_name: (str) input_json file name without extension
+        :return: (dict) expected response
+        """
+        if not _expected_responses:
+            self.preload_expected_responses()
+        if file_name not in _expected_responses:
+            with _cache_lock:
+                _expected_responses[file_name] = self.read_input_data(INPUT_JSON_PATH / f"{file_name}.json")
+        return _expected_responses[file_name]
+
+    def get_body_validator(self, file_name):
+        """
+        Compiled matcher of the expected body schema, built once per file name
+        :param file_name: (str) input_json file name without extension
+        :return: (callable) body matcher
+        """
+        validator = _body_validators.get(file_name)
+        if validator is None:
+            validator = compile_body_matcher(self.get_expected_response(file_name)["body"])
+            with _cache_lock:
+                _body_validators[file_name] = validator
+        return validator
+
+    def get_header_validator(self, file_name):
+        """
+        Compiled matcher of the expected headers, built once per file name
+        :param file_name: (str) input_json file name without extension
+        :return: (callable) headers matcher
+        """
+        validator = _header_validators.get(file_name)
+        if validator is None:
+            validator = compile_header_matcher(self.get_expected_response(file_name)["headers"])
+            with _cache_lock:
+                _header_validators[file_name] = validator
+        return validator
+
+    def preload_expected_responses(self):
+        with _cache_lock:
+            for path in sorted(INPUT_JSON_PATH.glob("*.json")):
+                _expected_responses.setdefault(path.stem, self.read_input_data(path))
+        LOGGER.debug("Expected responses loaded: %s", len(_expected_responses))
 
     def read_input_data(self, file_name):
-        LOGGER.debug(f"Reading input data from {file_name}")
+        LOGGER.debug("Reading input data from %s", file_name)
         with open(file_name, encoding="utf-8") as f:
             data = json.load(f)
-        LOGGER.debug(f"Content data {data}")
+        LOGGER.debug("Content data %s", data)
         return data
@@ -0,0 +1,132 @@
+"""
+worklogs.py
+Worklog bodies and the bulk import of worklogs: thousands of worklogs spread over several issues and
+sent concurrently, the load of a time tracking import
+
+    python -m helper.worklogs --issues 20 --worklogs 5000
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from config.config import url_base, headers, auth, jira_mock, jira_mock_port, async_concurrency
+from helper.async_rest_client import AsyncRestClient
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.jira_mock_server import JiraMockServer
+from helper.provisioner import create_project_resource, create_issue_resource
+from helper.rest_client import get_rest_client
+from utils.latency_histogram import LatencyHistogram, PERCENTILES
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+STARTED_FORMAT = "%Y-%m-%dT%H:%M:%S.000%z"
+# an import neither changes the remaining estimates nor emails the watchers of every issue
+IMPORT_PARAMS = {"adjustEstimate": "leave", "notifyUsers": False}
+IMPORT_TIME_SPENT = "15m"
+
+
+def worklog_body(time_spent="1h", started=None, comment=None):
+    """
+    :param time_spent: (str) duration in Jira notation, e.g. 1h 30m
+    :param started: (datetime) start of the work, now by default
+    :param comment: (str) text of the worklog comment, no comment by default
+    :return: (dict) body of POST and PUT issue/{id}/worklog
+    """
+    started = started or datetime.now(timezone.utc)
+    body = {"started": started.strftime(STARTED_FORMAT), "timeSpent": time_spent}
+    if comment is not None:
+        body["comment"] = {
+            "content": [{"content": [{"text": comment, "type": "text"}], "type": "paragraph"}],
+            "type": "doc",
+            "version": 1
+        }
+    return body
+
+
+def import_worklogs(issue_ids, count, time_spent=IMPORT_TIME_SPENT, async_client=None):
+    """
+    Add worklogs round robin over the issues, all of them sent as one concurrent batch. The worklogs of
+    an issue follow each other back in time from now. They are not registered for cleanup, deleting
+    their issues removes them
+    :param issue_ids: (list) ids of the issues receiving the worklogs
+    :param count: (int) worklogs to add
+    :param time_spent: (str) duration of every worklog
+    :param async_client: (AsyncRestClient) client sending the batch
+    :return: (dict) created and failed worklogs, duration and worklogs_per_second of the batch,
+                    mean, p50, p90, p99 and max response time in seconds
+    """
+    async_client = async_client or AsyncRestClient()
+    data = get_data_pool()
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    requests_list = [
+        {
+            "method_name": "POST",
+            "url": f"{url_base}issue/{issue_ids[number % len(issue_ids)]}/worklog",
+            "headers": headers,
+            "auth": auth,
+            "body": worklog_body(time_spent, now - timedelta(minutes=15 * (number // len(issue_ids) + 1)), data.sentence()),
+            "params": IMPORT_PARAMS
+        }
+        for number in range(count)
+    ]
+    start = time.perf_counter()
+    responses = async_client.send_many(requests_list)
+    duration = time.perf_counter() - start
+    histogram = LatencyHistogram()
+    created = 0
+    for response in responses:
+        if response["status_code"] == 201:
+            created += 1
+        if "time" in response:
+            histogram.record(response["time"])
+    report = {
+        "worklogs": count,
+        "created": created,
+        "failed": count - created,
+        "duration": duration,
+        "worklogs_per_second": created / duration if duration else 0.0,
+        "mean": histogram.mean()
+    }
+    report.update({f"p{percentile}": histogram.percentile(percentile) for percentile in PERCENTILES})
+    report["max"] = histogram.max / 1_000_000 if histogram.count else None
+    LOGGER.info("Worklog import: %s created, %s failed in %.2fs", created, count - created, duration)
+    return report
+
+
+def print_report(report):
+    print(f"\nWorklogs: {report['created']} created, {report['failed']} failed in {report['duration']:.2f}s")
+    print(f"Throughput: {report['worklogs_per_second']:.1f} worklogs/s")
+    print(f"{'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)")
+    print(" ".join(f"{(report[column] or 0) * 1e3:>8.1f}" for column in ("mean", "p50", "p90", "p99", "max")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import worklogs concurrently and report the throughput")
+    parser.add_argument("--issues", type=int, default=10, help="issues created to receive the worklogs")
+    parser.add_argument("--worklogs", type=int, default=1000, help="worklogs added over all the issues")
+    parser.add_argument("--concurrency", type=int, default=async_concurrency, help="worklogs in flight at the same time")
+    parser.add_argument("--time-spent", default=IMPORT_TIME_SPENT, help="duration of every worklog, e.g. 15m")
+    args = parser.parse_args(argv)
+
+    mock_server = JiraMockServer(port=jira_mock_port).start() if jira_mock else None
+    registry = get_cleanup_registry()
+    try:
+        rest_client = get_rest_client()
+        project_id = create_project_resource(rest_client)
+        # deleting the project removes the issues and their worklogs
+        registry.register_project(project_id)
+        issue_ids = [create_issue_resource(rest_client, project_id) for _ in range(args.issues)]
+        async_client = AsyncRestClient(concurrency=args.concurrency, limit_per_host=args.concurrency)
+        report = import_worklogs(issue_ids, args.worklogs, args.time_spent, async_client)
+    finally:
+        registry.cleanup()
+        if mock_server is not None:
+            mock_server.stop()
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import logging
+import os
+import random
+import pytest
+
+from config.config import url_base, auth, get_headers
+from helper.attachments import upload_attachment, download_attachment, file_sha256
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
+from helper.validate_response import ValidateResponse
+from utils.logger import get_logger, LazyJson
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+class TestAttachments:
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
+        cls.validate = ValidateResponse()
+        cls.data = get_data_pool()
+
+    def setup_method(self):
+        self.response = None
+
+    def upload(self, issue_id, directory, size=64 * 1024):
+        """
+        Upload a file of random bytes to the issue, the bytes follow from the name drawn from the data pool
+        so a replayed download matches the file
+        :param issue_id: (str) id of the issue
+        :param directory: (pathlib.Path) directory of the file
+        :param size: (int) bytes of the file
+        :return: (tuple) path of the file and RestResponse of the upload
+        """
+        path = directory / f"{self.data.word()}.bin"
+        with open(path, "wb") as f:
+            f.write(random.Random(path.name).randbytes(size))
+        response = upload_attachment(issue_id, path, rest_client=self.rest_client)
+        if response.status_code == 200:
+            for attachment in response["body"]:
+                self.cleanup_registry.register_attachment(attachment["id"])
+        return path, response
+
+    @pytest.mark.acceptance
+    def test_add_attachment(self, worker_issue, test_log_name, tmp_path):
+        """
+        Test for attaching a file to an issue
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        path, self.response = self.upload(worker_issue, tmp_path)
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "add_attachment")
+        assert self.response["body"][0]["size"] == os.path.getsize(path), f"Expected {os.path.getsize(path)} bytes but received {self.response['body']}"
+
+    @pytest.mark.acceptance
+    def test_get_attachment(self, create_issue, test_log_name, tmp_path):
+        """
+        Test to get the metadata of an attachment
+        :param create_issue: (str) id of an issue
+        :param test_log_name: (str) log test name
+        """
+        _, upload = self.upload(create_issue, tmp_path)
+        # call GET endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}attachment/{upload['body'][0]['id']}",
+            headers=get_headers,
+            auth=auth
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "get_attachment")
+
+    @pytest.mark.acceptance
+    def test_download_attachment(self, create_issue, test_log_name, tmp_path):
+        """
+        Test that the downloaded content is the uploaded file
+        :param create_issue: (str) id of an issue
+        :param test_log_name: (str) log test name
+        """
+        path, upload = self.upload(create_issue, tmp_path, size=3 * 1024 * 1024 + 17)
+        download = download_attachment(upload["body"][0]["id"], tmp_path / "download.bin", rest_client=self.rest_client)
+        self.response = download.response
+        # Assertion
+        assert self.response.status_code == 200, f"Expected Status Code: 200 but received {self.response.status_code}"
+        assert download.size == os.path.getsize(path), f"Expected {os.path.getsize(path)} bytes but received {download.size}"
+        assert download.sha256 == file_sha256(path), "Downloaded content differs from the uploaded file"
+
+    @pytest.mark.acceptance
+    def test_delete_attachment(self, create_issue, test_log_name, tmp_path):
+        """
+        Test attachment deletion
+        :param create_issue: (str) id of an issue
+        :param test_log_name: (str) log test name
+        """
+        _, upload = self.upload(create_issue, tmp_path)
+        # call DELETE endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "DELETE",
+            url=f"{url_base}attachment/{upload['body'][0]['id']}",
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "delete_attachment")
+
+    @pytest.mark.functional
+    def test_add_attachment_with_incorrect_issue_id(self, test_log_name, tmp_path):
+        """
+        Test for attaching a file to an issue that does not exist
+        :param test_log_name: (str) log test name
+        """
+        _, self.response = self.upload("123", tmp_path)
+        # Assertion
+        self.validate.validate_response(self.response, "add_attachment_with_incorrect_issue_id")
+
+    @pytest.mark.functional
+    def test_get_attachment_with_incorrect_attachment_id(self, test_log_name):
+        """
+        Test to get an attachment that does not exist
+        :param test_log_name: (str) log test name
+        """
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}attachment/123",
+            headers=get_headers,
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "get_attachment_with_incorrect_id")
@@ -0,0 +1,95 @@
+import logging
+import random
+import pytest
+
+from config.config import url_base, headers, auth, get_headers, cassette_mode
+from helper.attachments import upload_attachment, download_attachment, file_sha256
+from helper.cassette import Cassette, INLINE_CONTENT_LIMIT
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import RestClient
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+# the cassettes of these tests record the mock or Jira, a replayed session has neither behind url_base
+pytestmark = pytest.mark.skipif(cassette_mode == "replay", reason="records its own cassette")
+
+
+class TestCassettes:
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.data = get_data_pool()
+
+    def send(self, client, issue_id):
+        """
+        Requests of the round trip: a success, a missing issue and a comment without body
+        :return: (list) status code and body of every response
+        """
+        responses = [
+            client.send_request("GET", url=f"{url_base}issue/{issue_id}", headers=get_headers, auth=auth),
+            client.send_request("GET", url=f"{url_base}issue/00000", headers=get_headers, auth=auth),
+            client.send_request("POST", url=f"{url_base}issue/{issue_id}/comment", headers=headers, auth=auth)
+        ]
+        return [(response.status_code, response.body) for response in responses]
+
+    @pytest.mark.functional
+    def test_replay_recorded_responses(self, worker_issue, test_log_name, tmp_path):
+        """
+        Test that a replayed cassette answers like the server it was recorded from, a streamed download included
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        path = tmp_path / f"{self.data.word()}.bin"
+        with open(path, "wb") as f:
+            f.write(random.Random(path.name).randbytes(2 * INLINE_CONTENT_LIMIT + 1))
+        recorder = Cassette.record(str(tmp_path / "jira"))
+        client = RestClient(cassette=recorder)
+        recorded = self.send(client, worker_issue)
+        upload = upload_attachment(worker_issue, path, rest_client=client)
+        self.cleanup_registry.register_attachment(upload["body"][0]["id"])
+        attachment_id = upload["body"][0]["id"]
+        recorded_download = download_attachment(attachment_id, tmp_path / "recorded.bin", rest_client=client)
+        client.close()
+        recorder.close()
+
+        player = Cassette.replay(str(tmp_path / "jira"))
+        client = RestClient(cassette=player)
+        replayed = self.send(client, worker_issue)
+        replayed_download = download_attachment(attachment_id, tmp_path / "replayed.bin", rest_client=client)
+        client.close()
+        player.close()
+        # Assertion
+        assert [status_code for status_code, _ in recorded] == [200, 404, 400], f"Unexpected recorded responses {recorded}"
+        assert replayed == recorded, f"Expected the recorded responses {recorded} but received {replayed}"
+        assert recorded_download.sha256 == file_sha256(path), "Recorded download differs from the uploaded file"
+        assert replayed_download.sha256 == recorded_download.sha256, "Replayed download differs from the recorded one"
+
+    @pytest.mark.functional
+    def test_replay_without_recorded_response(self, worker_issue, test_log_name, tmp_path):
+        """
+        Test that a request whose outcome was never recorded fails instead of getting another response
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        recorder = Cassette.record(str(tmp_path / "jira"))
+        client = RestClient(cassette=recorder)
+        client.send_request("GET", url=f"{url_base}issue/{worker_issue}", headers=get_headers, auth=auth)
+        client.close()
+        recorder.close()
+
+        player = Cassette.replay(str(tmp_path / "jira"))
+        client = RestClient(cassette=player)
+        # the issue was never returned by a replayed response, only its success was recorded
+        missing = client.send_request("GET", url=f"{url_base}issue/99999", headers=get_headers, auth=auth)
+        without_body = client.send_request("POST", url=f"{url_base}issue/{worker_issue}/comment", headers=headers, auth=auth)
+        client.close()
+        player.close()
+        # Assertion
+        assert missing.status_code is None, f"Expected no recorded response but received {missing.status_code}"
+        assert without_body.status_code is None, f"Expected no recorded response but received {without_body.status_code}"
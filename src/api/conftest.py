@@ -1,14 +1,92 @@
-import json
 import pytest
-import requests
 import logging
-from faker import Faker
+import math
+from collections import Counter
 
-from config.config import url_base, headers, auth, account_id
+from config.config import jira_mock, jira_mock_port, xdist_worker, xdist_worker_count
+from helper.cleanup_registry import get_cleanup_registry
+from helper.jira_mock_server import JiraMockServer
+from helper.provisioner import get_provisioner, required_depth, DEPTHS, ISSUE
+from helper.rest_client import get_rest_client
 from utils.logger import get_logger
 
 LOGGER = get_logger(__name__, logging.DEBUG)
-faker = Faker()
+
+
+@pytest.fixture(scope="session")
+def rest_client():
+    """
+    Pooled client shared by every fixture and test of the session
+    """
+    client = get_rest_client()
+    yield client
+    client.close()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(items):
+    # the provisioner builds exactly as many stacks as the collected tests will take
+    demand = Counter(required_depth(item.fixturenames) for item in items)
+    provisioner = get_provisioner()
+    for depth in DEPTHS:
+        # every xdist worker collects the whole suite and runs about its share of it
+        provisioner.set_demand(depth, math.ceil(demand[depth] / xdist_worker_count))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def jira_mock_server():
+    """
+    Local Jira stand-in serving url_base, only started when JIRA_MOCK=true
+    """
+    if not jira_mock:
+        yield None
+        return
+    server = JiraMockServer(port=jira_mock_port).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cleanup_registry(jira_mock_server):
+    """
+    Delete every resource created during the session once all the tests finished
+    """
+    registry = get_cleanup_registry()
+    yield registry
+    registry.cleanup()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def provisioner(rest_client, cleanup_registry):
+    """
+    Start building the projects/issues/comments the session needs before the first test
+    """
+    resource_provisioner = get_provisioner()
+    resource_provisioner.start()
+    yield resource_provisioner
+    unused = resource_provisioner.shutdown()
+    LOGGER.debug("Provisioned stacks not used: %s", len(unused))
+
+
+@pytest.fixture(scope="session")
+def worker_namespace(provisioner):
+    """
+    Project and issue owned by this process, the tests of other xdist workers never touch them
+    """
+    stack = provisioner.build_stack(ISSUE)
+    LOGGER.info("Namespace of worker '%s': %s", xdist_worker or "main", stack)
+    return stack
+
+
+@pytest.fixture
+def worker_project(worker_namespace):
+    return worker_namespace.project_id
+
+
+@pytest.fixture
+def worker_issue(worker_namespace):
+    return worker_namespace.issue_id
+
 
 # Arrange
 @pytest.fixture
@@ -19,124 +97,40 @@ def test_log_name(request):
     request.addfinalizer(end)
 
 @pytest.fixture
-def create_project():
+def provisioned_stack(request, provisioner):
+    """
+    Ready-made project/issue/comment stack, deep enough for the fixtures the test uses
+    """
+    stack = provisioner.acquire(required_depth(request.fixturenames))
+    LOGGER.info("Provisioned stack: %s", stack)
+    return stack
+
+# Arrange
+@pytest.fixture
+def create_project(provisioned_stack):
     LOGGER.info("Create project fixture")
-    # body to create a project
-    project_body = {
-        "key": f"A{faker.currency_code()}",
-        "name": f"Project {faker.aba()}",
-        "leadAccountId": f"{account_id}",
-        "projectTypeKey": "business"
-    }
-    # call endpoint using requests
-    response = requests.post(
-        url=f"{url_base}project",
-        json=project_body,
-        headers=headers,
-        auth=auth
-    )
-    LOGGER.debug(json.dumps(response.json(), indent=4))
     # get project id
-    project_id = response.json()["id"]
-    yield project_id
-    delete_project(project_id)
+    project_id = provisioned_stack.project_id
+    return project_id
 
 # Arrange
 @pytest.fixture
-def create_issue(create_project):
+def create_issue(provisioned_stack, create_project):
     LOGGER.info("Create issue fixture")
-    # body
-    issue_body = {
-        "fields": {
-            "issuetype": {
-                "id": "10034"
-            },
-            "project": {
-                "id": f"{create_project}"
-            },
-            "summary": "Task issue from fixture"
-        },
-        "update": {}
-    }
-    # call endpoint using requests
-    response = requests.post(
-        url=f"{url_base}issue",
-        json=issue_body,
-        headers=headers,
-        auth=auth
-    )
-    LOGGER.debug(json.dumps(response.json(), indent=4))
     # get issue id
-    issue_id = response.json()["id"]
-    yield issue_id
-    # delete_issue(issue_id)
+    issue_id = provisioned_stack.issue_id
+    return issue_id
 
 @pytest.fixture
-def add_comment(create_issue):
+def add_comment(provisioned_stack, create_issue):
     LOGGER.info("Add Comment fixture")
-    # body
-    comment_body = {
-        "body": {
-            "content": [
-                {
-                    "content": [
-                        {
-                            "text": f"{faker.sentence()}",
-                            "type": "text"
-                        }
-                    ],
-                    "type": "paragraph"
-                }
-            ],
-            "type": "doc",
-            "version": 1
-        }
-    }
-    # call endpoint using requests
-    response = requests.post(
-        url=f"{url_base}issue/{create_issue}/comment",
-        json=comment_body,
-        headers=headers,
-        auth=auth
-    )
-    LOGGER.debug(json.dumps(response.json(), indent=4))
     # get comment id
-    comment_id = response.json()["id"]
-    yield comment_id
-    # delete_comment(comment_id)
-
-def delete_comment(comment_id):
-    LOGGER.info("Delete comment fixture (yield)")
-    response = requests.delete(
-        url=f"{url_base}issue/EXU-1/comment/{comment_id}",
-        auth=auth
-    )
-    LOGGER.debug("Status Code: %s", str(response.status_code))
-    if response.status_code == 204:
-        LOGGER.debug("Comment deleted")
-    else:
-        LOGGER.debug("No comment found to delete")
-
-def delete_issue(issue_id):
-    LOGGER.info("Delete issue fixture (yield)")
-    response = requests.delete(
-        url=f"{url_base}issue/{issue_id}",
-        auth=auth
-    )
-    LOGGER.debug("Status Code: %s", str(response.status_code))
-    if response.status_code == 204:
-        LOGGER.debug("Issue deleted")
-    else:
-        LOGGER.debug("No issue found to delete")
-
-def delete_project(project_id):
-    LOGGER.info("Delete project fixture (yield)")
-    response = requests.delete(
-        url=f"{url_base}project/{project_id}",
-        auth=auth
-    )
-    LOGGER.debug("Status Code: %s", str(response.status_code))
-    if response.status_code == 204:
-        LOGGER.debug("Project deleted")
-    else:
-        LOGGER.debug("No project found to delete")
+    comment_id = provisioned_stack.comment_id
+    return comment_id
+
+@pytest.fixture
+def add_worklog(provisioned_stack, create_issue):
+    LOGGER.info("Add Worklog fixture")
+    # get worklog id
+    worklog_id = provisioned_stack.worklog_id
+    return worklog_id
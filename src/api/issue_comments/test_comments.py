@@ -1,14 +1,13 @@
-import json
 import logging
 import pytest
-import requests
 
-from faker import Faker
 from config.config import url_base, headers, auth, get_headers
-from helper.rest_client import RestClient
+from helper.adf_documents import adf_document, comment_body
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
 from helper.validate_response import ValidateResponse
-from utils.influxdb_connection import InfluxDBConnection
-from utils.logger import get_logger
+from utils.logger import get_logger, LazyJson
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
@@ -19,22 +18,19 @@ class TestIssueComments:
         Setup before running tests
         """
         # Arrange
-        cls.comments_list = []
-        cls.rest_client = RestClient()
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
         cls.validate = ValidateResponse()
-        cls.faker = Faker()
-        cls.influxdb_client = InfluxDBConnection()
+        cls.data = get_data_pool()
 
     def setup_method(self):
         self.response = None
 
-    def teardown_method(self):
-        self.influxdb_client.store_data_influxdb(self.response, "comments")
-
     @pytest.mark.acceptance
-    def test_add_comment(self, test_log_name):
+    def test_add_comment(self, worker_issue, test_log_name):
         """
         Test for adding a comment to an issue
+        :param worker_issue: (str) id of the issue of the worker
         :param test_log_name: (str) log test name
         """
         # body to create a comment
@@ -44,7 +40,7 @@ class TestIssueComments:
                     {
                         "content": [
                             {
-                                "text": f"{self.faker.sentence()}",
+                                "text": self.data.sentence(),
                                 "type": "text"
                             }
                         ],
@@ -58,13 +54,15 @@ class TestIssueComments:
         # call endpoint using rest client
         self.response = self.rest_client.send_request(
             "POST",
-            url=f"{url_base}issue/EXU-1/comment",
+            url=f"{url_base}issue/{worker_issue}/comment",
             body=comment_body,
             headers=headers,
             auth=auth
         )
-        self.comments_list.append(self.response["body"]["id"])
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        comment_id = self.response["body"].get("id")
+        if comment_id is not None:
+            self.cleanup_registry.register_comment(worker_issue, comment_id)
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "add_comment")
 
@@ -82,7 +80,7 @@ class TestIssueComments:
             headers=get_headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "get_comment")
 
@@ -139,33 +137,58 @@ class TestIssueComments:
         self.validate.validate_response(self.response, "delete_comment")
 
     @pytest.mark.functional
-    def test_add_comment_without_body(self, test_log_name):
+    def test_add_comment_without_body(self, worker_issue, test_log_name):
         """
         Test for add comment without body
+        :param worker_issue: (str) id of the issue of the worker
         :param test_log_name: (str) log test name
         """
         self.response = self.rest_client.send_request(
             "POST",
-            url=f"{url_base}issue/EXU-1/comment",
+            url=f"{url_base}issue/{worker_issue}/comment",
             headers=headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "add_comment_without_body")
 
-    @classmethod
-    def teardown_class(cls):
-        """
-        Clean up all comments after running tests
-        """
-        # Cleanup comments
-        LOGGER.info("Test Comments teardown class")
-        for comment_id in cls.comments_list:
-            response = requests.delete(
-                url=f"{url_base}issue/EXU-1/comment/{comment_id}",
-                auth=auth
-            )
-            LOGGER.debug("Status Code: %s", str(response.status_code))
-            if response.status_code == 204:
-                LOGGER.debug("Comment deleted")
+    @pytest.mark.functional
+    def test_add_comment_with_nested_body(self, worker_issue, test_log_name):
+        """
+        Test that a comment of several paragraphs and nested bullet lists is kept as it was sent
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        document = adf_document(paragraphs=8, depth=4)
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/{worker_issue}/comment",
+            body=comment_body(document),
+            headers=headers,
+            auth=auth
+        )
+        comment_id = self.response["body"].get("id")
+        if comment_id is not None:
+            self.cleanup_registry.register_comment(worker_issue, comment_id)
+        # Assertion
+        self.validate.validate_response(self.response, "add_comment")
+        assert self.response["body"]["body"] == document, f"Expected the document sent but received {self.response['body']['body']}"
+
+    @pytest.mark.functional
+    def test_add_comment_with_too_long_body(self, worker_issue, test_log_name):
+        """
+        Test for adding a comment longer than the limit of Jira
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/{worker_issue}/comment",
+            body=comment_body(adf_document(paragraphs=256)),
+            headers=headers,
+            auth=auth
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "add_comment_with_too_long_body")
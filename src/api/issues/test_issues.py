@@ -1,15 +1,14 @@
-import json
 import logging
 import pytest
-import requests
 
-from faker import Faker
 from config.config import url_base, headers, auth, get_headers, params
-from helper.rest_client import RestClient
+from helper.adf_documents import adf_document
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
 from helper.validate_response import ValidateResponse
 from src.api.conftest import create_project
-from utils.influxdb_connection import InfluxDBConnection
-from utils.logger import get_logger
+from utils.logger import get_logger, LazyJson
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
@@ -20,22 +19,19 @@ class TestIssues:
         Setup before running tests
         """
         # Arrange
-        cls.issue_list = []
-        cls.rest_client = RestClient()
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
         cls.validate = ValidateResponse()
-        cls.faker = Faker()
-        cls.influxdb_client = InfluxDBConnection()
+        cls.data = get_data_pool()
 
     def setup_method(self):
         self.response = None
 
-    def teardown_method(self):
-        self.influxdb_client.store_data_influxdb(self.response, "issues")
-
     @pytest.mark.acceptance
-    def test_create_issue(self, test_log_name):
+    def test_create_issue(self, worker_project, test_log_name):
         """
         Test for issue creation with a project id
+        :param worker_project: (str) id of the project of the worker
         :param test_log_name: (str) log test name
         """
         # body to create an issue
@@ -45,9 +41,9 @@ class TestIssues:
                     "id": "10034"
                 },
                 "project": {
-                    "id": "10033"
+                    "id": f"{worker_project}"
                 },
-                "summary": f"Task {self.faker.company()}"
+                "summary": f"Task {self.data.company()}"
             },
             "update": {}
         }
@@ -59,7 +55,9 @@ class TestIssues:
             headers=headers,
             auth=auth
         )
-        self.issue_list.append(self.response["body"]["id"])
+        issue_id = self.response["body"].get("id")
+        if issue_id is not None:
+            self.cleanup_registry.register_issue(issue_id)
         # Assertion
         self.validate.validate_response(self.response, "create_issue")
 
@@ -77,7 +75,7 @@ class TestIssues:
             headers=get_headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "get_issue")
 
@@ -135,15 +133,16 @@ class TestIssues:
             headers=headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "create_issue_without_body")
 
     @pytest.mark.functional
     @pytest.mark.parametrize("issue_summary_test", ["123456789", "∀∁∂∃∄∅∆∇∈∉", "<script>alert('test');</script>"])
-    def test_create_issue_using_different_summary_data(self, test_log_name, issue_summary_test):
+    def test_create_issue_using_different_summary_data(self, worker_project, test_log_name, issue_summary_test):
         """
         Test for issue creation with different data types for the summary
+        :param worker_project: (str) id of the project of the worker
         :param test_log_name: (str) log test name
         """
         # body to create an issue
@@ -153,7 +152,7 @@ class TestIssues:
                     "id": "10034"
                 },
                 "project": {
-                    "id": f"10033"
+                    "id": f"{worker_project}"
                 },
                 "summary": f"{issue_summary_test}"
             },
@@ -167,7 +166,9 @@ class TestIssues:
             headers=headers,
             auth=auth
         )
-        self.issue_list.append(self.response["body"]["id"])
+        issue_id = self.response["body"].get("id")
+        if issue_id is not None:
+            self.cleanup_registry.register_issue(issue_id)
         # Assertion
         self.validate.validate_response(self.response, "create_issue")
 
@@ -188,9 +189,10 @@ class TestIssues:
         self.validate.validate_response(self.response, "get_issue_with_incorrect_id")
 
     @pytest.mark.functional
-    def test_create_issue_without_auth(self, test_log_name):
+    def test_create_issue_without_auth(self, worker_project, test_log_name):
         """
         Test for create issue without auth
+        :param worker_project: (str) id of the project of the worker
         :param test_log_name: (str) log test name
         """
         # body to create an issue
@@ -200,9 +202,9 @@ class TestIssues:
                     "id": "10034"
                 },
                 "project": {
-                    "id": f"10033"
+                    "id": f"{worker_project}"
                 },
-                "summary": f"Task {self.faker.company()}"
+                "summary": f"Task {self.data.company()}"
             },
             "update": {}
         }
@@ -230,7 +232,7 @@ class TestIssues:
                 "project": {
                     "id": f"{create_project}"
                 },
-                "summary": f"Issue {self.faker.company()}"
+                "summary": f"Issue {self.data.company()}"
             },
             "update": {}
         }
@@ -242,22 +244,38 @@ class TestIssues:
             headers=headers,
             auth=auth
         )
-        # self.issue_list.append(response["body"]["id"])
+        # removed together with the project of the create_project fixture
         # Assertion
         self.validate.validate_response(self.response, "create_issue")
 
-    @classmethod
-    def teardown_class(cls):
+    @pytest.mark.functional
+    def test_create_issue_with_too_long_description(self, worker_project, test_log_name):
         """
-        Clean up all issues after running tests
+        Test for issue creation with a description longer than the limit of Jira
+        :param worker_project: (str) id of the project of the worker
+        :param test_log_name: (str) log test name
         """
-        # Cleanup issues
-        LOGGER.info("Test Issue teardown class")
-        for issue_id in cls.issue_list:
-            response = requests.delete(
-                url=f"{url_base}issue/{issue_id}",
-                auth=auth
-            )
-            LOGGER.debug("Status Code: %s", str(response.status_code))
-            if response.status_code == 204:
-                LOGGER.debug("Issue deleted")
+        # body to create an issue
+        issue_body = {
+            "fields": {
+                "issuetype": {
+                    "id": "10034"
+                },
+                "project": {
+                    "id": f"{worker_project}"
+                },
+                "summary": f"Task {self.data.company()}",
+                "description": adf_document(paragraphs=256)
+            },
+            "update": {}
+        }
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue",
+            body=issue_body,
+            headers=headers,
+            auth=auth
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "create_issue_with_too_long_description")
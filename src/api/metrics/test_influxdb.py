@@ -0,0 +1,83 @@
+import gzip
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from config.config import url_base, auth, get_headers
+from helper.rest_client import get_rest_client
+from utils.influxdb_connection import InfluxDBConnection
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+
+class InfluxDBWriteHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in of the InfluxDB write endpoint, keeps every write it receives
+    """
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        url = urlsplit(self.path)
+        self.server.writes.append((url.path, parse_qs(url.query), body.decode("utf-8")))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        LOGGER.debug("InfluxDB stand-in: " + format, *args)
+
+
+@pytest.fixture
+def influxdb_server():
+    """
+    Throwaway http server standing where INFLUXDB_URL points
+    :return: (ThreadingHTTPServer) server, its writes attribute lists (path, query, body) of every write
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InfluxDBWriteHandler)
+    server.writes = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestInfluxDB:
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.rest_client = get_rest_client()
+
+    @pytest.mark.functional
+    def test_store_data_in_one_batch(self, influxdb_server, create_project, test_log_name):
+        """
+        Test that the points of the responses reach InfluxDB as one line protocol write
+        :param influxdb_server: (ThreadingHTTPServer) InfluxDB stand-in
+        :param create_project: (str) id of the project requested
+        :param test_log_name: (str) log test name
+        """
+        host, port = influxdb_server.server_address
+        # the batch is only sent full or on close, never by the flush interval
+        connection = InfluxDBConnection(url=f"http://{host}:{port}", token="test", org="tests", bucket="jira",
+                                        batch_size=3, flush_interval=60000)
+        for _ in range(3):
+            response = self.rest_client.send_request("GET", url=f"{url_base}project/{create_project}", headers=get_headers, auth=auth)
+            connection.store_data_influxdb(response, "project/{id}")
+        connection.close()
+        # Assertion
+        assert len(influxdb_server.writes) == 1, f"Expected one batched write but received {len(influxdb_server.writes)}"
+        path, params, body = influxdb_server.writes[0]
+        lines = body.splitlines()
+        assert path == "/api/v2/write", f"Unexpected write path {path}"
+        assert params["org"] == ["tests"] and params["bucket"] == ["jira"], f"Unexpected write parameters {params}"
+        assert len(lines) == 3, f"Expected 3 points in the batch but received {lines}"
+        assert all(line.startswith("response_time,") for line in lines), f"Unexpected measurement in {lines}"
+        assert all("endpoint=project/{id}" in line and "status=200" in line for line in lines), f"Unexpected tags in {lines}"
+        assert all(" value=" in line or ",value=" in line for line in lines), f"Response time missing in {lines}"
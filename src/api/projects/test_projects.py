@@ -1,14 +1,12 @@
-import json
 import logging
 import pytest
-import requests
 
-from faker import Faker
 from config.config import url_base, headers, auth, get_headers, account_id
-from helper.rest_client import RestClient
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
 from helper.validate_response import ValidateResponse
-from utils.influxdb_connection import InfluxDBConnection
-from utils.logger import get_logger
+from utils.logger import get_logger, LazyJson
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
@@ -19,18 +17,14 @@ class TestProjects:
         Setup before running tests
         """
         # Arrange
-        cls.projects_list = []
-        cls.rest_client = RestClient()
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
         cls.validate = ValidateResponse()
-        cls.faker = Faker()
-        cls.influxdb_client = InfluxDBConnection()
+        cls.data = get_data_pool()
 
     def setup_method(self):
         self.response = None
 
-    def teardown_method(self):
-        self.influxdb_client.store_data_influxdb(self.response, "projects")
-
     @pytest.mark.acceptance
     def test_create_project(self, test_log_name):
         """
@@ -38,9 +32,10 @@ class TestProjects:
         :param test_log_name: (str) log test name
         """
         # body to create a project
+        project_key = self.data.project_key()
         project_body = {
-            "key": f"A{self.faker.currency_code()}",
-            "name": f"Project {self.faker.aba()}",
+            "key": project_key,
+            "name": f"Project {project_key}",
             "leadAccountId": f"{account_id}",
             "projectTypeKey": "business"
         }
@@ -52,8 +47,10 @@ class TestProjects:
             headers=headers,
             auth=auth
         )
-        self.projects_list.append(self.response["body"]["id"])
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        project_id = self.response["body"].get("id")
+        if project_id is not None:
+            self.cleanup_registry.register_project(project_id)
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "create_project")
 
@@ -71,7 +68,7 @@ class TestProjects:
             headers=get_headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "get_project")
 
@@ -126,22 +123,6 @@ class TestProjects:
             headers=headers,
             auth=auth
         )
-        LOGGER.debug("Response: %s", json.dumps(self.response["body"], indent=4))
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
         # Assertion
         self.validate.validate_response(self.response, "create_project_without_body")
-
-    @classmethod
-    def teardown_class(cls):
-        """
-        Clean up all projects after running tests
-        """
-        # Cleanup projects
-        LOGGER.info("Test Project teardown class")
-        for project_id in cls.projects_list:
-            response = requests.delete(
-                url=f"{url_base}project/{project_id}",
-                auth=auth
-            )
-            LOGGER.debug("Status Code: %s", str(response.status_code))
-            if response.status_code == 204:
-                LOGGER.debug("Project deleted")
\ No newline at end of file
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from helper.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from helper.deadline import request_deadline
+from helper.rest_client import RestClient
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+ENDPOINT = "issue/{id}"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request after a second, longer than the timeouts of the tests
+    """
+    def do_GET(self):
+        time.sleep(1)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    """
+    :return: (str) url of a server answering after a second
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"http://{host}:{port}/rest/api/3/issue/10001"
+    server.shutdown()
+    server.server_close()
+
+
+class TestCircuitBreaker:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.record(ENDPOINT, None)
+
+    @pytest.mark.functional
+    def test_open_after_consecutive_failures(self, test_log_name):
+        """
+        Test that the circuit opens on the threshold of consecutive failures and that client errors are answers
+        :param test_log_name: (str) log test name
+        """
+        self.fail(2)
+        self.breaker.record(ENDPOINT, 404)
+        self.fail(2)
+        # Assertion
+        assert self.breaker.state(ENDPOINT) == CLOSED, "A client error must reset the failures"
+        self.breaker.record(ENDPOINT, 503)
+        assert self.breaker.state(ENDPOINT) == OPEN, "Expected the circuit open after 3 consecutive failures"
+        assert not self.breaker.allow(ENDPOINT), "An open circuit must fail fast"
+        assert self.breaker.allow("project/{id}"), "Only the failing endpoint is open"
+
+    @pytest.mark.functional
+    def test_half_open_probe(self, test_log_name):
+        """
+        Test that one probe is let through after the reset timeout, a failed probe opens the circuit again
+        and a successful one closes it
+        :param test_log_name: (str) log test name
+        """
+        self.fail(3)
+        self.clock.now = 29.9
+        # Assertion
+        assert not self.breaker.allow(ENDPOINT), "The circuit must stay open until the reset timeout"
+        self.clock.now = 30
+        assert self.breaker.allow(ENDPOINT), "Expected a probe after the reset timeout"
+        assert self.breaker.state(ENDPOINT) == HALF_OPEN
+        assert not self.breaker.allow(ENDPOINT), "Only one probe at a time"
+        self.breaker.record(ENDPOINT, None)
+        assert self.breaker.state(ENDPOINT) == OPEN, "A failed probe must open the circuit again"
+        self.clock.now = 60
+        assert self.breaker.allow(ENDPOINT)
+        self.breaker.record(ENDPOINT, 200)
+        assert self.breaker.state(ENDPOINT) == CLOSED, "A successful probe must close the circuit"
+        assert self.breaker.allow(ENDPOINT)
+
+    @pytest.mark.functional
+    def test_deadline_timeout_is_not_a_failure(self, slow_server, test_log_name):
+        """
+        Test that a read cut short by the deadline of the test leaves the circuit closed while the same
+        read running out of READ_TIMEOUT counts as a failure
+        :param slow_server: (str) url of a server answering after a second
+        :param test_log_name: (str) log test name
+        """
+        client = RestClient()
+        client.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=self.clock)
+        client.rate_limiter = None
+        client.retry_max = 0
+        with request_deadline(0.3):
+            cut = client.send_request("GET", url=slow_server)
+        deadline_state = client.circuit_breaker.state(ENDPOINT)
+        client.read_timeout = 0.3
+        timed_out = client.send_request("GET", url=slow_server)
+        client.close()
+        # Assertion
+        assert cut.status_code is None and cut.body == {"message": "Deadline Exceeded"}, f"Unexpected response {cut.body}"
+        assert deadline_state == CLOSED, "A timeout cut by the deadline must not count against the endpoint"
+        assert timed_out.body == {"message": "Timeout"}, f"Unexpected response {timed_out.body}"
+        assert client.circuit_breaker.state(ENDPOINT) == OPEN, "A read timeout must count against the endpoint"
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from helper.deadline import request_deadline, remaining_time
+from helper.rest_client import RestClient
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+
+class TestDeadline:
+    @pytest.mark.functional
+    def test_nested_deadline_never_extends(self, test_log_name):
+        """
+        Test that a nested deadline only shortens the budget and that leaving it restores the outer one
+        :param test_log_name: (str) log test name
+        """
+        # the test already runs inside the deadline of the conftest, when there is one
+        test_budget = remaining_time()
+        with request_deadline(10):
+            outer = remaining_time()
+            with request_deadline(60):
+                longer = remaining_time()
+            with request_deadline(1):
+                shorter = remaining_time()
+            with request_deadline(0):
+                disabled = remaining_time()
+            restored = remaining_time()
+        after = remaining_time()
+        # Assertion
+        assert 9 < outer <= 10, f"Unexpected budget {outer}"
+        assert longer <= outer, f"A nested deadline extended the budget to {longer}"
+        assert 0 < shorter <= 1, f"Expected the nested budget but received {shorter}"
+        assert disabled <= outer, "A deadline of 0 must keep the outer one"
+        assert shorter < restored <= outer, f"Expected the outer budget back but received {restored}"
+        if test_budget is None:
+            assert after is None, "Expected no deadline after the block"
+        else:
+            assert outer < after <= test_budget, f"Expected the budget of the test back but received {after}"
+
+    @pytest.mark.functional
+    def test_timeouts_shortened_to_the_deadline(self, test_log_name):
+        """
+        Test that the timeouts of a request never go past the deadline and that nothing is sent after it
+        :param test_log_name: (str) log test name
+        """
+        client = RestClient()
+        client.connect_timeout, client.read_timeout = 5, 30
+        full = client._timeout()
+        with request_deadline(2):
+            shortened = client._timeout()
+        with request_deadline(0.001):
+            while remaining_time() > 0:
+                pass
+            expired = client._timeout()
+            response = client.send_request("GET", url="http://127.0.0.1:9/")
+        client.close()
+        # Assertion
+        assert full == (5, 30), f"Unexpected timeouts {full}"
+        assert shortened[0] <= 2 and shortened[1] <= 2, f"Expected timeouts within the deadline but received {shortened}"
+        assert expired is None, "Expected no timeout after the deadline"
+        assert response.body == {"message": "Deadline Exceeded"}, f"Unexpected response {response.body}"
@@ -0,0 +1,59 @@
+import inspect
+import logging
+import pathlib
+
+import pytest
+
+from helper.rest_client import get_rest_client
+from helper.scenario_plan import load_plans
+from helper.validate_response import ValidateResponse
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+SCENARIO_FILE = pathlib.Path(__file__).resolve().parent / "jira_scenarios.yaml"
+
+
+class TestScenarios:
+    """
+    One test per scenario of jira_scenarios.yaml, the methods are generated below
+    """
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.rest_client = get_rest_client()
+        cls.validate = ValidateResponse()
+
+    def setup_method(self):
+        self.responses = None
+
+
+def scenario_test(plan):
+    """
+    Test method running a compiled plan, its signature requests the fixtures and parameters of the
+    scenario so pytest, the provisioner demand and the load runner resolve them like any other test
+    :param plan: (ScenarioPlan) compiled scenario
+    :return: (function) test method
+    """
+    def test(self, test_log_name, **values):
+        LOGGER.debug("Scenario %s: %s", plan.name, values)
+        self.responses = plan.run(values, self.rest_client, self.validate)
+
+    arguments = ["self", "test_log_name", *plan.fixtures, *plan.parameters]
+    test.__signature__ = inspect.Signature(
+        [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD) for name in arguments]
+    )
+    test.__name__ = test.__qualname__ = f"test_{plan.name}"
+    test.__doc__ = f"Scenario {plan.name}: " + ", ".join(f"{step.method} {step.path}" for step in plan.steps)
+    for name, values in plan.parameters.items():
+        test = pytest.mark.parametrize(name, values)(test)
+    for mark in plan.marks:
+        test = getattr(pytest.mark, mark)(test)
+    return test
+
+
+for scenario_plan in load_plans(SCENARIO_FILE):
+    setattr(TestScenarios, f"test_{scenario_plan.name}", scenario_test(scenario_plan))
@@ -0,0 +1,113 @@
+import logging
+import pytest
+
+from config.config import url_base, headers, auth, get_headers
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.issue_search import search_issues, sweep_issues
+from helper.rest_client import get_rest_client
+from helper.validate_response import ValidateResponse
+from utils.logger import get_logger, LazyJson
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+class TestSearch:
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
+        cls.validate = ValidateResponse()
+        cls.data = get_data_pool()
+
+    def setup_method(self):
+        self.response = None
+
+    def create_issues(self, project_id, summary, count):
+        """
+        Create issues sharing a summary, searching for it finds only them
+        :param project_id: (str) id of the project of the issues
+        :param summary: (str) summary of every issue
+        :param count: (int) issues to create
+        :return: (list) keys of the issues in creation order
+        """
+        keys = []
+        for _ in range(count):
+            response = self.rest_client.send_request(
+                "POST",
+                url=f"{url_base}issue",
+                body={"fields": {"issuetype": {"id": "10034"}, "project": {"id": f"{project_id}"}, "summary": summary}, "update": {}},
+                headers=headers,
+                auth=auth
+            )
+            self.cleanup_registry.register_issue(response["body"]["id"])
+            keys.append(response["body"]["key"])
+        return keys
+
+    @pytest.mark.acceptance
+    def test_search_issues(self, worker_project, test_log_name):
+        """
+        Test to search the issues of a project
+        :param worker_project: (str) id of the project of the worker
+        :param test_log_name: (str) log test name
+        """
+        # call search endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}search",
+            headers=get_headers,
+            auth=auth,
+            params={"jql": f"project = {worker_project}", "fields": "summary", "maxResults": 5}
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "search_issues")
+
+    @pytest.mark.functional
+    def test_search_issues_across_pages(self, worker_project, test_log_name):
+        """
+        Test that the search iterator yields every issue once and in order when they span several pages
+        :param worker_project: (str) id of the project of the worker
+        :param test_log_name: (str) log test name
+        """
+        token = self.data.project_key()
+        keys = self.create_issues(worker_project, f"Search {token}", 5)
+        issues = list(search_issues(f'summary ~ "{token}" ORDER BY id ASC', fields=("summary",), page_size=2, prefetch=2))
+        # Assertion
+        assert [issue["key"] for issue in issues] == keys, f"Expected issues {keys} but found {issues}"
+        assert all(issue["fields"].keys() == {"summary"} for issue in issues), f"Expected only the summary in {issues}"
+
+    @pytest.mark.functional
+    def test_search_issues_with_invalid_jql(self, test_log_name):
+        """
+        Test to search with a field that does not exist
+        :param test_log_name: (str) log test name
+        """
+        # call search endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}search",
+            headers=get_headers,
+            auth=auth,
+            params={"jql": "notAField = 1"}
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "search_issues_with_invalid_jql")
+
+    @pytest.mark.functional
+    def test_sweep_issues(self, worker_project, test_log_name):
+        """
+        Test that the sweep deletes every issue matching the query
+        :param worker_project: (str) id of the project of the worker
+        :param test_log_name: (str) log test name
+        """
+        token = self.data.project_key()
+        keys = self.create_issues(worker_project, f"Leaked {token}", 3)
+        report = sweep_issues(f'summary ~ "{token}"', batch_size=2)
+        remaining = list(search_issues(f'summary ~ "{token}"'))
+        # Assertion
+        assert len(report.deleted) + len(report.submitted) == len(keys), f"Expected {len(keys)} deleted issues but received {report}"
+        assert not remaining, f"Expected no issue left but found {remaining}"
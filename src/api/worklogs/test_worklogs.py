@@ -0,0 +1,165 @@
+import logging
+import pytest
+
+from config.config import url_base, headers, auth, get_headers
+from helper.cleanup_registry import get_cleanup_registry
+from helper.data_pool import get_data_pool
+from helper.rest_client import get_rest_client
+from helper.validate_response import ValidateResponse
+from helper.worklogs import worklog_body, import_worklogs
+from utils.logger import get_logger, LazyJson
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+class TestWorklogs:
+    @classmethod
+    def setup_class(cls):
+        """
+        Setup before running tests
+        """
+        # Arrange
+        cls.cleanup_registry = get_cleanup_registry()
+        cls.rest_client = get_rest_client()
+        cls.validate = ValidateResponse()
+        cls.data = get_data_pool()
+
+    def setup_method(self):
+        self.response = None
+
+    @pytest.mark.acceptance
+    def test_add_worklog(self, worker_issue, test_log_name):
+        """
+        Test for adding a worklog to an issue
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        # call endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/{worker_issue}/worklog",
+            body=worklog_body("1h", comment=self.data.sentence()),
+            headers=headers,
+            auth=auth
+        )
+        worklog_id = self.response["body"].get("id")
+        if worklog_id is not None:
+            self.cleanup_registry.register_worklog(worker_issue, worklog_id)
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "add_worklog")
+
+    @pytest.mark.acceptance
+    def test_get_worklog(self, add_worklog, test_log_name, create_issue):
+        """
+        Test to get a worklog by its id
+        :param add_worklog: (str) id of a worklog
+        :param test_log_name: (str) log test name
+        """
+        # call GET endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}issue/{create_issue}/worklog/{add_worklog}",
+            headers=get_headers,
+            auth=auth
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "get_worklog")
+
+    @pytest.mark.acceptance
+    def test_update_worklog(self, add_worklog, test_log_name, create_issue):
+        """
+        Test for worklog update
+        :param add_worklog: (str) id of a worklog
+        :param test_log_name: (str) log test name
+        """
+        # call PUT endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "PUT",
+            url=f"{url_base}issue/{create_issue}/worklog/{add_worklog}",
+            body=worklog_body("2h"),
+            headers=headers,
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "update_worklog")
+        assert self.response["body"]["timeSpentSeconds"] == 7200, f"Expected 2h logged but received {self.response['body']}"
+
+    @pytest.mark.acceptance
+    def test_delete_worklog(self, add_worklog, test_log_name, create_issue):
+        """
+        Test worklog deletion
+        :param add_worklog: (str) id of a worklog
+        :param test_log_name: (str) log test name
+        """
+        # call DELETE endpoint using rest client
+        self.response = self.rest_client.send_request(
+            "DELETE",
+            url=f"{url_base}issue/{create_issue}/worklog/{add_worklog}",
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "delete_worklog")
+
+    @pytest.mark.functional
+    def test_add_worklog_with_incorrect_issue_id(self, test_log_name):
+        """
+        Test for adding a worklog to an issue that does not exist
+        :param test_log_name: (str) log test name
+        """
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/123/worklog",
+            body=worklog_body("1h"),
+            headers=headers,
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "add_worklog_with_incorrect_issue_id")
+
+    @pytest.mark.functional
+    def test_add_worklog_with_incorrect_body(self, worker_issue, test_log_name):
+        """
+        Test for adding a worklog with a misspelled timeSpent parameter
+        :param worker_issue: (str) id of the issue of the worker
+        :param test_log_name: (str) log test name
+        """
+        body = worklog_body("1h")
+        body["timeSpents"] = body.pop("timeSpent")
+        self.response = self.rest_client.send_request(
+            "POST",
+            url=f"{url_base}issue/{worker_issue}/worklog",
+            body=body,
+            headers=headers,
+            auth=auth
+        )
+        LOGGER.debug("Response: %s", LazyJson(self.response["body"]))
+        # Assertion
+        self.validate.validate_response(self.response, "add_worklog_with_incorrect_body")
+
+    @pytest.mark.functional
+    def test_get_worklog_with_incorrect_worklog_id(self, test_log_name, create_issue):
+        """
+        Test to get a worklog that does not exist
+        :param test_log_name: (str) log test name
+        """
+        self.response = self.rest_client.send_request(
+            "GET",
+            url=f"{url_base}issue/{create_issue}/worklog/123",
+            headers=get_headers,
+            auth=auth
+        )
+        # Assertion
+        self.validate.validate_response(self.response, "get_worklog_with_incorrect_id")
+
+    @pytest.mark.functional
+    def test_import_worklogs(self, create_project, create_issue, test_log_name):
+        """
+        Test that a concurrent import adds every worklog
+        :param create_issue: (str) id of an issue, its project is deleted with the worklogs at cleanup
+        :param test_log_name: (str) log test name
+        """
+        report = import_worklogs([create_issue], 20)
+        LOGGER.debug("Import: %s", report)
+        # Assertion
+        assert report["created"] == 20, f"Expected 20 worklogs created but received {report}"
@@ -1,27 +1,50 @@
 import logging
+import time
 
-import influxdb_client, time
-from influxdb_client import Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+import influxdb_client
+from influxdb_client import Point, WritePrecision
+from influxdb_client.client.write_api import WriteOptions, WriteType
 
-from config.config import influxdb_token
+from config.config import (
+    influxdb_token, influxdb_url, influxdb_org, influxdb_bucket, influxdb_batch_size, influxdb_flush_interval,
+    influxdb_max_retries, influxdb_max_retry_time
+)
+from helper.request_timing import PHASES
 from utils.logger import get_logger
 
 LOGGER = get_logger(__name__, logging.DEBUG)
 
-class InfluxDBConnection:
-    def __init__(self):
-        token = influxdb_token
-        org = "APIAutomationTest"
-        url = "http://localhost:8086"
 
+class InfluxDBConnection:
+    def __init__(self, url=influxdb_url, token=influxdb_token, org=influxdb_org, bucket=influxdb_bucket,
+                 batch_size=influxdb_batch_size, flush_interval=influxdb_flush_interval):
+        """
+        Connection that buffers points and writes them in batches from a background thread
+        :param url: (str) InfluxDB url
+        :param token: (str) InfluxDB token
+        :param org: (str) InfluxDB organization
+        :param bucket: (str) bucket where the points are stored
+        :param batch_size: (int) number of points sent in one write
+        :param flush_interval: (int) milliseconds before a non full batch is sent
+        """
+        self.org = org
+        self.bucket = bucket
         self.write_client = influxdb_client.InfluxDBClient(url=url, token=token, org=org)
-        self.bucket = "JiraAPI"
-        self.write_api = self.write_client.write_api(write_options=SYNCHRONOUS)
+        self.write_api = self.write_client.write_api(
+            write_options=WriteOptions(
+                write_type=WriteType.batching,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                # an unreachable database must not hold the end of the run for minutes
+                max_retries=influxdb_max_retries,
+                max_retry_time=influxdb_max_retry_time
+            ),
+            error_callback=self._log_write_error
+        )
 
     def store_data_influxdb(self, response, endpoint):
-        # response = rest_client.send_request("GET", url=f"{url_base}issue/EXU-1", auth=auth)
         LOGGER.debug("Data stored in DB: %s, %s, %s, %s", endpoint, response["request"].url, response["request"].method, response["status_code"])
+        # nanosecond timestamps keep points of the same series from overwriting each other
         point = (
             Point("response_time")
             .tag("url", response["request"].url)
@@ -29,9 +52,47 @@ class InfluxDBConnection:
             .tag("status", response["status_code"])
             .tag("endpoint", endpoint)
             .field("value", response["time"])
+            .time(time.time_ns(), WritePrecision.NS)
         )
-        self.write_api.write(bucket=self.bucket, org="APIAutomationTest", record=point)
-        time.sleep(1)  # separate points by 1 second
+        # the phases measured are stored as fields next to the response time
+        timings = response["timings"]
+        for phase in PHASES:
+            if timings[phase] is not None:
+                point.field(phase, timings[phase])
+        if timings["reused"] is not None:
+            point.field("connection_reused", timings["reused"])
+        self.write_api.write(bucket=self.bucket, org=self.org, record=point)
+
+    def store_latency_summary(self, rows):
+        """
+        Store one point per endpoint, method and status with the aggregated response times
+        :param rows: (list) LatencyRecorder.summary() rows
+        """
+        timestamp = time.time_ns()
+        points = []
+        for row in rows:
+            point = (
+                Point("response_time_summary")
+                .tag("endpoint", row["endpoint"])
+                .tag("method", row["method"])
+                .tag("status", row["status"])
+                .time(timestamp, WritePrecision.NS)
+            )
+            for field in ("count", "mean", "p50", "p90", "p99", "max", "connections"):
+                point.field(field, row[field])
+            for phase in PHASES:
+                if f"{phase}_mean" in row:
+                    point.field(f"{phase}_mean", row[f"{phase}_mean"])
+                    point.field(f"{phase}_p90", row[f"{phase}_p90"])
+            points.append(point)
+        LOGGER.debug("Latency summary stored in DB: %s points", len(points))
+        self.write_api.write(bucket=self.bucket, org=self.org, record=points)
 
     def close(self):
+        # flushes the pending batch before closing the client
+        self.write_api.close()
         self.write_client.close()
+
+    @staticmethod
+    def _log_write_error(conf, data, exception):
+        LOGGER.error("InfluxDB write error: %s", exception)
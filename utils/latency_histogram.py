@@ -0,0 +1,236 @@
+"""
+latency_histogram.py
+Log-linear (HDR style) latency histograms aggregated in process and mergeable across workers
+"""
+import math
+import threading
+from collections import defaultdict
+
+from helper.endpoints import normalize_endpoint
+from helper.request_timing import PHASES
+
+# 2^8 sub buckets per power of two, a recorded value lands in a bucket of width under 1/128 of it:
+# a relative error below 0.8%
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+PERCENTILES = (50, 90, 99)
+# histogram of the whole response time, the other histograms hold one phase of the request
+TOTAL = "total"
+# only opened connections spend time resolving, connecting and negotiating TLS
+CONNECTION_SETUP_PHASES = ("dns", "connect", "tls")
+
+_shared_recorder = None
+_shared_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder():
+    """
+    Process-wide recorder fed by the RestClient listener
+    :return: LatencyRecorder
+    """
+    global _shared_recorder
+    with _shared_recorder_lock:
+        if _shared_recorder is None:
+            _shared_recorder = LatencyRecorder()
+        return _shared_recorder
+
+
+class LatencyHistogram:
+    def __init__(self):
+        # bucket index -> count, values are stored in microseconds
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        value = max(int(seconds * 1_000_000), 0)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile):
+        """
+        :param percentile: (float) 0 to 100
+        :return: (float) seconds, None when the histogram is empty
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_value(index), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def mean(self):
+        return self.total / self.count / 1_000_000 if self.count else None
+
+    def to_dict(self):
+        return {"counts": dict(self.counts), "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        # json turns the bucket indexes into strings
+        histogram.counts.update({int(index): count for index, count in data["counts"].items()})
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+    @staticmethod
+    def _index(value):
+        shift = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+        return shift * SUB_BUCKET_HALF + (value >> shift)
+
+    @staticmethod
+    def _highest_value(index):
+        if index < 2 * SUB_BUCKET_HALF:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        top = index - shift * SUB_BUCKET_HALF
+        return ((top + 1) << shift) - 1
+
+
+class LatencyRecorder:
+    def __init__(self):
+        # (endpoint, method, status, phase) -> LatencyHistogram
+        self.histograms = defaultdict(LatencyHistogram)
+        self.lock = threading.Lock()
+
+    def record(self, response):
+        """
+        RestClient listener, records the response time and the phases of every request
+        :param response: (RestResponse) response received
+        """
+        if response["time"] is None:
+            return
+        key = (normalize_endpoint(response["request"].url), response["request"].method, str(response["status_code"]))
+        timings = response["timings"]
+        with self.lock:
+            self.histograms[key + (TOTAL,)].record(response["time"])
+            for phase in PHASES:
+                if timings[phase] is None or (phase in CONNECTION_SETUP_PHASES and timings["reused"] is not False):
+                    continue
+                self.histograms[key + (phase,)].record(timings[phase])
+
+    def record_decode(self, response):
+        """
+        RestClient decode listener, records the JSON decode time once a test reads the body
+        :param response: (RestResponse) response whose body was decoded
+        """
+        seconds = response["timings"]["json_decode"]
+        if seconds is None or response["request"] is None:
+            return
+        key = (
+            normalize_endpoint(response["request"].url), response["request"].method, str(response["status_code"]), "json_decode"
+        )
+        with self.lock:
+            self.histograms[key].record(seconds)
+
+    def merge(self, other):
+        with self.lock:
+            for key, histogram in other.histograms.items():
+                self.histograms[key].merge(histogram)
+
+    def to_dict(self):
+        with self.lock:
+            return {"|".join(key): histogram.to_dict() for key, histogram in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        recorder = cls()
+        for key, histogram in data.items():
+            recorder.histograms[tuple(key.split("|"))] = LatencyHistogram.from_dict(histogram)
+        return recorder
+
+    def summary(self):
+        """
+        :return: (list) one dict per endpoint, method and status with count, mean, percentiles and max in seconds,
+                        <phase>_mean and <phase>_p90 of the phases measured, connections is the number of opened ones
+        """
+        rows = []
+        with self.lock:
+            for (endpoint, method, status, phase), histogram in sorted(self.histograms.items()):
+                if phase != TOTAL:
+                    continue
+                row = {"endpoint": endpoint, "method": method, "status": status, "count": histogram.count, "mean": histogram.mean()}
+                row.update({f"p{percentile}": histogram.percentile(percentile) for percentile in PERCENTILES})
+                row["max"] = histogram.max / 1_000_000
+                row["connections"] = 0
+                for name in PHASES:
+                    phase_histogram = self.histograms.get((endpoint, method, status, name))
+                    if phase_histogram is None:
+                        continue
+                    row[f"{name}_mean"] = phase_histogram.mean()
+                    row[f"{name}_p90"] = phase_histogram.percentile(90)
+                    if name == "connect":
+                        row["connections"] = phase_histogram.count
+                rows.append(row)
+        return rows
+
+
+SUMMARY_COLUMNS = ("endpoint", "method", "status", "count", "mean", "p50", "p90", "p99", "max")
+
+
+def format_summary_table(rows):
+    lines = [f"{'endpoint':35} {'method':7} {'status':6} {'count':>6} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"]
+    for row in rows:
+        lines.append(
+            f"{row['endpoint']:35} {row['method']:7} {row['status']:6} {row['count']:>6} {row['mean']:>8.3f} "
+            f"{row['p50']:>8.3f} {row['p90']:>8.3f} {row['p99']:>8.3f} {row['max']:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def format_phase_table(rows):
+    """
+    Mean and p90 of every phase in milliseconds, - when the phase was not measured
+    """
+    header = f"{'endpoint':35} {'method':7} {'status':6} {'conn':>5}"
+    header += "".join(f" {name[:11]:>11}" for name in PHASES)
+    lines = [header, f"{'':56}" + "".join(f" {'mean/p90':>11}" for _ in PHASES)]
+    for row in rows:
+        line = f"{row['endpoint']:35} {row['method']:7} {row['status']:6} {row['connections']:>5}"
+        for name in PHASES:
+            if f"{name}_mean" in row:
+                line += f" {row[f'{name}_mean'] * 1000:>5.1f}/{row[f'{name}_p90'] * 1000:<5.1f}"
+            else:
+                line += f" {'-':>11}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_summary_markdown(rows):
+    lines = ["| " + " | ".join(SUMMARY_COLUMNS) + " |", "|" + "---|" * len(SUMMARY_COLUMNS)]
+    for row in rows:
+        lines.append("| " + " | ".join(_format_cell(row[column]) for column in SUMMARY_COLUMNS) + " |")
+    return "\n".join(lines)
+
+
+def format_summary_html(rows):
+    header = "".join(f"<th>{column}</th>" for column in SUMMARY_COLUMNS)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{_format_cell(row[column])}</td>" for column in SUMMARY_COLUMNS) + "</tr>"
+        for row in rows
+    )
+    return f"<h2>Response times (s)</h2><table><tr>{header}</tr>{body}</table>"
+
+
+def _format_cell(value):
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
@@ -1,11 +1,20 @@
 """
 logger.py
 Configuration of a logger file
+
+Every logger puts its records on one queue, a listener thread formats them and writes them to the
+console and to the log file of the session, the thread logging never waits for the I/O.
+The arguments of a record are only formatted by the listener: pass payloads as arguments
+(LazyJson for bodies) instead of building the message, and do not modify them after logging.
 """
+import atexit
+import json
 import logging
 import os
 import pathlib
+import queue
 import sys
+import threading
 from datetime import datetime
 from logging import handlers
 
@@ -13,6 +22,35 @@ DEFAULT_LOG_LEVEL = logging.INFO
 
 DEFAULT_LOG_FORMAT = "%(asctime)s UTC %(levelname)-8s %(name)-15s  %(message)s"
 
+# LOG_LEVEL=INFO overrides the level of every logger, debug payloads are then never serialized
+LOG_LEVEL = os.getenv("LOG_LEVEL")
+if LOG_LEVEL and not (LOG_LEVEL.isdigit() or isinstance(logging.getLevelName(LOG_LEVEL.upper()), int)):
+    # setLevel would raise in every module getting a logger
+    print(f"Unknown LOG_LEVEL {LOG_LEVEL!r} ignored, use DEBUG, INFO, WARNING, ERROR or CRITICAL", file=sys.stderr)
+    LOG_LEVEL = None
+
+# the xdist workers inherit the session name of the controller, their files are grouped with it
+LOG_SESSION_VARIABLE = "LOG_SESSION"
+
+_pipeline_lock = threading.Lock()
+_queue = None
+_listener = None
+_console_handler = None
+
+
+class LazyJson:
+    def __init__(self, value, indent=4):
+        """
+        Log argument serialized to JSON only when the record is written
+        :param value: (dict|list) payload, usually a response body
+        :param indent: (int) indentation of the JSON
+        """
+        self.value = value
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.value, indent=self.indent)
+
 
 def get_logger(name, level=DEFAULT_LOG_LEVEL, log_format=DEFAULT_LOG_FORMAT):
     """
@@ -28,28 +66,95 @@ def get_logger(name, level=DEFAULT_LOG_LEVEL, log_format=DEFAULT_LOG_FORMAT):
     :return:    logger
     """
     logger = logging.getLogger(name)
-    log_file_name = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
+    log_queue = _start_pipeline()
 
-    for handler in logger.handlers:
+    for handler in list(logger.handlers):
         logger.removeHandler(handler)
-    handler = logging.StreamHandler(sys.__stdout__)
-    handler.setLevel(level)
-    abs_path = os.path.abspath(__file__ + "../../../")
-    # if the logs folder does not exist it will be created
-    pathlib.Path(f"{abs_path}/logs").mkdir(parents=True, exist_ok=True)
-    handler_file = handlers.RotatingFileHandler(
-        f"{abs_path}/logs/{log_file_name}.log",
-        maxBytes=1000000, backupCount=5)
-    handler_file.setLevel(level)
-
-    fmt = logging.Formatter(log_format)
-    handler.setFormatter(fmt)
-    handler_file.setFormatter(fmt)
-
-    logger.addHandler(handler)
-    logger.addHandler(handler_file)
+    logger.addHandler(_DeferredQueueHandler(log_queue, logging.Formatter(log_format)))
     logger.propagate = False
 
+    if LOG_LEVEL:
+        level = int(LOG_LEVEL) if LOG_LEVEL.isdigit() else LOG_LEVEL.upper()
     logger.setLevel(level)
 
     return logger
+
+
+def set_console_level(level):
+    """
+    Level of the console output, the log file keeps every record
+    :param level: (int) logging level
+    """
+    _start_pipeline()
+    _console_handler.setLevel(level)
+
+
+def stop_logging():
+    # writes the records still in the queue, called at exit
+    global _listener
+    with _pipeline_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _start_pipeline():
+    global _queue, _listener, _console_handler
+    with _pipeline_lock:
+        if _listener is not None:
+            return _queue
+        session = os.environ.setdefault(LOG_SESSION_VARIABLE, datetime.now().strftime("%m_%d_%Y_%H_%M_%S"))
+        worker = os.getenv("PYTEST_XDIST_WORKER")
+        # one file per xdist worker, the processes would otherwise rotate the same file
+        log_file_name = f"{session}_{worker}" if worker else session
+        abs_path = os.path.abspath(__file__ + "../../../")
+        # if the logs folder does not exist it will be created
+        pathlib.Path(f"{abs_path}/logs").mkdir(parents=True, exist_ok=True)
+        handler_file = handlers.RotatingFileHandler(
+            f"{abs_path}/logs/{log_file_name}.log",
+            maxBytes=1000000, backupCount=5, encoding="utf-8")
+        _console_handler = logging.StreamHandler(sys.__stdout__)
+        for handler in (_console_handler, handler_file):
+            handler.setFormatter(_RecordFormatter())
+
+        _queue = queue.SimpleQueue()
+        _listener = _FormattingQueueListener(_queue, _console_handler, handler_file, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _queue
+
+
+class _DeferredQueueHandler(handlers.QueueHandler):
+    def __init__(self, log_queue, formatter):
+        super().__init__(log_queue)
+        self.setFormatter(formatter)
+
+    def prepare(self, record):
+        # unlike QueueHandler the message is not formatted here, only the traceback that holds the frames
+        if record.exc_info:
+            record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.formatter = self.formatter
+        return record
+
+
+class _FormattingQueueListener(handlers.QueueListener):
+    def handle(self, record):
+        try:
+            super().handle(record)
+        except Exception:
+            # a record that can not be formatted, e.g. fewer arguments than the message expects, is reported
+            # on stderr like a handler does it and the thread goes on with the next records
+            self.handlers[0].handleError(record)
+
+    def prepare(self, record):
+        # formatted once for the console and the file
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _RecordFormatter(logging.Formatter):
+    # every record carries the formatter of the logger it was created by
+    def format(self, record):
+        return record.formatter.format(record)
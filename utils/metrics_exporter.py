@@ -0,0 +1,245 @@
+"""
+metrics_exporter.py
+Backends receiving the response time metrics of a run, selected with METRICS_EXPORTER
+
+    none         nothing is exported, default when INFLUXDB_TOKEN is not set
+    influxdb     batched points written to InfluxDB
+    prometheus   Prometheus text format pushed to a pushgateway
+    openmetrics  OpenMetrics text file
+    csv          one CSV row per endpoint, method and status
+
+The backends receive the aggregated rows of LatencyRecorder.summary() once per run,
+the per response points are only written by InfluxDB.
+"""
+import csv
+import logging
+import pathlib
+import threading
+
+import requests
+
+from config.config import metrics_exporter, metrics_file, prometheus_pushgateway_url, prometheus_job
+from helper.request_timing import PHASES
+from utils.logger import get_logger
+
+LOGGER = get_logger(__name__, logging.DEBUG)
+
+REPORTS_PATH = pathlib.Path(__file__).resolve().parent.parent / "reports"
+METRIC_PREFIX = "jira_api"
+QUANTILES = (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"))
+CSV_COLUMNS = (
+    ("endpoint", "method", "status", "count", "mean", "p50", "p90", "p99", "max", "connections")
+    + tuple(f"{phase}_{stat}" for phase in PHASES for stat in ("mean", "p90"))
+)
+
+_shared_exporter = None
+_shared_exporter_lock = threading.Lock()
+
+
+def get_metrics_exporter():
+    """
+    Process-wide exporter configured by METRICS_EXPORTER
+    :return: MetricsExporter
+    """
+    global _shared_exporter
+    with _shared_exporter_lock:
+        if _shared_exporter is None:
+            _shared_exporter = create_exporter(metrics_exporter)
+            LOGGER.debug("Metrics exporter: %s", metrics_exporter)
+        return _shared_exporter
+
+
+def close_metrics_exporter():
+    global _shared_exporter
+    with _shared_exporter_lock:
+        if _shared_exporter is not None:
+            _shared_exporter.close()
+            _shared_exporter = None
+
+
+def create_exporter(names):
+    """
+    :param names: (str) exporter name, or several separated by commas
+    :return: MetricsExporter
+    """
+    selected = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = set(selected) - set(EXPORTERS)
+    if unknown:
+        raise ValueError(f"Unknown metrics exporter {sorted(unknown)}, expected {sorted(EXPORTERS)}")
+    exporters = [EXPORTERS[name]() for name in selected if name != "none"]
+    if not exporters:
+        return MetricsExporter()
+    if len(exporters) == 1:
+        return exporters[0]
+    return CompositeExporter(exporters)
+
+
+class MetricsExporter:
+    # exports nothing, a run without a metrics backend only pays for the method calls
+    def export_response(self, response, endpoint):
+        """
+        :param response: (RestResponse) response of one request
+        :param endpoint: (str) endpoint template, e.g. issue/{id}
+        """
+
+    def export_summary(self, rows):
+        """
+        :param rows: (list) LatencyRecorder.summary() rows
+        """
+
+    def close(self):
+        pass
+
+
+class CompositeExporter(MetricsExporter):
+    def __init__(self, exporters):
+        self.exporters = exporters
+
+    def export_response(self, response, endpoint):
+        for exporter in self.exporters:
+            exporter.export_response(response, endpoint)
+
+    def export_summary(self, rows):
+        for exporter in self.exporters:
+            exporter.export_summary(rows)
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+class InfluxDBExporter(MetricsExporter):
+    def __init__(self, connection=None):
+        """
+        :param connection: (InfluxDBConnection) connection batching the points, configured from the environment by default
+        """
+        if connection is None:
+            # the client is only imported by the runs that export to InfluxDB
+            from utils.influxdb_connection import InfluxDBConnection
+            connection = InfluxDBConnection()
+        self.connection = connection
+
+    def export_response(self, response, endpoint):
+        self.connection.store_data_influxdb(response, endpoint)
+
+    def export_summary(self, rows):
+        if rows:
+            self.connection.store_latency_summary(rows)
+
+    def close(self):
+        # flushes the pending batch
+        self.connection.close()
+
+
+class PrometheusPushExporter(MetricsExporter):
+    def __init__(self, url=prometheus_pushgateway_url, job=prometheus_job, timeout=10):
+        """
+        :param url: (str) pushgateway url
+        :param job: (str) job label grouping the metrics of the runs
+        :param timeout: (float) seconds to wait for the pushgateway
+        """
+        self.url = f"{url.rstrip('/')}/metrics/job/{job}"
+        self.timeout = timeout
+
+    def export_summary(self, rows):
+        if not rows:
+            return
+        try:
+            # PUT replaces the metrics of the previous run of the job
+            response = requests.put(
+                self.url, data=format_prometheus(rows).encode("utf-8"),
+                headers={"Content-Type": "text/plain; version=0.0.4"}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            LOGGER.debug("Metrics pushed to %s: %s rows", self.url, len(rows))
+        except requests.exceptions.RequestException as e:
+            LOGGER.error("Pushgateway error: %s", e)
+
+
+class OpenMetricsFileExporter(MetricsExporter):
+    def __init__(self, path=None):
+        """
+        :param path: (str) file written at the end of the run, METRICS_FILE or reports/metrics.prom by default
+        """
+        self.path = pathlib.Path(path or metrics_file or REPORTS_PATH / "metrics.prom")
+
+    def export_summary(self, rows):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(format_prometheus(rows, openmetrics=True))
+        LOGGER.debug("Metrics written to %s: %s rows", self.path, len(rows))
+
+
+class CsvFileExporter(MetricsExporter):
+    def __init__(self, path=None):
+        """
+        :param path: (str) file written at the end of the run, METRICS_FILE or reports/metrics.csv by default
+        """
+        self.path = pathlib.Path(path or metrics_file or REPORTS_PATH / "metrics.csv")
+
+    def export_summary(self, rows):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        LOGGER.debug("Metrics written to %s: %s rows", self.path, len(rows))
+
+
+EXPORTERS = {
+    "none": MetricsExporter,
+    "influxdb": InfluxDBExporter,
+    "prometheus": PrometheusPushExporter,
+    "openmetrics": OpenMetricsFileExporter,
+    "csv": CsvFileExporter,
+}
+
+
+def format_prometheus(rows, openmetrics=False):
+    """
+    Summary rows in the Prometheus text exposition format, or OpenMetrics with the unit lines and # EOF
+    :param rows: (list) LatencyRecorder.summary() rows
+    :param openmetrics: (bool) OpenMetrics instead of the Prometheus 0.0.4 format
+    :return: (str) exposition text
+    """
+    response_seconds = f"{METRIC_PREFIX}_response_seconds"
+    max_seconds = f"{METRIC_PREFIX}_response_max_seconds"
+    phase_seconds = f"{METRIC_PREFIX}_request_phase_seconds"
+    connections = f"{METRIC_PREFIX}_connections_opened"
+    lines = _family_header(response_seconds, "summary", "Response time of the Jira API requests", openmetrics)
+    for row in rows:
+        labels = _labels(row)
+        for quantile, column in QUANTILES:
+            lines.append(f'{response_seconds}{{{labels},quantile="{quantile}"}} {row[column]}')
+        lines.append(f"{response_seconds}_sum{{{labels}}} {row['mean'] * row['count']}")
+        lines.append(f"{response_seconds}_count{{{labels}}} {row['count']}")
+    lines += _family_header(max_seconds, "gauge", "Slowest response of the run", openmetrics)
+    lines += [f"{max_seconds}{{{_labels(row)}}} {row['max']}" for row in rows]
+    lines += _family_header(phase_seconds, "gauge", "Mean and p90 of every phase of the requests", openmetrics)
+    for row in rows:
+        labels = _labels(row)
+        for phase in PHASES:
+            if f"{phase}_mean" in row:
+                lines.append(f'{phase_seconds}{{{labels},phase="{phase}",stat="mean"}} {row[f"{phase}_mean"]}')
+                lines.append(f'{phase_seconds}{{{labels},phase="{phase}",stat="p90"}} {row[f"{phase}_p90"]}')
+    # OpenMetrics names the counter family without the _total suffix of its samples
+    lines += _family_header(connections if openmetrics else f"{connections}_total", "counter", "Connections opened by the requests", openmetrics)
+    lines += [f"{connections}_total{{{_labels(row)}}} {row.get('connections', 0)}" for row in rows]
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _family_header(name, metric_type, description, openmetrics):
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+    if openmetrics and name.endswith("_seconds"):
+        lines.append(f"# UNIT {name} seconds")
+    return lines
+
+
+def _labels(row):
+    return ",".join(f'{name}="{_escape(row[name])}"' for name in ("endpoint", "method", "status"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')